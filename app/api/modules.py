@@ -45,7 +45,7 @@ async def upload_module(
             logger.debug(f"Module saved temporarily at {temp_file.name}")
             
             # Validate module structure
-            is_valid, errors = ModuleValidator.validate_module_structure(temp_file.name)
+            is_valid, errors = await ModuleValidator.validate_module_structure(temp_file.name)
             if not is_valid:
                 logger.error(f"Structure validation failed: {errors}")
                 raise HTTPException(status_code=400, detail=errors)
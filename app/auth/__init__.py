@@ -1,10 +1,16 @@
-from .auth import create_access_token, verify_token
+from .auth import create_access_token, verify_token, get_token_cache
+from .tokens import Claims, TokenCache, RevocationList, TokenRevokedError
 from .models import Role, Permission, ROLE_PERMISSIONS
 from .dependencies import check_permissions
 
 __all__ = [
     'create_access_token',
     'verify_token',
+    'get_token_cache',
+    'Claims',
+    'TokenCache',
+    'RevocationList',
+    'TokenRevokedError',
     'Role',
     'Permission',
     'ROLE_PERMISSIONS',
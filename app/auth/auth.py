@@ -2,26 +2,39 @@ from fastapi import Depends, HTTPException, Security
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 import jwt
 import os
+import uuid
 from datetime import datetime, timedelta
 from typing import Optional
 from .models import Role, Permission, ROLE_PERMISSIONS
+from .tokens import TokenCache, TokenRevokedError
 
 SECRET_KEY = os.getenv("JWT_SECRET_KEY", "your-secret-key")
 ALGORITHM = "HS256"
 
 security = HTTPBearer()
 
+_token_cache: Optional[TokenCache] = None
+
+def get_token_cache() -> TokenCache:
+    global _token_cache
+    if _token_cache is None:
+        _token_cache = TokenCache(SECRET_KEY, ALGORITHM)
+    return _token_cache
+
 async def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(hours=24)
+    # Lets a single token be revoked by id
+    to_encode.setdefault("jti", uuid.uuid4().hex)
     to_encode.update({"exp": expire})
     return jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
 
 async def verify_token(credentials: HTTPAuthorizationCredentials = Security(security)):
     try:
-        payload = jwt.decode(credentials.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
+        return get_token_cache().verify(credentials.credentials)
     except jwt.ExpiredSignatureError:
         raise HTTPException(status_code=401, detail="Token has expired")
+    except TokenRevokedError:
+        raise HTTPException(status_code=401, detail="Token has been revoked")
     except jwt.InvalidTokenError:
         raise HTTPException(status_code=401, detail="Could not validate credentials")
@@ -11,10 +11,14 @@ class Permission(Enum):
     GENERATE_MODULE = "generate:module"
 
 def check_permissions(required_permissions: List[Permission]):
+    required = frozenset(permission.value for permission in required_permissions)
+
     async def permission_checker(token: dict = Depends(verify_token)):
-        user_permissions = token.get("permissions", [])
-        for permission in required_permissions:
-            if permission.value not in user_permissions:
-                raise HTTPException(status_code=403, detail="Insufficient permissions")
+        # Verified tokens carry their permission set; plain dicts come from test overrides
+        granted = getattr(token, "permission_set", None)
+        if granted is None:
+            granted = token.get("permissions", [])
+        if not required.issubset(granted):
+            raise HTTPException(status_code=403, detail="Insufficient permissions")
         return token
-    return permission_checker
\ No newline at end of file
+    return permission_checker
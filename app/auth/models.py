@@ -6,6 +6,8 @@ class Role(str, Enum):
     ADMIN = "admin"
     PUBLISHER = "publisher"
     READER = "reader"
+    # CI and other automation publishing modules
+    SERVICE = "service"
 
 class Permission(str, Enum):
     READ_MODULE = "read:module"
@@ -27,6 +29,10 @@ ROLE_PERMISSIONS = {
         Permission.UPLOAD_MODULE,
         Permission.GENERATE_MODULE
     },
+    Role.SERVICE: {
+        Permission.READ_MODULE,
+        Permission.UPLOAD_MODULE
+    },
     Role.READER: {
         Permission.READ_MODULE
     }
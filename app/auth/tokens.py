@@ -0,0 +1,123 @@
+"""Verified-token cache and revocation list.
+
+Verifying a JWT signature on every request is the bulk of auth overhead, and
+automation reuses the same tokens constantly. ``TokenCache`` keeps the
+verified payloads of recently seen tokens, keyed by the token's SHA-256, until
+their ``exp``; a warm token costs one hash and one dict lookup. Each payload
+carries its effective permission set, computed once from the ``permissions``
+claim and ``ROLE_PERMISSIONS`` for its ``role``.
+
+Revocations are checked on every lookup, cached or not, against a set of
+``jti`` claims and token hashes. ``AUTH_REVOKED_TOKENS_FILE`` names a file
+with one entry per line, shared by all API processes and re-read when it
+changes.
+"""
+import os
+import time
+import hashlib
+import logging
+import jwt
+from collections import OrderedDict
+from typing import Dict, FrozenSet, Optional, Set, Tuple
+from .models import ROLE_PERMISSIONS
+
+logger = logging.getLogger(__name__)
+
+ROLE_PERMISSION_VALUES: Dict[str, FrozenSet[str]] = {
+    role.value: frozenset(permission.value for permission in permissions)
+    for role, permissions in ROLE_PERMISSIONS.items()
+}
+
+class TokenRevokedError(jwt.InvalidTokenError):
+    pass
+
+class Claims(dict):
+    """A verified token payload. Cached instances are shared between requests
+    and must not be modified."""
+
+    def __init__(self, payload: dict):
+        super().__init__(payload)
+        self.permission_set: FrozenSet[str] = frozenset(payload.get("permissions") or ()) | \
+            ROLE_PERMISSION_VALUES.get(payload.get("role"), frozenset())
+
+def token_digest(token: str) -> str:
+    return hashlib.sha256(token.encode()).hexdigest()
+
+class RevocationList:
+    def __init__(self, path: Optional[str] = None, check_interval: float = 5.0):
+        self.path = path
+        self.check_interval = check_interval
+        self._revoked: Set[str] = set()
+        self._loaded: Set[str] = set()
+        self._mtime: Optional[float] = None
+        self._checked = 0.0
+
+    def revoke(self, value: str) -> None:
+        """Revoke a ``jti`` or token hash in this process, and in the others through the file"""
+        self._revoked.add(value)
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(f"{value}\n")
+
+    def is_revoked(self, claims: dict, digest: str) -> bool:
+        self._reload()
+        return digest in self._revoked or claims.get("jti") in self._revoked
+
+    def _reload(self) -> None:
+        now = time.monotonic()
+        if not self.path or now - self._checked < self.check_interval:
+            return
+        self._checked = now
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except FileNotFoundError:
+            return
+        if mtime == self._mtime:
+            return
+        with open(self.path) as f:
+            loaded = {line.strip() for line in f if line.strip()}
+        # Entries revoked in this process stay revoked even if the file is rewritten
+        self._revoked = (self._revoked - self._loaded) | loaded
+        self._loaded = loaded
+        self._mtime = mtime
+
+class TokenCache:
+    def __init__(self, secret_key: str, algorithm: str, max_size: Optional[int] = None,
+                 revocations: Optional[RevocationList] = None):
+        self.secret_key = secret_key
+        self.algorithm = algorithm
+        self.max_size = max_size or int(os.getenv("AUTH_TOKEN_CACHE_SIZE", 10000))
+        self.revocations = revocations or RevocationList(os.getenv("AUTH_REVOKED_TOKENS_FILE"))
+        # digest -> (claims, expiry as epoch seconds), least recently used first
+        self._entries: "OrderedDict[str, Tuple[Claims, float]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def verify(self, token: str) -> Claims:
+        """Verified claims for ``token``; raises ``jwt.InvalidTokenError`` subclasses"""
+        digest = token_digest(token)
+        entry = self._entries.get(digest)
+        if entry is not None and entry[1] <= time.time():
+            del self._entries[digest]
+            entry = None
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(digest)
+            claims = entry[0]
+        else:
+            self.misses += 1
+            claims = Claims(jwt.decode(token, self.secret_key, algorithms=[self.algorithm]))
+            self._entries[digest] = (claims, float(claims.get("exp", float("inf"))))
+            if len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+        if self.revocations.is_revoked(claims, digest):
+            self._entries.pop(digest, None)
+            raise TokenRevokedError("Token has been revoked")
+        return claims
+
+    def revoke(self, value: str) -> None:
+        self.revocations.revoke(value)
+        self._entries.pop(value, None)
+
+    def stats(self) -> dict:
+        return {"size": len(self._entries), "max_size": self.max_size, "hits": self.hits, "misses": self.misses}
@@ -0,0 +1,277 @@
+"""Bulk import of Terraform modules into the registry.
+
+Modules are discovered either by walking a directory tree laid out as
+``<root>/<namespace>/<name>/<provider>/<version>/`` or from a JSON manifest
+(a list of ``{"path", "namespace", "name", "provider", "version"}``). Zips
+are built in a process pool and uploaded with bounded async concurrency,
+retrying transient failures. Completed modules are appended to a checkpoint
+file so an interrupted import resumes where it left off.
+
+    python -m app.bulk_import ./modules --token $TOKEN --concurrency 16
+    python -m app.bulk_import --manifest modules.json --batch-size 20
+"""
+import os
+import json
+import time
+import random
+import asyncio
+import logging
+import zipfile
+import argparse
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Set
+import aiohttp
+from .storage.normalize import is_excluded
+from .jobs.scheduler import BULK
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {408, 429, 500, 502, 503, 504}
+# How the batch endpoint rejects a version the registry already has
+VERSION_EXISTS = {"version": "Version already exists"}
+
+class UploadError(RuntimeError):
+    def __init__(self, status: int, body: Any):
+        super().__init__(f"HTTP {status}: {body}")
+        self.status = status
+        self.body = body
+
+@dataclass(frozen=True)
+class ModuleSpec:
+    path: str
+    namespace: str
+    name: str
+    provider: str
+    version: str
+
+    @property
+    def key(self) -> str:
+        return f"{self.namespace}/{self.name}/{self.provider}/{self.version}"
+
+def discover_modules(root: str) -> List[ModuleSpec]:
+    """Find module directories at ``<namespace>/<name>/<provider>/<version>`` depth"""
+    root_path = Path(root)
+    modules = []
+    for version_dir in sorted(root_path.glob("*/*/*/*")):
+        if not version_dir.is_dir() or not any(version_dir.glob("*.tf")):
+            continue
+        namespace, name, provider, version = version_dir.relative_to(root_path).parts
+        modules.append(ModuleSpec(str(version_dir), namespace, name, provider, version))
+    return modules
+
+def load_manifest(path: str) -> List[ModuleSpec]:
+    with open(path) as f:
+        entries = json.load(f)
+    base = Path(path).parent
+    return [
+        ModuleSpec(str(base / entry["path"]), entry["namespace"], entry["name"],
+                   entry["provider"], entry["version"])
+        for entry in entries
+    ]
+
+def build_module_zip(module_path: str, output_path: str) -> str:
+    """Zip a module directory, skipping paths the registry would strip anyway"""
+    abs_module_path = os.path.abspath(module_path)
+    with zipfile.ZipFile(output_path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for root, dirs, files in os.walk(abs_module_path):
+            dirs.sort()
+            for file in sorted(files):
+                file_path = os.path.join(root, file)
+                rel_path = os.path.relpath(file_path, abs_module_path).replace(os.sep, "/")
+                if not is_excluded(rel_path):
+                    zipf.write(file_path, rel_path)
+    return output_path
+
+class Checkpoint:
+    """Append-only record of modules that were accepted by the server"""
+
+    def __init__(self, path: Optional[str]):
+        self.path = path
+        self.done: Set[str] = set()
+        if path and os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    line = line.strip()
+                    if line:
+                        self.done.add(json.loads(line)["key"])
+
+    def record(self, spec: ModuleSpec, result: Dict[str, Any]) -> None:
+        self.done.add(spec.key)
+        if self.path:
+            with open(self.path, "a") as f:
+                f.write(json.dumps({"key": spec.key, "job_id": result.get("job_id")}) + "\n")
+
+class BulkImporter:
+    def __init__(self, base_url: str, token: Optional[str], concurrency: int = 8,
+                 build_workers: Optional[int] = None, retries: int = 5,
+                 batch_size: int = 1, checkpoint: Optional[str] = None):
+        self.base_url = base_url.rstrip("/")
+        self.headers = {"Authorization": f"Bearer {token}"} if token else {}
+        self.concurrency = concurrency
+        self.build_workers = build_workers
+        self.retries = retries
+        self.batch_size = batch_size
+        self.checkpoint = Checkpoint(checkpoint)
+        self.succeeded = 0
+        # Versions the server already had, e.g. accepted before a crash or a lost response
+        self.existing = 0
+        self.failed: List[Dict[str, Any]] = []
+
+    async def run(self, modules: Iterable[ModuleSpec]) -> Dict[str, Any]:
+        modules = list(modules)
+        pending = [spec for spec in modules if spec.key not in self.checkpoint.done]
+        skipped = len(modules) - len(pending)
+        started = time.perf_counter()
+        logger.info(f"Importing {len(pending)} modules ({len(self.checkpoint.done)} already done)")
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        loop = asyncio.get_running_loop()
+        timeout = aiohttp.ClientTimeout(total=None, sock_read=300)
+        with tempfile.TemporaryDirectory(prefix="bulk_import_") as tmpdir, \
+                ProcessPoolExecutor(max_workers=self.build_workers) as pool:
+            async with aiohttp.ClientSession(headers=self.headers, timeout=timeout) as session:
+
+                async def build(spec: ModuleSpec) -> str:
+                    output = os.path.join(tmpdir, spec.key.replace("/", "_") + ".zip")
+                    return await loop.run_in_executor(pool, build_module_zip, spec.path, output)
+
+                async def process(batch: List[ModuleSpec]) -> None:
+                    async with semaphore:
+                        try:
+                            zips = await asyncio.gather(*(build(spec) for spec in batch))
+                            await self._upload(session, batch, zips)
+                        except Exception as e:
+                            for spec in batch:
+                                self.failed.append({"module": spec.key, "error": str(e)})
+                            logger.error(f"Failed to import {[s.key for s in batch]}: {str(e)}")
+                        finally:
+                            for spec in batch:
+                                path = os.path.join(tmpdir, spec.key.replace("/", "_") + ".zip")
+                                if os.path.exists(path):
+                                    os.unlink(path)
+
+                batches = [pending[i:i + self.batch_size] for i in range(0, len(pending), self.batch_size)]
+                await asyncio.gather(*(process(batch) for batch in batches))
+
+        return {
+            "imported": self.succeeded,
+            "already_imported": self.existing,
+            "failed": self.failed,
+            "skipped": skipped,
+            "duration_seconds": round(time.perf_counter() - started, 2)
+        }
+
+    async def _upload(self, session: aiohttp.ClientSession, batch: List[ModuleSpec], zips: List[str]) -> None:
+        archives = await asyncio.gather(*(asyncio.to_thread(Path(path).read_bytes) for path in zips))
+        if len(batch) == 1:
+            spec = batch[0]
+            url = f"{self.base_url}/api/modules/{spec.key}/upload"
+
+            def form() -> aiohttp.FormData:
+                data = aiohttp.FormData()
+                data.add_field("file", archives[0], filename="module.zip")
+                # Imports must not compete with interactive uploads
+                data.add_field("lane", BULK)
+                return data
+
+            try:
+                result = await self._post(session, url, form)
+            except UploadError as e:
+                if e.status != 409:
+                    raise
+                self._record_existing(spec)
+                return
+            self.checkpoint.record(spec, result)
+            self.succeeded += 1
+            return
+
+        def batch_form() -> aiohttp.FormData:
+            data = aiohttp.FormData()
+            manifest = [
+                {"filename": f"{i}.zip", "namespace": spec.namespace, "name": spec.name,
+                 "provider": spec.provider, "version": spec.version}
+                for i, spec in enumerate(batch)
+            ]
+            data.add_field("manifest", json.dumps(manifest))
+            for i, archive in enumerate(archives):
+                data.add_field("files", archive, filename=f"{i}.zip")
+            return data
+
+        response = await self._post(session, f"{self.base_url}/api/modules/batch", batch_form)
+        for spec, result in zip(batch, response["results"]):
+            if result["status"] == "queued":
+                self.checkpoint.record(spec, result)
+                self.succeeded += 1
+            elif result.get("errors") == VERSION_EXISTS:
+                self._record_existing(spec)
+            else:
+                self.failed.append({"module": spec.key, "error": result.get("errors")})
+
+    def _record_existing(self, spec: ModuleSpec) -> None:
+        logger.info(f"{spec.key} is already in the registry")
+        self.checkpoint.record(spec, {})
+        self.existing += 1
+
+    async def _post(self, session: aiohttp.ClientSession, url: str, form) -> Dict[str, Any]:
+        """POST with exponential backoff on connection errors and retryable statuses"""
+        for attempt in range(self.retries + 1):
+            data = form()
+            try:
+                async with session.post(url, data=data) as response:
+                    if response.status in RETRY_STATUSES and attempt < self.retries:
+                        retry_after = response.headers.get("Retry-After")
+                        delay = float(retry_after) if retry_after and retry_after.isdigit() else None
+                        await self._backoff(attempt, delay, f"HTTP {response.status}")
+                        continue
+                    body = await response.json(content_type=None)
+                    if response.status >= 400:
+                        raise UploadError(response.status, body)
+                    return body
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= self.retries:
+                    raise
+                await self._backoff(attempt, None, str(e))
+        raise RuntimeError(f"Giving up on {url} after {self.retries} retries")
+
+    async def _backoff(self, attempt: int, delay: Optional[float], reason: str) -> None:
+        delay = delay if delay is not None else min(60.0, 2 ** attempt) * (0.5 + random.random() / 2)
+        logger.warning(f"Retrying in {delay:.1f}s after {reason}")
+        await asyncio.sleep(delay)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import Terraform modules into the registry")
+    parser.add_argument("root", nargs="?", help="directory laid out as namespace/name/provider/version")
+    parser.add_argument("--manifest", help="JSON manifest listing module paths and coordinates")
+    parser.add_argument("--base-url", default=os.getenv("TERRAFORM_MODULE_URL", "http://localhost:8000"))
+    parser.add_argument("--token", default=os.getenv("TERRAFORM_MODULE_TOKEN"))
+    parser.add_argument("--concurrency", type=int, default=8, help="uploads in flight at once")
+    parser.add_argument("--build-workers", type=int, help="processes used to build zips")
+    parser.add_argument("--batch-size", type=int, default=1, help="modules per request (uses the batch endpoint when > 1)")
+    parser.add_argument("--retries", type=int, default=5)
+    parser.add_argument("--checkpoint", default="bulk_import.checkpoint", help="file recording completed modules")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    if args.manifest:
+        modules = load_manifest(args.manifest)
+    elif args.root:
+        modules = discover_modules(args.root)
+    else:
+        parser.error("either a root directory or --manifest is required")
+
+    importer = BulkImporter(
+        args.base_url, args.token,
+        concurrency=args.concurrency,
+        build_workers=args.build_workers,
+        retries=args.retries,
+        batch_size=max(1, args.batch_size),
+        checkpoint=args.checkpoint
+    )
+    summary = asyncio.run(importer.run(modules))
+    print(json.dumps(summary, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,6 @@
 from .dependency import DependencyManager
+from .resolver import DependencyResolver, get_dependency_resolver
+from .dependents import ReverseDependencyIndex
+from .requirements import RequirementIndex
 
-__all__ = ['DependencyManager']
\ No newline at end of file
+__all__ = ['DependencyManager', 'DependencyResolver', 'ReverseDependencyIndex', 'RequirementIndex', 'get_dependency_resolver']
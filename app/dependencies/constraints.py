@@ -0,0 +1,93 @@
+"""Terraform module version constraints, e.g. ``">= 1.2, < 2.0"`` or ``"~> 3.1"``.
+
+Follows Terraform's rules for module versions: a bare version means an
+exact match, partial versions are padded with zeros, ``~>`` only lets the
+rightmost given component grow, and prerelease versions are only selected
+when a constraint names them exactly.
+"""
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, List, Optional, Tuple
+import semver
+
+VERSION_PATTERN = re.compile(r"^v?(\d+)(?:\.(\d+))?(?:\.(\d+))?(?:-([0-9A-Za-z.-]+))?(?:\+[0-9A-Za-z.-]+)?$")
+CLAUSE_PATTERN = re.compile(r"^\s*(~>|>=|<=|!=|=|>|<)?\s*(\S+)\s*$")
+
+class ConstraintError(ValueError):
+    pass
+
+@dataclass(frozen=True)
+class Clause:
+    operator: str
+    version: semver.VersionInfo
+    # Number of components written in the constraint, used by ~>
+    precision: int
+
+    def allows(self, version: semver.VersionInfo) -> bool:
+        if self.operator == "=":
+            return version == self.version
+        if self.operator == "!=":
+            return version != self.version
+        if self.operator == ">":
+            return version > self.version
+        if self.operator == ">=":
+            return version >= self.version
+        if self.operator == "<":
+            return version < self.version
+        if self.operator == "<=":
+            return version <= self.version
+        # ~> 1.2.3 means >= 1.2.3, < 1.3.0; ~> 1.2 means >= 1.2.0, < 2.0.0
+        if version < self.version:
+            return False
+        if self.precision <= 2:
+            return version.major == self.version.major
+        return (version.major, version.minor) == (self.version.major, self.version.minor)
+
+@dataclass(frozen=True)
+class Constraint:
+    clauses: Tuple[Clause, ...] = ()
+
+    def __str__(self) -> str:
+        return ", ".join(f"{c.operator} {c.version}" for c in self.clauses) or "any"
+
+    def allows(self, version: semver.VersionInfo) -> bool:
+        if version.prerelease and not any(c.operator == "=" and c.version == version for c in self.clauses):
+            return False
+        return all(clause.allows(version) for clause in self.clauses)
+
+    def select(self, versions: Iterable[str]) -> Optional[str]:
+        """Highest of ``versions`` that satisfies the constraint, or None"""
+        best: Optional[Tuple[semver.VersionInfo, str]] = None
+        for text in versions:
+            version = parse_version(text)
+            if version is None or not self.allows(version):
+                continue
+            if best is None or version > best[0]:
+                best = (version, text)
+        return best[1] if best else None
+
+@lru_cache(maxsize=4096)
+def parse_version(text: str) -> Optional[semver.VersionInfo]:
+    """Parse a registry version, padding partial versions; None if it is not a version"""
+    match = VERSION_PATTERN.match(text.strip())
+    if not match:
+        return None
+    major, minor, patch, prerelease = match.groups()
+    return semver.VersionInfo(int(major), int(minor or 0), int(patch or 0), prerelease)
+
+@lru_cache(maxsize=4096)
+def parse_constraint(text: Optional[str]) -> Constraint:
+    """Parse a comma separated constraint string; an empty constraint allows any release"""
+    if text is None or not str(text).strip():
+        return Constraint()
+    clauses: List[Clause] = []
+    for part in str(text).split(","):
+        match = CLAUSE_PATTERN.match(part)
+        version_match = VERSION_PATTERN.match(match.group(2)) if match else None
+        if not version_match:
+            raise ConstraintError(f"Invalid version constraint: {part.strip()!r}")
+        operator = match.group(1) or "="
+        precision = sum(1 for component in version_match.groups()[:3] if component is not None)
+        clauses.append(Clause(operator, parse_version(match.group(2)), precision))
+    return Constraint(tuple(clauses))
@@ -1,24 +1,109 @@
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional, Tuple
 import os
-import json
+import re
+import asyncio
+import logging
+from ..database import SessionLocal
+from ..validation.hcl import ParsedModule
+from ..validation.workers import get_validation_workers
+from ..validation.manifest import ManifestStore
+from ..models.models import ModuleVersion, ModuleDependency, ModuleFile, ProviderRequirement
+from .resolver import get_dependency_resolver
+from .requirements import RequirementIndex
+
+logger = logging.getLogger(__name__)
+
+# [<hostname>/]<namespace>/<name>/<provider>[//<subdirectory>]
+REGISTRY_SOURCE = re.compile(r"^(?:(?P<host>[a-z0-9.-]+\.[a-z0-9-]+(?::\d+)?)/)?"
+                             r"(?P<namespace>[A-Za-z0-9][A-Za-z0-9_-]*)/(?P<name>[A-Za-z0-9][A-Za-z0-9_-]*)/"
+                             r"(?P<provider>[a-z0-9]+)(?://.*)?$")
+EXTERNAL_HOSTS = ("github.com/", "bitbucket.org/")
 
 class DependencyManager:
     @staticmethod
-    async def resolve_dependencies(module_path: str) -> List[Dict[str, Any]]:
-        dependencies = []
+    def extract_dependencies(parsed: ParsedModule) -> List[Dict[str, Any]]:
+        """Module calls declared by the root module of a parsed archive"""
+        return [
+            {"name": label, "source": body.get("source"), "version": body.get("version"), "file": path}
+            for path, label, body in parsed.labelled("module")
+        ]
+
+    @staticmethod
+    def parse_source(source: Optional[str]) -> Tuple[str, Optional[Tuple[str, str, str]]]:
+        """Classify a module source as registry, local or external.
+
+        Registry sources without a hostname, or with one listed in
+        ``REGISTRY_HOSTNAMES``, are returned with their coordinates so they can
+        be resolved against this registry.
+        """
+        if not isinstance(source, str):
+            return "external", None
+        if source.startswith(("./", "../")):
+            return "local", None
+        match = REGISTRY_SOURCE.match(source)
+        if not match or "::" in source or source.startswith(EXTERNAL_HOSTS):
+            return "external", None
+        hosts = {h.strip().lower() for h in os.getenv("REGISTRY_HOSTNAMES", "").split(",") if h.strip()}
+        if match.group("host") and match.group("host").lower() not in hosts:
+            return "external", None
+        return "registry", (match.group("namespace"), match.group("name"), match.group("provider"))
+
+    @staticmethod
+    def build_edges(version_id: str, parsed: ParsedModule) -> List[ModuleDependency]:
+        """Rows recording the module calls of one version, stored when it is registered"""
+        edges = []
+        for dependency in DependencyManager.extract_dependencies(parsed):
+            kind, coordinates = DependencyManager.parse_source(dependency["source"])
+            edges.append(ModuleDependency(
+                version_id=version_id,
+                name=dependency["name"],
+                source=dependency["source"] if isinstance(dependency["source"], str) else None,
+                version_constraint=dependency["version"] if isinstance(dependency["version"], str) else None,
+                kind=kind,
+                target_module_id="-".join(coordinates) if coordinates else None,
+                file=dependency["file"]
+            ))
+        return edges
+
+    @staticmethod
+    async def reindex(session_factory=SessionLocal) -> Dict[str, int]:
+        """Record edges, provider requirements and file manifests for versions registered before they were extracted.
+
+        Every indexed version has at least its ``terraform`` requirement row, so
+        versions without any are the ones still to do.
+        """
+        db = session_factory()
         try:
-            # Basic implementation - can be enhanced later
-            if os.path.exists(module_path):
-                # Scan for module blocks in .tf files
-                for root, _, files in os.walk(module_path):
-                    for file in files:
-                        if file.endswith('.tf'):
-                            # This is a simplified implementation
-                            # In practice, we'd want to properly parse the HCL
-                            dependencies.append({
-                                "source": file,
-                                "path": os.path.join(root, file)
-                            })
-            return dependencies
-        except Exception as e:
-            return []
\ No newline at end of file
+            indexed = db.query(ProviderRequirement.version_id).distinct()
+            versions = db.query(ModuleVersion.id, ModuleVersion.module_id, ModuleVersion.source_zip).filter(
+                ModuleVersion.source_zip.isnot(None), ModuleVersion.id.notin_(indexed)
+            ).all()
+        finally:
+            db.close()
+
+        counts = {"scanned": 0, "edges": 0, "failed": 0}
+        for version_id, module_id, source_zip in versions:
+            counts["scanned"] += 1
+            try:
+                parsed, errors = await get_validation_workers().run("prevalidate", source_zip)
+            except Exception as e:
+                parsed, errors = None, str(e)
+            if parsed is None:
+                logger.warning(f"Cannot index dependencies of {version_id}: {errors}")
+                counts["failed"] += 1
+                continue
+            edges = DependencyManager.build_edges(version_id, parsed)
+            await asyncio.to_thread(ManifestStore.save_parsed, parsed, session_factory)
+            db = session_factory()
+            try:
+                db.query(ModuleDependency).filter_by(version_id=version_id).delete(synchronize_session=False)
+                db.add_all(edges)
+                db.add_all(RequirementIndex.build_requirements(version_id, module_id, parsed))
+                db.query(ModuleFile).filter_by(version_id=version_id).delete(synchronize_session=False)
+                db.add_all(ManifestStore.manifest_rows(version_id, parsed))
+                db.commit()
+            finally:
+                db.close()
+            counts["edges"] += len(edges)
+            get_dependency_resolver().invalidate(module_id, version_id)
+        return counts
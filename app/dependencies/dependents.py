@@ -0,0 +1,93 @@
+"""Reverse lookups over the recorded dependency edges: who uses a module.
+
+``module_dependencies.target_module_id`` is indexed and rows are written when
+each version is registered, so the reverse index stays current without any
+archive being opened. Transitive dependents are found one level at a time,
+with a single indexed query per level.
+"""
+from typing import Any, Dict, List, Optional, Set
+import semver
+from sqlalchemy.orm import Session
+from ..models.models import Module, ModuleVersion, ModuleDependency
+from .constraints import ConstraintError, parse_constraint, parse_version
+
+QUERY_CHUNK = 500
+
+class ReverseDependencyIndex:
+    @staticmethod
+    def dependents(db: Session, module_id: str, version: Optional[str] = None,
+                   transitive: bool = False, max_depth: int = 50) -> List[Dict[str, Any]]:
+        """Module versions that call ``module_id``, ordered by depth then address.
+
+        With ``version``, only callers whose constraint admits that version are
+        returned, e.g. to see who a new major release would reach. Transitive
+        dependents are callers of an affected version of a dependent.
+        """
+        if version is not None and parse_version(version) is None:
+            raise ValueError(f"Invalid version: {version!r}")
+        # Affected versions per module; None means any version
+        frontier: Dict[str, Optional[Set[semver.VersionInfo]]] = {
+            module_id: {parse_version(version)} if version is not None else None
+        }
+        seen: Set[str] = set()
+        found: Dict[str, Dict[str, Any]] = {}
+        depth = 1
+        while frontier and depth <= max_depth:
+            next_frontier: Dict[str, Set[semver.VersionInfo]] = {}
+            for row in ReverseDependencyIndex._callers(db, list(frontier)):
+                versions = frontier[row.target_module_id]
+                if versions is not None and not ReverseDependencyIndex._admits(row.version_constraint, versions):
+                    continue
+                if row.module_id == module_id:
+                    continue
+                entry = found.get(row.version_id)
+                if entry is None:
+                    found[row.version_id] = entry = {
+                        "module": f"{row.namespace}/{row.module_name}/{row.provider}",
+                        "version": row.version,
+                        "depth": depth,
+                        "calls": []
+                    }
+                if entry["depth"] == depth:
+                    entry["calls"].append({"name": row.call_name, "source": row.source, "version": row.version_constraint})
+                if row.version_id not in seen:
+                    seen.add(row.version_id)
+                    parsed = parse_version(row.version)
+                    if parsed is not None:
+                        next_frontier.setdefault(row.module_id, set()).add(parsed)
+            if not transitive:
+                break
+            frontier = next_frontier
+            depth += 1
+        return sorted(found.values(), key=lambda d: (
+            d["depth"], d["module"], parse_version(d["version"]) or semver.VersionInfo(0)
+        ))
+
+    @staticmethod
+    def _admits(constraint: Optional[str], versions: Set[semver.VersionInfo]) -> bool:
+        try:
+            parsed = parse_constraint(constraint)
+        except ConstraintError:
+            return False
+        return any(parsed.allows(version) for version in versions)
+
+    @staticmethod
+    def _callers(db: Session, module_ids: List[str]):
+        for start in range(0, len(module_ids), QUERY_CHUNK):
+            yield from db.query(
+                ModuleDependency.target_module_id,
+                ModuleDependency.version_constraint,
+                ModuleDependency.name.label("call_name"),
+                ModuleDependency.source,
+                ModuleVersion.id.label("version_id"),
+                ModuleVersion.module_id,
+                ModuleVersion.version,
+                Module.namespace,
+                Module.name.label("module_name"),
+                Module.provider
+            ).join(ModuleVersion, ModuleVersion.id == ModuleDependency.version_id).join(
+                Module, Module.id == ModuleVersion.module_id
+            ).filter(
+                ModuleDependency.kind == "registry",
+                ModuleDependency.target_module_id.in_(module_ids[start:start + QUERY_CHUNK])
+            )
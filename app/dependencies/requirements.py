@@ -0,0 +1,116 @@
+"""Index of the provider and Terraform version constraints of each version.
+
+Every ``required_providers`` entry, plus the ``required_version`` of the
+root module under the source ``terraform``, is stored as one
+``ProviderRequirement`` row. The row holds its constraint as a closed
+interval of encoded integers, so a compatibility question like "works with
+hashicorp/aws 5.x" is a range comparison in SQL:
+
+    (min_version IS NULL OR min_version <= :high) AND
+    (max_version IS NULL OR max_version >= :low)
+
+Versions are encoded as ``((major * 10^6 + minor) * 10^6 + patch) * 2 + 1``.
+A prerelease takes the even slot just below its release. ``!=`` clauses
+cannot be expressed as one interval. They are kept in the raw constraint but
+not used by the index.
+"""
+from typing import List, Optional, Tuple
+import semver
+from ..validation.hcl import ParsedModule
+from ..validation.plugins import normalize_provider_source, required_providers_from_config
+from ..models.models import ProviderRequirement
+from .constraints import parse_constraint, parse_version
+
+TERRAFORM_SOURCE = "terraform"
+COMPONENT_LIMIT = 10 ** 6
+
+Bounds = Tuple[Optional[int], Optional[int]]
+
+def encode_version(version: semver.VersionInfo) -> int:
+    major, minor, patch = (min(part, COMPONENT_LIMIT - 1) for part in (version.major, version.minor, version.patch))
+    return ((major * COMPONENT_LIMIT + minor) * COMPONENT_LIMIT + patch) * 2 + (0 if version.prerelease else 1)
+
+def _next(version: semver.VersionInfo, precision: int) -> semver.VersionInfo:
+    """First version past the range a partial version names, e.g. 5 -> 6.0.0 and 5.1 -> 5.2.0"""
+    if precision <= 1:
+        return semver.VersionInfo(version.major + 1)
+    if precision == 2:
+        return semver.VersionInfo(version.major, version.minor + 1)
+    return semver.VersionInfo(version.major, version.minor, version.patch + 1)
+
+def constraint_bounds(constraint: Optional[str]) -> Bounds:
+    """Smallest and largest encoded version a constraint admits; None means unbounded.
+
+    Raises ``ConstraintError`` for constraints that cannot be parsed.
+    """
+    low: Optional[int] = None
+    high: Optional[int] = None
+    for clause in parse_constraint(constraint).clauses:
+        encoded = encode_version(clause.version)
+        clause_low, clause_high = None, None
+        if clause.operator == "=":
+            clause_low = clause_high = encoded
+        elif clause.operator == ">=":
+            clause_low = encoded
+        elif clause.operator == ">":
+            clause_low = encoded + 1
+        elif clause.operator == "<=":
+            clause_high = encoded
+        elif clause.operator == "<":
+            # Skip the prerelease slot of a release bound, which partial queries start on
+            clause_high = encoded - (1 if clause.version.prerelease else 2)
+        elif clause.operator == "~>":
+            clause_low = encoded
+            clause_high = encode_version(_next(clause.version, max(clause.precision - 1, 1))) - 2
+        if clause_low is not None:
+            low = clause_low if low is None else max(low, clause_low)
+        if clause_high is not None:
+            high = clause_high if high is None else min(high, clause_high)
+    return low, high
+
+def version_bounds(text: str) -> Bounds:
+    """Range named by a query version: ``5`` is every 5.x release, ``5.31.0`` only itself"""
+    version = parse_version(text.rstrip(".x*"))
+    if version is None:
+        raise ValueError(f"Invalid version: {text!r}")
+    precision = text.rstrip(".x*").lstrip("v").split("-")[0].count(".") + 1
+    if precision >= 3:
+        encoded = encode_version(version)
+        return encoded, encoded
+    return encode_version(version) - 1, encode_version(_next(version, precision)) - 2
+
+class RequirementIndex:
+    @staticmethod
+    def build_requirements(version_id: str, module_id: str, parsed: ParsedModule) -> List[ProviderRequirement]:
+        """Rows for the provider and Terraform constraints of one version's root module"""
+        providers = {}
+        terraform_constraints = []
+        for _, block in parsed.blocks("terraform"):
+            providers.update(required_providers_from_config({"terraform": [block]}))
+            if isinstance(block.get("required_version"), str):
+                terraform_constraints.append(block["required_version"])
+        # Terraform requires every required_version to hold
+        requirements = [(TERRAFORM_SOURCE, ", ".join(terraform_constraints) or None)]
+        requirements += sorted(providers.items())
+
+        rows = []
+        for source, constraint in requirements:
+            constraint = constraint if isinstance(constraint, str) else None
+            try:
+                low, high = constraint_bounds(constraint)
+            except ValueError:
+                # Unparseable constraints stay searchable by source but match any version
+                low, high = None, None
+            rows.append(ProviderRequirement(
+                version_id=version_id,
+                module_id=module_id,
+                source=source,
+                version_constraint=constraint,
+                min_version=low,
+                max_version=high
+            ))
+        return rows
+
+    @staticmethod
+    def normalize_source(source: str) -> str:
+        return TERRAFORM_SOURCE if source.lower() == TERRAFORM_SOURCE else normalize_provider_source(source)
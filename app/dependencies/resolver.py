@@ -0,0 +1,243 @@
+"""Transitive resolution of module dependencies against registered versions.
+
+Each version's ``module`` calls are stored as ``ModuleDependency`` rows when
+it is registered. Resolving a version walks those edges breadth first,
+loading one level of the graph per query, and picks for every registry call
+the highest registered version that satisfies its constraint.
+
+Three things are cached in memory:
+
+* edges per version, which never change once a version is registered;
+* the version list of each module, dropped when a version is added or removed;
+* resolutions, keyed by version. A resolution records every module whose
+  version list it consulted and is dropped when any of those modules changes.
+
+Invalidation happens in the process that registers or deletes the version.
+Other processes pick up changes after ``DEPENDENCY_CACHE_TTL`` seconds.
+"""
+import os
+import time
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, FrozenSet, List, Optional, Set, Tuple
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.models import Module, ModuleVersion, ModuleDependency
+from .constraints import ConstraintError, parse_constraint
+
+QUERY_CHUNK = 500
+
+@dataclass
+class Edge:
+    name: str
+    source: Optional[str]
+    constraint: Optional[str]
+    kind: str
+    target: Optional[str]
+    file: Optional[str]
+
+@dataclass
+class ModuleVersions:
+    address: str
+    # version -> version id
+    versions: Dict[str, str] = field(default_factory=dict)
+
+@dataclass
+class Resolution:
+    root: str
+    direct: List[Dict[str, Any]]
+    transitive: List[Dict[str, Any]]
+    unresolved: List[Dict[str, Any]]
+    modules: FrozenSet[str]
+    created_at: float = field(default_factory=time.monotonic)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"dependencies": self.direct, "transitive": self.transitive, "unresolved": self.unresolved}
+
+class DependencyResolver:
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal, ttl: Optional[float] = None):
+        self.session_factory = session_factory
+        self.ttl = ttl if ttl is not None else float(os.getenv("DEPENDENCY_CACHE_TTL", 300))
+        self._edges: Dict[str, List[Edge]] = {}
+        self._modules: Dict[str, ModuleVersions] = {}
+        self._versions_loaded_at: Dict[str, float] = {}
+        self._resolutions: Dict[str, Resolution] = {}
+        self._generation = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def invalidate(self, module_id: str, version_id: Optional[str] = None) -> None:
+        """Forget cached state that depends on the versions of ``module_id``"""
+        with self._lock:
+            self._generation += 1
+            self._modules.pop(module_id, None)
+            if version_id:
+                self._edges.pop(version_id, None)
+                self._resolutions.pop(version_id, None)
+            self._resolutions = {
+                key: resolution for key, resolution in self._resolutions.items()
+                if module_id not in resolution.modules
+            }
+
+    def resolve(self, module_id: str, version_id: str) -> Resolution:
+        """Direct and transitive dependencies of a registered version"""
+        with self._lock:
+            cached = self._resolutions.get(version_id)
+            if cached and time.monotonic() - cached.created_at < self.ttl:
+                self.hits += 1
+                return cached
+            self.misses += 1
+            generation = self._generation
+
+        resolution = self._resolve(module_id, version_id)
+        with self._lock:
+            # Only keep the result if nothing was invalidated while resolving
+            if generation == self._generation:
+                self._resolutions[version_id] = resolution
+        return resolution
+
+    def _resolve(self, module_id: str, root: str) -> Resolution:
+        db = self.session_factory()
+        try:
+            modules = self._load_versions(db, {module_id})
+            choices: Dict[str, List[Tuple[Edge, Optional[str], Optional[str]]]] = {}
+            depth = {root: 0}
+            required_by: Dict[str, List[str]] = {}
+            consulted: Set[str] = set()
+            frontier = [root]
+            while frontier:
+                edges = self._load_edges(db, frontier)
+                targets = {edge.target for vid in frontier for edge in edges[vid] if edge.kind == "registry"}
+                modules.update(self._load_versions(db, targets))
+                consulted |= targets
+                next_frontier = []
+                for vid in frontier:
+                    choices[vid] = [(edge, *self._choose(edge, modules)) for edge in edges[vid]]
+                    for _, chosen, _ in choices[vid]:
+                        if chosen is None:
+                            continue
+                        required_by.setdefault(chosen, []).append(vid)
+                        if chosen not in depth:
+                            depth[chosen] = depth[vid] + 1
+                            next_frontier.append(chosen)
+                frontier = next_frontier
+
+            names = self._version_names(modules)
+            direct = [self._edge_dict(edge, chosen, error, names) for edge, chosen, error in choices[root]]
+            transitive = [
+                {**names[vid], "depth": depth[vid], "required_by": sorted(self._label(names, r) for r in required_by[vid])}
+                for vid in sorted(depth, key=lambda v: (depth[v], v)) if vid != root
+            ]
+            unresolved = [
+                {**self._edge_dict(edge, None, error, names), "required_by": self._label(names, vid)}
+                for vid in sorted(choices, key=lambda v: (depth[v], v))
+                for edge, _, error in choices[vid] if error
+            ]
+            return Resolution(root, direct, transitive, unresolved, frozenset(consulted))
+        finally:
+            db.close()
+
+    @staticmethod
+    def _choose(edge: Edge, modules: Dict[str, ModuleVersions]) -> Tuple[Optional[str], Optional[str]]:
+        """Version id picked for a registry call, or the reason none could be"""
+        if edge.kind != "registry":
+            return None, None
+        module = modules.get(edge.target)
+        if module is None or not module.versions:
+            return None, "Module is not published in this registry"
+        try:
+            constraint = parse_constraint(edge.constraint)
+        except ConstraintError as e:
+            return None, str(e)
+        chosen = constraint.select(module.versions)
+        if chosen is None:
+            return None, f"No published version matches {edge.constraint!r}"
+        return module.versions[chosen], None
+
+    def _load_edges(self, db: Session, version_ids: List[str]) -> Dict[str, List[Edge]]:
+        edges = {vid: self._edges[vid] for vid in version_ids if vid in self._edges}
+        missing = [vid for vid in version_ids if vid not in edges]
+        loaded: Dict[str, List[Edge]] = {vid: [] for vid in missing}
+        for start in range(0, len(missing), QUERY_CHUNK):
+            rows = db.query(ModuleDependency).filter(
+                ModuleDependency.version_id.in_(missing[start:start + QUERY_CHUNK])
+            ).order_by(ModuleDependency.id)
+            for row in rows:
+                loaded[row.version_id].append(Edge(
+                    row.name, row.source, row.version_constraint, row.kind, row.target_module_id, row.file
+                ))
+        self._edges.update(loaded)
+        edges.update(loaded)
+        return edges
+
+    def _load_versions(self, db: Session, module_ids: Set[str]) -> Dict[str, ModuleVersions]:
+        now = time.monotonic()
+        modules: Dict[str, ModuleVersions] = {}
+        missing = []
+        for module_id in module_ids:
+            cached = self._modules.get(module_id)
+            if cached is not None and now - self._versions_loaded_at.get(module_id, 0) < self.ttl:
+                modules[module_id] = cached
+            else:
+                missing.append(module_id)
+        for start in range(0, len(missing), QUERY_CHUNK):
+            rows = db.query(
+                Module.id, Module.namespace, Module.name, Module.provider, ModuleVersion.version, ModuleVersion.id
+            ).outerjoin(ModuleVersion, ModuleVersion.module_id == Module.id).filter(
+                Module.id.in_(missing[start:start + QUERY_CHUNK])
+            )
+            for module_id, namespace, name, provider, version, version_id in rows:
+                module = modules.setdefault(module_id, ModuleVersions(f"{namespace}/{name}/{provider}"))
+                if version is not None:
+                    module.versions[version] = version_id
+        with self._lock:
+            for module_id in missing:
+                self._modules[module_id] = modules.setdefault(module_id, ModuleVersions(""))
+                self._versions_loaded_at[module_id] = now
+        return modules
+
+    @staticmethod
+    def _version_names(modules: Dict[str, ModuleVersions]) -> Dict[str, Dict[str, str]]:
+        return {
+            version_id: {"module": module.address, "version": version}
+            for module in modules.values() for version, version_id in module.versions.items()
+        }
+
+    @staticmethod
+    def _label(names: Dict[str, Dict[str, str]], version_id: str) -> str:
+        name = names.get(version_id)
+        return f"{name['module']}/{name['version']}" if name else version_id
+
+    @staticmethod
+    def _edge_dict(edge: Edge, chosen: Optional[str], error: Optional[str],
+                   names: Dict[str, Dict[str, str]]) -> Dict[str, Any]:
+        result = {
+            "name": edge.name,
+            "source": edge.source,
+            "version": edge.constraint,
+            "kind": edge.kind,
+            "file": edge.file,
+            "resolved": names[chosen]["version"] if chosen else None
+        }
+        if error:
+            result["error"] = error
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "resolutions": len(self._resolutions),
+                "versions_with_edges": len(self._edges),
+                "modules": len(self._modules),
+                "hits": self.hits,
+                "misses": self.misses
+            }
+
+_resolver: Optional[DependencyResolver] = None
+
+def get_dependency_resolver() -> DependencyResolver:
+    global _resolver
+    if _resolver is None:
+        _resolver = DependencyResolver()
+    return _resolver
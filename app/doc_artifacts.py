@@ -0,0 +1,200 @@
+"""Rendered module documentation, built on demand and cached on disk.
+
+Documentation is no longer produced during upload. The first request for a
+version's docs, or the background prerender queued after registration,
+renders JSON, Markdown and HTML once per archive digest:
+
+    <DOC_ARTIFACTS_DIR>/<digest>/v<RENDERER_VERSION>/docs.{json,md,html}[.gz|.br]
+
+Identical archives share artifacts, and a renderer change only needs a
+``RENDERER_VERSION`` bump. Each format is stored with precompressed gzip
+and brotli variants so they can be served without compressing per request.
+"""
+import os
+import gzip
+import html
+import json
+import shutil
+import asyncio
+import logging
+import tempfile
+import brotli
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+from .docs import DocGenerator, DOCS_DIR
+from .dependencies import DependencyManager
+from .validation.workers import get_validation_workers
+
+logger = logging.getLogger(__name__)
+
+RENDERER_VERSION = "1"
+FORMATS = {
+    "json": ("docs.json", "application/json"),
+    "md": ("docs.md", "text/markdown; charset=utf-8"),
+    "html": ("docs.html", "text/html; charset=utf-8"),
+}
+ENCODINGS = {"br": ".br", "gzip": ".gz"}
+
+class DocArtifactError(Exception):
+    pass
+
+def render_markdown(docs: Dict[str, Any]) -> str:
+    lines = [docs.get("description") or "No description available", ""]
+    if docs.get("required_version") or docs.get("required_providers"):
+        lines += ["## Requirements", "", "| Name | Version |", "|------|---------|"]
+        if docs.get("required_version"):
+            lines.append(f"| terraform | `{docs['required_version']}` |")
+        for source, constraint in sorted(docs.get("required_providers", {}).items()):
+            lines.append(f"| {source} | `{constraint or 'any'}` |")
+        lines.append("")
+    sections: List[Tuple[str, List[str], List[List[str]]]] = [
+        ("Inputs", ["Name", "Description", "Type", "Default", "Required"], [
+            [f"`{i['name']}`", i.get("description") or "", f"`{i.get('type')}`",
+             "n/a" if i.get("required") else f"`{json.dumps(i.get('default'))}`",
+             "yes" if i.get("required") else "no"]
+            for i in docs.get("inputs", [])
+        ]),
+        ("Outputs", ["Name", "Description"], [
+            [f"`{o['name']}`", o.get("description") or ""] for o in docs.get("outputs", [])
+        ]),
+        ("Resources", ["Type", "Name"], [
+            [f"`{r['type']}`", r["name"]] for r in docs.get("resources", [])
+        ]),
+        ("Data Sources", ["Type", "Name"], [
+            [f"`{r['type']}`", r["name"]] for r in docs.get("data_sources", [])
+        ]),
+        ("Modules", ["Name", "Source", "Version"], [
+            [d["name"], f"`{d.get('source')}`", d.get("version") or ""] for d in docs.get("dependencies", [])
+        ]),
+    ]
+    for title, header, rows in sections:
+        if not rows:
+            continue
+        lines += [f"## {title}", "", "| " + " | ".join(header) + " |", "|" + "---|" * len(header)]
+        lines += ["| " + " | ".join(cell.replace("|", "\\|") for cell in row) + " |" for row in rows]
+        lines.append("")
+    return "\n".join(lines)
+
+def render_html(docs: Dict[str, Any]) -> str:
+    """Standalone HTML page with the same sections as the Markdown"""
+    parts = ["<!DOCTYPE html>", '<html><head><meta charset="utf-8"><title>Module documentation</title></head><body>',
+             f"<p>{html.escape(docs.get('description') or 'No description available')}</p>"]
+    tables = [
+        ("Inputs", ["Name", "Description", "Type", "Default", "Required"], [
+            [i["name"], i.get("description") or "", str(i.get("type")),
+             "" if i.get("required") else json.dumps(i.get("default")), "yes" if i.get("required") else "no"]
+            for i in docs.get("inputs", [])
+        ]),
+        ("Outputs", ["Name", "Description"], [[o["name"], o.get("description") or ""] for o in docs.get("outputs", [])]),
+        ("Resources", ["Type", "Name"], [[r["type"], r["name"]] for r in docs.get("resources", [])]),
+        ("Data Sources", ["Type", "Name"], [[r["type"], r["name"]] for r in docs.get("data_sources", [])]),
+        ("Providers", ["Source", "Version"], [
+            [source, constraint or "any"] for source, constraint in sorted(docs.get("required_providers", {}).items())
+        ]),
+        ("Modules", ["Name", "Source", "Version"], [
+            [d["name"], str(d.get("source")), d.get("version") or ""] for d in docs.get("dependencies", [])
+        ]),
+    ]
+    for title, header, rows in tables:
+        if not rows:
+            continue
+        parts.append(f"<h2>{title}</h2><table><thead><tr>")
+        parts += [f"<th>{html.escape(cell)}</th>" for cell in header]
+        parts.append("</tr></thead><tbody>")
+        for row in rows:
+            parts.append("<tr>" + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>")
+        parts.append("</tbody></table>")
+    parts.append("</body></html>")
+    return "\n".join(parts)
+
+class DocArtifactStore:
+    def __init__(self, directory: Optional[str] = None):
+        self.directory = Path(directory or os.getenv("DOC_ARTIFACTS_DIR", os.path.join(DOCS_DIR, "artifacts")))
+        self._renders: Dict[str, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def artifact_dir(self, digest: str) -> Path:
+        if not digest.isalnum():
+            raise DocArtifactError(f"Invalid digest: {digest!r}")
+        return self.directory / digest / f"v{RENDERER_VERSION}"
+
+    def etag(self, digest: str, fmt: str, encoding: Optional[str] = None) -> str:
+        # Artifacts are a pure function of the archive and the renderer version
+        suffix = f"-{encoding}" if encoding else ""
+        return f'"{digest[:32]}-v{RENDERER_VERSION}-{fmt}{suffix}"'
+
+    def variant(self, digest: str, fmt: str, accept_encoding: str = "") -> Tuple[Path, Optional[str]]:
+        """Best stored file for a format given the client's Accept-Encoding"""
+        path = self.artifact_dir(digest) / FORMATS[fmt][0]
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+        for encoding, suffix in ENCODINGS.items():
+            candidate = path.with_name(path.name + suffix)
+            if encoding in accepted and candidate.exists():
+                return candidate, encoding
+        return path, None
+
+    async def ensure(self, digest: str, zip_path: str) -> Path:
+        """Render the artifacts for ``digest`` unless they exist; concurrent callers share one render"""
+        directory = self.artifact_dir(digest)
+        if directory.exists():
+            return directory
+        task = self._renders.get(digest)
+        if task is None:
+            task = asyncio.ensure_future(self._render(digest, zip_path))
+            self._renders[digest] = task
+            task.add_done_callback(lambda _: self._renders.pop(digest, None))
+        return await asyncio.shield(task)
+
+    def schedule(self, digest: str, zip_path: str) -> None:
+        """Render in the background, e.g. right after a version is registered"""
+        async def prerender():
+            try:
+                await self.ensure(digest, zip_path)
+            except Exception as e:
+                logger.error(f"Failed to prerender docs for {digest}: {str(e)}")
+        task = asyncio.ensure_future(prerender())
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+
+    async def _render(self, digest: str, zip_path: str) -> Path:
+        parsed, errors = await get_validation_workers().run("prevalidate", zip_path)
+        if errors:
+            raise DocArtifactError(f"Cannot document module: {errors}")
+        return await asyncio.to_thread(self._write, digest, parsed)
+
+    def _write(self, digest: str, parsed) -> Path:
+        docs = DocGenerator.generate_from_parsed(parsed)
+        docs["dependencies"] = DependencyManager.extract_dependencies(parsed)
+        rendered = {
+            "json": json.dumps(docs, indent=2, sort_keys=True),
+            "md": render_markdown(docs),
+            "html": render_html(docs),
+        }
+        target = self.artifact_dir(digest)
+        target.parent.mkdir(parents=True, exist_ok=True)
+        staging = Path(tempfile.mkdtemp(prefix=".render-", dir=target.parent))
+        try:
+            for fmt, content in rendered.items():
+                data = content.encode("utf-8")
+                filename = FORMATS[fmt][0]
+                (staging / filename).write_bytes(data)
+                (staging / (filename + ".gz")).write_bytes(gzip.compress(data, compresslevel=9, mtime=0))
+                (staging / (filename + ".br")).write_bytes(brotli.compress(data, quality=11))
+            try:
+                os.rename(staging, target)
+            except OSError:
+                # Another process rendered the same digest first
+                if not target.exists():
+                    raise
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+        logger.debug(f"Rendered documentation artifacts for {digest}")
+        return target
+
+_doc_store: Optional[DocArtifactStore] = None
+
+def get_doc_store() -> DocArtifactStore:
+    global _doc_store
+    if _doc_store is None:
+        _doc_store = DocArtifactStore()
+    return _doc_store
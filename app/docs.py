@@ -1,97 +1,144 @@
-import hcl2
 from pathlib import Path
 import json
 from typing import Dict, List, Any, Optional
 import os
+from .validation.hcl import ParsedModule, parse_directory
+from .validation.plugins import required_providers_from_config
 
 DOCS_DIR = os.getenv("DOCS_DIR", "./docs")
+DESCRIPTION_MAX_LENGTH = 500
 
 class DocGenerator:
     @staticmethod
     def generate_module_docs(module_path: Path) -> Dict:
+        """Build module docs from the .tf files and README of an extracted module"""
+        return DocGenerator.generate_from_parsed(parse_directory(str(module_path)))
+
+    @staticmethod
+    def generate_from_parsed(parsed: ParsedModule) -> Dict:
+        """Build module docs from an already parsed module, without touching disk"""
         docs = {
-            "inputs": [],
-            "outputs": [],
+            "inputs": DocGenerator._parse_variables(parsed),
+            "outputs": DocGenerator._parse_outputs(parsed),
             "dependencies": [],
-            "resources": []
+            "resources": DocGenerator._parse_resources(parsed, "resource"),
+            "data_sources": DocGenerator._parse_resources(parsed, "data"),
+            "required_providers": {},
+            "required_version": None
         }
-        
-        # Read variables.tf for inputs
-        vars_file = module_path / "variables.tf"
-        if vars_file.exists():
-            docs["inputs"] = DocGenerator._parse_variables(vars_file)
-            
-        # Read outputs.tf for outputs
-        outputs_file = module_path / "outputs.tf"
-        if outputs_file.exists():
-            docs["outputs"] = DocGenerator._parse_outputs(outputs_file)
-            
-        # Read README.md for general documentation
-        readme_file = module_path / "README.md"
-        if readme_file.exists():
-            docs["description"] = DocGenerator._parse_readme(readme_file)
-            
+        for _, block in parsed.blocks("terraform"):
+            docs["required_version"] = block.get("required_version", docs["required_version"])
+            docs["required_providers"].update(required_providers_from_config({"terraform": [block]}))
+        if parsed.readme is not None:
+            docs["description"] = DocGenerator._parse_readme(parsed.readme)
         return docs
-    
+
+    @staticmethod
+    def _parse_variables(parsed: ParsedModule) -> list:
+        """Inputs declared by ``variable`` blocks in any root .tf file"""
+        inputs = []
+        for path, name, body in parsed.labelled("variable"):
+            inputs.append({
+                "name": name,
+                "type": _expression(body.get("type", "any")),
+                "description": body.get("description"),
+                "default": body.get("default"),
+                "required": "default" not in body,
+                "sensitive": bool(body.get("sensitive", False)),
+                "file": path
+            })
+        return sorted(inputs, key=lambda item: item["name"])
+
+    @staticmethod
+    def _parse_outputs(parsed: ParsedModule) -> list:
+        """Outputs declared by ``output`` blocks in any root .tf file"""
+        outputs = [
+            {
+                "name": name,
+                "description": body.get("description"),
+                "sensitive": bool(body.get("sensitive", False)),
+                "file": path
+            }
+            for path, name, body in parsed.labelled("output")
+        ]
+        return sorted(outputs, key=lambda item: item["name"])
+
     @staticmethod
-    def _parse_variables(file_path: Path) -> list:
-        """Parse variables from variables.tf"""
-        # Simple parser for demo purposes
-        return [{"name": "parsed_from_variables.tf"}]
-    
+    def _parse_resources(parsed: ParsedModule, kind: str) -> list:
+        return [
+            {"type": resource_type, "name": name, "file": path}
+            for path, block in parsed.blocks(kind)
+            for resource_type, instances in block.items()
+            for name in instances
+        ]
+
     @staticmethod
-    def _parse_outputs(file_path: Path) -> list:
-        """Parse outputs from outputs.tf"""
-        # Simple parser for demo purposes
-        return [{"name": "parsed_from_outputs.tf"}]
-    
+    def _parse_readme(content: str) -> str:
+        """First prose paragraph of a README, skipping headings and badges"""
+        paragraph: List[str] = []
+        for line in content.splitlines():
+            stripped = line.strip()
+            if not stripped:
+                if paragraph:
+                    break
+                continue
+            if stripped.startswith(("#", "[![", "![", "<", "```", "---")):
+                if paragraph:
+                    break
+                continue
+            paragraph.append(stripped)
+        description = " ".join(paragraph)
+        if len(description) > DESCRIPTION_MAX_LENGTH:
+            description = description[:DESCRIPTION_MAX_LENGTH].rsplit(" ", 1)[0] + "..."
+        return description or "No description available"
+
     @staticmethod
-    def _parse_readme(file_path: Path) -> str:
-        """Parse description from README.md"""
-        try:
-            return file_path.read_text()
-        except:
-            return "No description available"
+    def diff(old: Dict, new: Dict) -> Dict[str, Any]:
+        """Interface changes between the docs of two versions, with the ones that break callers listed"""
+        result: Dict[str, Any] = {}
+        breaking: List[str] = []
+        for section in ("inputs", "outputs"):
+            before = {item["name"]: item for item in old.get(section, [])}
+            after = {item["name"]: item for item in new.get(section, [])}
+            changed = {}
+            for name in sorted(set(before) & set(after)):
+                fields = {
+                    key: {"from": before[name].get(key), "to": after[name].get(key)}
+                    for key in sorted(set(before[name]) | set(after[name]))
+                    if key != "file" and before[name].get(key) != after[name].get(key)
+                }
+                if fields:
+                    changed[name] = fields
+            result[section] = {
+                "added": sorted(set(after) - set(before)),
+                "removed": sorted(set(before) - set(after)),
+                "changed": changed
+            }
+            kind = section[:-1]
+            breaking += [f"{kind} \"{name}\" was removed" for name in result[section]["removed"]]
+            if section == "inputs":
+                breaking += [f"new input \"{name}\" is required" for name in result[section]["added"] if after[name].get("required")]
+                breaking += [f"input \"{name}\" is now required" for name, fields in changed.items() if fields.get("required", {}).get("to")]
+                breaking += [f"input \"{name}\" changed type" for name, fields in changed.items() if "type" in fields]
+
+        for section in ("resources", "data_sources"):
+            before = {f"{item['type']}.{item['name']}" for item in old.get(section, [])}
+            after = {f"{item['type']}.{item['name']}" for item in new.get(section, [])}
+            result[section] = {"added": sorted(after - before), "removed": sorted(before - after)}
+
+        providers_before, providers_after = old.get("required_providers", {}), new.get("required_providers", {})
+        result["required_providers"] = {
+            source: {"from": providers_before.get(source), "to": providers_after.get(source)}
+            for source in sorted(set(providers_before) | set(providers_after))
+            if providers_before.get(source) != providers_after.get(source)
+        }
+        if old.get("required_version") != new.get("required_version"):
+            result["required_version"] = {"from": old.get("required_version"), "to": new.get("required_version")}
+        result["breaking_changes"] = breaking
+        return result
 
-async def update_documentation(module_metadata: Dict[str, Any], readme_content: Optional[str] = None) -> str:
-    """
-    Update module documentation
-    Returns the path to the generated documentation
-    """
-    # Create docs directory if it doesn't exist
-    os.makedirs(DOCS_DIR, exist_ok=True)
-    
-    # Generate documentation path
-    doc_path = os.path.join(
-        DOCS_DIR,
-        f"{module_metadata['namespace']}-{module_metadata['name']}-{module_metadata['provider']}.md"
-    )
-    
-    # Generate documentation content
-    content = [
-        f"# {module_metadata['name']}",
-        "",
-        module_metadata.get('description', ''),
-        "",
-        "## Provider",
-        "",
-        f"`{module_metadata['provider']}`",
-        "",
-        "## Version",
-        "",
-        f"`{module_metadata['version']}`",
-        "",
-    ]
-    
-    if readme_content:
-        content.extend([
-            "## Documentation",
-            "",
-            readme_content
-        ])
-    
-    # Write documentation
-    with open(doc_path, 'w') as f:
-        f.write('\n'.join(content))
-    
-    return doc_path
+def _expression(value: Any) -> Any:
+    """Strip python-hcl2's ``${...}`` wrapper from type expressions"""
+    if isinstance(value, str) and value.startswith("${") and value.endswith("}"):
+        return value[2:-1]
+    return value
@@ -0,0 +1,17 @@
+from .queue import JobQueue
+from .scheduler import FairScheduler, INTERACTIVE, BULK, LANES
+from .pipeline import UploadPipeline, StageError, default_pipeline
+from .worker import WorkerPool, get_worker_pool
+
+__all__ = [
+    'JobQueue',
+    'FairScheduler',
+    'INTERACTIVE',
+    'BULK',
+    'LANES',
+    'UploadPipeline',
+    'StageError',
+    'default_pipeline',
+    'WorkerPool',
+    'get_worker_pool'
+]
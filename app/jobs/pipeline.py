@@ -0,0 +1,202 @@
+"""Stages run by the upload workers after an archive has been stored"""
+import os
+import asyncio
+import zipfile
+import logging
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+from sqlalchemy.exc import IntegrityError
+from ..database import SessionLocal
+from ..models.models import Module, ModuleVersion, ModuleArchive
+from ..dependencies import DependencyManager, RequirementIndex, get_dependency_resolver
+from ..validation import ModuleValidator
+from ..doc_artifacts import get_doc_store
+from ..github import GitHubService
+from ..validation.workers import get_validation_workers
+from ..validation.manifest import ManifestStore
+from ..storage import ModuleStorage
+from ..storage.extract import ArchiveLimitError
+
+logger = logging.getLogger(__name__)
+
+Stage = Callable[[Dict[str, Any]], Awaitable[Optional[Dict[str, Any]]]]
+
+class StageError(Exception):
+    """Raised by a stage to fail the job.
+
+    ``permanent`` failures (an invalid module, a duplicate version) are not
+    retried; anything else is treated as transient and the job is requeued.
+    """
+
+    def __init__(self, detail: Any, permanent: bool = False):
+        super().__init__(str(detail))
+        self.detail = detail
+        self.permanent = permanent
+
+async def normalize_stage(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    try:
+        result = await get_validation_workers().run("normalize", ctx["source_zip"])
+    except zipfile.BadZipFile:
+        raise StageError({"zip": "Invalid zip file format"}, permanent=True)
+    except ArchiveLimitError as e:
+        raise StageError({"archive": str(e)}, permanent=True)
+    return {"archive": result.to_dict()}
+
+async def _parse(ctx: Dict[str, Any]):
+    # Files unchanged since the module's previous version reuse its parse results
+    module_id = f"{ctx['namespace']}-{ctx['name']}-{ctx['provider']}"
+    known = await asyncio.to_thread(ManifestStore.previous_files, module_id)
+    parsed, errors = await get_validation_workers().run("prevalidate", ctx["source_zip"], known)
+    if parsed is not None:
+        reused = sum(1 for digest in parsed.hashes.values() if digest in known)
+        logger.debug(f"Parsed {len(parsed.hashes) - reused} of {len(parsed.hashes)} files for {module_id}")
+    return parsed, errors
+
+async def prevalidate_stage(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    parsed, errors = await _parse(ctx)
+    if errors:
+        raise StageError(errors, permanent=True)
+    return {"_parsed": parsed}
+
+async def validate_stage(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    digest = ctx.get("archive", {}).get("digest")
+    report = await ModuleValidator.validate_archive(ctx["source_zip"], digest, ctx.get("_parsed"))
+    # Set before raising so per-root timings are kept for failed jobs too
+    ctx["validation"] = report.to_dict()
+    if not report.is_valid:
+        raise StageError(report.errors, permanent=True)
+    return {"validation": ctx["validation"]}
+
+async def github_stage(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    token = os.getenv("GITHUB_TOKEN")
+    if not token:
+        return {"repository_url": None}
+    github_service = GitHubService(token)
+    repo_url = await github_service.create_module_repo(
+        ctx["namespace"], ctx["name"], ctx["provider"], ctx["version"],
+        Path(ctx["source_zip"]).parent
+    )
+    return {"repository_url": repo_url}
+
+def _final_zip(ctx: Dict[str, Any]) -> str:
+    return str(ModuleStorage.get_module_path(ctx["namespace"], ctx["name"], ctx["provider"], ctx["version"]))
+
+async def register_stage(ctx: Dict[str, Any]) -> Dict[str, Any]:
+    if not os.path.exists(ctx["source_zip"]) and os.path.exists(_final_zip(ctx)):
+        # An earlier attempt moved the archive into place but did not commit
+        ctx = {**ctx, "source_zip": _final_zip(ctx)}
+    parsed = ctx.get("_parsed")
+    if parsed is None:
+        # Retried job whose prevalidate stage ran in an earlier attempt
+        parsed, _ = await _parse(ctx)
+    if parsed is not None:
+        await asyncio.to_thread(ManifestStore.save_parsed, parsed)
+    result = await asyncio.to_thread(_register, ctx, parsed)
+    get_dependency_resolver().invalidate(result["module_id"], result["version_id"])
+    digest = ctx.get("archive", {}).get("digest")
+    if digest and os.getenv("DOCS_PRERENDER", "1") != "0":
+        # Docs are rendered after the job completes rather than as part of it
+        get_doc_store().schedule(digest, result["source_zip"])
+    return result
+
+def _register(ctx: Dict[str, Any], parsed=None) -> Dict[str, Any]:
+    """Record the version and move its staged archive to the version path in one step"""
+    db = SessionLocal()
+    final_zip = _final_zip(ctx)
+    promoted = False
+    try:
+        module_id = f"{ctx['namespace']}-{ctx['name']}-{ctx['provider']}"
+        module = db.query(Module).filter_by(id=module_id).first()
+        if not module:
+            module = Module(
+                id=module_id,
+                namespace=ctx["namespace"],
+                name=ctx["name"],
+                provider=ctx["provider"],
+                version=ctx["version"],
+                source_url=ctx.get("repository_url")
+            )
+            db.add(module)
+            db.flush()
+        else:
+            module.version = ctx["version"]
+
+        version_id = f"{module_id}-{ctx['version']}"
+        db.add(ModuleVersion(
+            id=version_id,
+            module_id=module.id,
+            version=ctx["version"],
+            protocols=["5.0"],
+            source_zip=final_zip,
+            repository_url=ctx.get("repository_url")
+        ))
+        # Fails for an existing version before its stored archive is touched
+        db.flush()
+        if parsed is not None:
+            db.add_all(DependencyManager.build_edges(version_id, parsed))
+            db.add_all(RequirementIndex.build_requirements(version_id, module.id, parsed))
+            db.add_all(ManifestStore.manifest_rows(version_id, parsed))
+        archive = ctx.get("archive")
+        if archive:
+            db.add(ModuleArchive(
+                version_id=version_id,
+                digest=archive["digest"],
+                original_size=archive["original_size"],
+                archive_size=archive["archive_size"],
+                tar_gz_size=archive["tar_gz_size"],
+                tar_gz_digest=archive.get("tar_gz_digest")
+            ))
+        db.flush()
+        ModuleStorage.promote(ctx["source_zip"], final_zip)
+        promoted = True
+        db.commit()
+        return {"module_id": module_id, "version_id": version_id, "source_zip": final_zip}
+    except IntegrityError as e:
+        db.rollback()
+        _unpromote(ctx, final_zip, promoted)
+        raise StageError({"version": f"Version {ctx['version']} already exists: {e.orig}"}, permanent=True)
+    except Exception:
+        db.rollback()
+        _unpromote(ctx, final_zip, promoted)
+        raise
+    finally:
+        db.close()
+
+def _unpromote(ctx: Dict[str, Any], final_zip: str, promoted: bool) -> None:
+    # Put the archive back where a retry of the job will look for it
+    if promoted and ctx["source_zip"] != final_zip:
+        os.rename(os.path.dirname(final_zip), os.path.dirname(ctx["source_zip"]))
+
+class UploadPipeline:
+    """Ordered list of named stages applied to an upload job.
+
+    Each stage receives the job context (the job coordinates plus the outputs
+    of earlier stages) and returns a dict that is merged back into it. Stages
+    that already succeeded on a previous attempt are skipped on retry.
+    """
+
+    def __init__(self, stages: Optional[List[Tuple[str, Stage]]] = None):
+        self.stages: List[Tuple[str, Stage]] = list(stages) if stages is not None else [
+            ("normalize", normalize_stage),
+            ("prevalidate", prevalidate_stage),
+            ("validate", validate_stage),
+            ("github", github_stage),
+            ("register", register_stage)
+        ]
+
+    @property
+    def stage_names(self) -> List[str]:
+        return [name for name, _ in self.stages]
+
+    def add_stage(self, name: str, stage: Stage, before: Optional[str] = None) -> None:
+        """Insert a stage, optionally ahead of an existing one"""
+        if before is None:
+            self.stages.append((name, stage))
+            return
+        index = self.stage_names.index(before)
+        self.stages.insert(index, (name, stage))
+
+    def remove_stage(self, name: str) -> None:
+        self.stages = [(n, s) for n, s in self.stages if n != name]
+
+default_pipeline = UploadPipeline()
@@ -0,0 +1,233 @@
+"""Database-backed job queue for asynchronous module uploads"""
+import os
+import uuid
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, Optional
+from sqlalchemy import func
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.models import UploadJob
+from .scheduler import INTERACTIVE, LANES, Candidate, FairScheduler, estimate_size
+
+logger = logging.getLogger(__name__)
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+class JobQueue:
+    """Persistent queue of upload jobs stored in the ``upload_jobs`` table.
+
+    Jobs are claimed with a conditional UPDATE so several worker processes can
+    share one database without handing the same job out twice. A claimed job
+    holds a lease; jobs whose lease expires (for example because the worker
+    process died) are put back on the queue by ``requeue_stale``. Which
+    runnable job is claimed next is decided by ``FairScheduler``.
+    """
+
+    def __init__(self, session_factory: Callable[[], Session] = SessionLocal):
+        self.session_factory = session_factory
+        self.max_attempts = int(os.getenv("UPLOAD_JOB_MAX_ATTEMPTS", 3))
+        self.retry_delay = float(os.getenv("UPLOAD_JOB_RETRY_DELAY", 5))
+        self.lease_timeout = float(os.getenv("UPLOAD_JOB_LEASE_TIMEOUT", 900))
+        # How many runnable jobs the scheduler looks at per claim, and at most
+        # how many of them come from one lane of one namespace
+        self.scan_limit = int(os.getenv("SCHEDULER_SCAN_LIMIT", 1000))
+        self.namespace_scan_limit = int(os.getenv("SCHEDULER_NAMESPACE_SCAN_LIMIT", 50))
+        self.scheduler = FairScheduler()
+
+    def enqueue(self, namespace: str, name: str, provider: str, version: str,
+                source_zip: str, result: Optional[Dict[str, Any]] = None,
+                lane: str = INTERACTIVE, job_id: Optional[str] = None) -> str:
+        """Add a job for an archive that is already in storage and return its id"""
+        if lane not in LANES:
+            raise ValueError(f"Unknown lane: {lane}")
+        job_id = job_id or uuid.uuid4().hex
+        size_bytes, roots = estimate_size(source_zip)
+        db = self.session_factory()
+        try:
+            db.add(UploadJob(
+                id=job_id,
+                namespace=namespace,
+                name=name,
+                provider=provider,
+                version=version,
+                source_zip=source_zip,
+                status=QUEUED,
+                lane=lane,
+                size_bytes=size_bytes,
+                roots=roots,
+                attempts=0,
+                max_attempts=self.max_attempts,
+                stages={},
+                result=result or {},
+                available_at=datetime.utcnow()
+            ))
+            db.commit()
+        finally:
+            db.close()
+        logger.debug(f"Enqueued upload job {job_id} for {namespace}/{name}/{provider}/{version}")
+        return job_id
+
+    def claim(self, worker_id: str) -> Optional[Dict[str, Any]]:
+        """Claim the next runnable job chosen by the scheduler, returning a snapshot of it or None"""
+        db = self.session_factory()
+        try:
+            now = datetime.utcnow()
+            # Oldest jobs of every lane and namespace first, so a large backlog in
+            # one of them can't push the others out of the scanned window
+            rank = func.row_number().over(
+                partition_by=(UploadJob.lane, UploadJob.namespace), order_by=UploadJob.available_at
+            ).label("rank")
+            runnable = db.query(
+                UploadJob.id, UploadJob.namespace, UploadJob.lane,
+                UploadJob.size_bytes, UploadJob.roots, UploadJob.available_at, rank
+            ).filter(
+                UploadJob.status == QUEUED,
+                UploadJob.available_at <= now
+            ).subquery()
+            candidates = [Candidate(*row) for row in db.query(
+                runnable.c.id, runnable.c.namespace, runnable.c.lane,
+                runnable.c.size_bytes, runnable.c.roots, runnable.c.available_at
+            ).filter(
+                runnable.c.rank <= self.namespace_scan_limit
+            ).order_by(runnable.c.rank, runnable.c.available_at).limit(self.scan_limit).all()]
+            if not candidates:
+                return None
+            running = dict(db.query(UploadJob.namespace, func.count(UploadJob.id)).filter(
+                UploadJob.status == RUNNING
+            ).group_by(UploadJob.namespace).all())
+
+            for candidate in self.scheduler.order(candidates, running, now)[:5]:
+                job_id = candidate.id
+                claimed = db.query(UploadJob).filter(
+                    UploadJob.id == job_id,
+                    UploadJob.status == QUEUED
+                ).update({
+                    UploadJob.status: RUNNING,
+                    UploadJob.locked_by: worker_id,
+                    UploadJob.locked_at: now,
+                    UploadJob.attempts: UploadJob.attempts + 1
+                }, synchronize_session=False)
+                db.commit()
+                if claimed:
+                    self.scheduler.record_wait(candidate.lane, (now - candidate.available_at).total_seconds())
+                    return _snapshot(db.query(UploadJob).filter_by(id=job_id).first())
+            return None
+        finally:
+            db.close()
+
+    def update_stages(self, job_id: str, stages: Dict[str, Any], result: Dict[str, Any]) -> None:
+        """Persist per-stage progress and the outputs gathered so far"""
+        self._update(job_id, stages=dict(stages), result=_persistable(result), locked_at=datetime.utcnow())
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._update(job_id, status=SUCCEEDED, result=_persistable(result), error=None,
+                     locked_by=None, locked_at=None)
+
+    def fail(self, job_id: str, error: Dict[str, Any], retry: bool = True) -> bool:
+        """Record a failure; returns True if the job was scheduled for another attempt"""
+        db = self.session_factory()
+        try:
+            job = db.query(UploadJob).filter_by(id=job_id).first()
+            if not job:
+                return False
+            job.error = error
+            job.locked_by = None
+            job.locked_at = None
+            if retry and job.attempts < job.max_attempts:
+                job.status = QUEUED
+                delay = self.retry_delay * (2 ** (job.attempts - 1))
+                job.available_at = datetime.utcnow() + timedelta(seconds=delay)
+                rescheduled = True
+            else:
+                job.status = FAILED
+                rescheduled = False
+            db.commit()
+            return rescheduled
+        finally:
+            db.close()
+
+    def requeue_stale(self) -> int:
+        """Return jobs whose worker lease has expired to the queue"""
+        db = self.session_factory()
+        try:
+            cutoff = datetime.utcnow() - timedelta(seconds=self.lease_timeout)
+            count = db.query(UploadJob).filter(
+                UploadJob.status == RUNNING,
+                UploadJob.locked_at < cutoff
+            ).update({
+                UploadJob.status: QUEUED,
+                UploadJob.locked_by: None,
+                UploadJob.locked_at: None,
+                UploadJob.available_at: datetime.utcnow()
+            }, synchronize_session=False)
+            db.commit()
+            if count:
+                logger.warning(f"Requeued {count} upload jobs with expired leases")
+            return count
+        finally:
+            db.close()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        db = self.session_factory()
+        try:
+            job = db.query(UploadJob).filter_by(id=job_id).first()
+            return _snapshot(job) if job else None
+        finally:
+            db.close()
+
+    def depth(self) -> int:
+        db = self.session_factory()
+        try:
+            return db.query(UploadJob).filter(UploadJob.status == QUEUED).count()
+        finally:
+            db.close()
+
+    def lane_stats(self) -> Dict[str, Any]:
+        """Queued jobs and claim wait times per scheduling lane"""
+        db = self.session_factory()
+        try:
+            queued = dict(db.query(UploadJob.lane, func.count(UploadJob.id)).filter(
+                UploadJob.status == QUEUED
+            ).group_by(UploadJob.lane).all())
+        finally:
+            db.close()
+        return self.scheduler.stats(queued)
+
+    def _update(self, job_id: str, **values) -> None:
+        db = self.session_factory()
+        try:
+            db.query(UploadJob).filter_by(id=job_id).update(
+                {getattr(UploadJob, key): value for key, value in values.items()},
+                synchronize_session=False
+            )
+            db.commit()
+        finally:
+            db.close()
+
+def _snapshot(job: UploadJob) -> Dict[str, Any]:
+    """Detach a job row into a plain dict that is safe to pass between tasks"""
+    return {
+        "id": job.id,
+        "namespace": job.namespace,
+        "name": job.name,
+        "provider": job.provider,
+        "version": job.version,
+        "source_zip": job.source_zip,
+        "status": job.status,
+        "lane": job.lane,
+        "attempts": job.attempts,
+        "max_attempts": job.max_attempts,
+        "stages": dict(job.stages or {}),
+        "result": dict(job.result or {}),
+        "error": job.error,
+        "created_at": job.created_at.isoformat() if job.created_at else None,
+        "updated_at": job.updated_at.isoformat() if job.updated_at else None
+    }
+
+def _persistable(result: Dict[str, Any]) -> Dict[str, Any]:
+    # Underscored keys (e.g. the parsed module) only live for one attempt
+    return {key: value for key, value in result.items() if not key.startswith("_")}
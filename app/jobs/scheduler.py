@@ -0,0 +1,108 @@
+"""Order in which queued upload jobs are handed to workers.
+
+Jobs are ordered by three rules:
+
+1. Lanes. Interactive uploads are claimed before bulk imports. A bulk job
+   that has waited longer than ``SCHEDULER_BULK_MAX_WAIT`` seconds competes
+   as if it were interactive, so bulk imports still progress under
+   sustained interactive load.
+2. Fairness between namespaces. Within a lane, the next job comes from the
+   namespace with the fewest jobs running. Ties go to the namespace that
+   has waited longest. One team's 500-module import therefore takes turns
+   with everyone else instead of going first.
+3. Shortest job first within a namespace. The estimated cost is the archive
+   size plus a fixed cost per Terraform root. A job that has waited longer
+   than ``SCHEDULER_MAX_WAIT`` goes ahead of the cost order.
+"""
+import os
+import zipfile
+import posixpath
+import threading
+from collections import defaultdict, deque
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Tuple
+
+INTERACTIVE = "interactive"
+BULK = "bulk"
+LANES = (INTERACTIVE, BULK)
+
+@dataclass
+class Candidate:
+    id: str
+    namespace: str
+    lane: str
+    size_bytes: int
+    roots: int
+    available_at: datetime
+
+def estimate_size(zip_path: str) -> Tuple[int, int]:
+    """Uncompressed size and number of Terraform roots, read from the zip directory only"""
+    try:
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            infos = zip_ref.infolist()
+    except (OSError, zipfile.BadZipFile):
+        return 0, 1
+    roots = {posixpath.dirname(i.filename) for i in infos if i.filename.endswith((".tf", ".tf.json"))}
+    return sum(i.file_size for i in infos), max(len(roots), 1)
+
+class FairScheduler:
+    def __init__(self):
+        self.root_cost = float(os.getenv("SCHEDULER_ROOT_COST", 5 * 1024 * 1024))
+        self.max_wait = float(os.getenv("SCHEDULER_MAX_WAIT", 600))
+        self.bulk_max_wait = float(os.getenv("SCHEDULER_BULK_MAX_WAIT", 900))
+        self._waits: Dict[str, deque] = {lane: deque(maxlen=1000) for lane in LANES}
+        self._lock = threading.Lock()
+
+    def cost(self, candidate: Candidate) -> float:
+        return candidate.size_bytes + self.root_cost * candidate.roots
+
+    def order(self, candidates: Iterable[Candidate], running: Dict[str, int],
+              now: datetime) -> List[Candidate]:
+        """Candidates in the order they should be claimed"""
+        running = defaultdict(int, running)
+        by_lane: Dict[int, Dict[str, List[Candidate]]] = defaultdict(lambda: defaultdict(list))
+        for candidate in candidates:
+            waited = (now - candidate.available_at).total_seconds()
+            promoted = candidate.lane != BULK or waited >= self.bulk_max_wait
+            by_lane[0 if promoted else 1][candidate.namespace].append(candidate)
+
+        ordered: List[Candidate] = []
+        for lane in sorted(by_lane):
+            namespaces = by_lane[lane]
+            for jobs in namespaces.values():
+                jobs.sort(key=lambda c: (
+                    (now - c.available_at).total_seconds() < self.max_wait,
+                    self.cost(c),
+                    c.available_at
+                ))
+            oldest = {ns: min(c.available_at for c in jobs) for ns, jobs in namespaces.items()}
+            # Round-robin over namespaces, least busy and longest waiting first
+            while namespaces:
+                namespace = min(namespaces, key=lambda ns: (running[ns], oldest[ns]))
+                ordered.append(namespaces[namespace].pop(0))
+                running[namespace] += 1
+                if not namespaces[namespace]:
+                    del namespaces[namespace]
+        return ordered
+
+    def record_wait(self, lane: str, seconds: float) -> None:
+        with self._lock:
+            self._waits.setdefault(lane, deque(maxlen=1000)).append(seconds)
+
+    def stats(self, queued: Dict[str, int]) -> Dict[str, Any]:
+        lanes = {}
+        with self._lock:
+            waits = {lane: sorted(values) for lane, values in self._waits.items()}
+        for lane in sorted(set(waits) | set(queued)):
+            values = waits.get(lane, [])
+
+            def percentile(p: float) -> float:
+                return round(values[min(len(values) - 1, int(len(values) * p))] * 1000, 2) if values else 0.0
+
+            lanes[lane] = {
+                "queued": queued.get(lane, 0),
+                "claimed": len(values),
+                "wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)}
+            }
+        return {"lanes": lanes}
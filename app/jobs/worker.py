@@ -0,0 +1,142 @@
+"""Worker pool that drains the upload job queue"""
+import os
+import time
+import socket
+import asyncio
+import logging
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+from .queue import JobQueue
+from .pipeline import UploadPipeline, StageError, default_pipeline
+from ..storage import ModuleStorage
+
+logger = logging.getLogger(__name__)
+
+class WorkerPool:
+    """Runs ``concurrency`` asyncio workers that claim and process upload jobs"""
+
+    def __init__(self, queue: Optional[JobQueue] = None, pipeline: Optional[UploadPipeline] = None,
+                 concurrency: Optional[int] = None, poll_interval: Optional[float] = None):
+        self.queue = queue or JobQueue()
+        self.pipeline = pipeline or default_pipeline
+        self.concurrency = concurrency or int(os.getenv("UPLOAD_WORKERS", 2))
+        self.poll_interval = poll_interval or float(os.getenv("UPLOAD_POLL_INTERVAL", 1.0))
+        self._tasks: List[asyncio.Task] = []
+        self._stopping = asyncio.Event()
+        self._wakeup = asyncio.Event()
+        self._prefix = f"{socket.gethostname()}:{os.getpid()}"
+
+    def start(self) -> None:
+        if self._tasks:
+            return
+        self._stopping.clear()
+        self.queue.requeue_stale()
+        for index in range(self.concurrency):
+            worker_id = f"{self._prefix}:{index}"
+            self._tasks.append(asyncio.create_task(self._run(worker_id), name=f"upload-worker-{index}"))
+        logger.info(f"Started {self.concurrency} upload workers")
+
+    async def stop(self) -> None:
+        self._stopping.set()
+        self._wakeup.set()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job was enqueued"""
+        self._wakeup.set()
+
+    async def _run(self, worker_id: str) -> None:
+        last_requeue = time.monotonic()
+        while not self._stopping.is_set():
+            try:
+                if time.monotonic() - last_requeue > self.queue.lease_timeout / 2:
+                    await asyncio.to_thread(self.queue.requeue_stale)
+                    last_requeue = time.monotonic()
+                job = await asyncio.to_thread(self.queue.claim, worker_id)
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed to poll queue: {str(e)}")
+                job = None
+            if job is None:
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=self.poll_interval)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            await self.process(job)
+
+    async def process(self, job: Dict[str, Any]) -> None:
+        """Run every pending stage of a claimed job and record the outcome"""
+        job_id = job["id"]
+        stages = job["stages"]
+        ctx: Dict[str, Any] = {
+            "job_id": job_id,
+            "namespace": job["namespace"],
+            "name": job["name"],
+            "provider": job["provider"],
+            "version": job["version"],
+            "source_zip": job["source_zip"]
+        }
+        ctx.update(job["result"])
+        for name in self.pipeline.stage_names:
+            stages.setdefault(name, {"status": "pending"})
+
+        for name, stage in self.pipeline.stages:
+            if stages[name].get("status") == "succeeded":
+                continue
+            started = time.perf_counter()
+            stages[name] = {
+                "status": "running",
+                "attempt": job["attempts"],
+                "started_at": datetime.utcnow().isoformat()
+            }
+            await asyncio.to_thread(self.queue.update_stages, job_id, stages, ctx)
+            try:
+                output = await stage(ctx)
+            except Exception as e:
+                permanent = isinstance(e, StageError) and e.permanent
+                detail = e.detail if isinstance(e, StageError) else str(e)
+                stages[name].update({
+                    "status": "failed",
+                    "finished_at": datetime.utcnow().isoformat(),
+                    "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+                    "error": detail
+                })
+                await asyncio.to_thread(self.queue.update_stages, job_id, stages, ctx)
+                if not permanent:
+                    logger.error(f"Stage {name} of job {job_id} failed: {str(e)}", exc_info=True)
+                rescheduled = await asyncio.to_thread(
+                    self.queue.fail, job_id, {"stage": name, "detail": detail}, not permanent
+                )
+                if not rescheduled:
+                    await self._discard_archive(job)
+                return
+
+            if output:
+                ctx.update(output)
+            stages[name].update({
+                "status": "succeeded",
+                "finished_at": datetime.utcnow().isoformat(),
+                "duration_ms": round((time.perf_counter() - started) * 1000, 2)
+            })
+            await asyncio.to_thread(self.queue.update_stages, job_id, stages, ctx)
+
+        await asyncio.to_thread(self.queue.complete, job_id, ctx)
+        logger.debug(f"Upload job {job_id} completed")
+
+    async def _discard_archive(self, job: Dict[str, Any]) -> None:
+        try:
+            await ModuleStorage.discard_upload(job["source_zip"])
+        except Exception as e:
+            logger.error(f"Failed to remove archive for job {job['id']}: {str(e)}")
+
+_worker_pool: Optional[WorkerPool] = None
+
+def get_worker_pool() -> WorkerPool:
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = WorkerPool()
+    return _worker_pool
@@ -1,26 +1,41 @@
-from fastapi import FastAPI, File, HTTPException, Depends, Request, UploadFile
+from fastapi import FastAPI, File, Form, HTTPException, Depends, Request, UploadFile
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, FileResponse, Response, StreamingResponse
 from .database import get_db, engine
 from .models.base import Base
-from .models.models import Module, ModuleVersion
+from .models.models import Module, ModuleVersion, ModuleArchive
 from sqlalchemy.orm import Session
 from typing import Dict, Any, List, Optional
 from pydantic import BaseModel
 from datetime import datetime
 from pathlib import Path
-from .auth import check_permissions, Permission, verify_token
+from .auth import check_permissions, Permission, verify_token, get_token_cache
+from .auth.tokens import token_digest
 from .cache import CacheService, get_cache_service, get_redis_client
 from .rate_limiter import RateLimiter, get_rate_limiter
+from .middleware import RateLimitMiddleware, RequestIdMiddleware, TimingMiddleware
 from .stats import StatsTracker, get_stats_tracker
 from .validation import ModuleValidator
 from .storage import ModuleStorage
 from .docs import DocGenerator
+from .doc_artifacts import FORMATS as DOC_FORMATS, DocArtifactError, get_doc_store
 from .github import GitHubService
 from .search import SearchService
-from .dependencies import DependencyManager
+from .dependencies import DependencyManager, ReverseDependencyIndex, get_dependency_resolver
+from .jobs import JobQueue, INTERACTIVE, BULK, LANES, default_pipeline, get_worker_pool
+from .storage.gc import StorageGarbageCollector, run_periodically
+from .storage.disk_cache import get_disk_cache
+from .storage.normalize import sha256_file
+from .validation.plugins import get_provider_cache
+from .validation.runner import get_terraform_runner
+from .validation.workers import get_validation_workers
+from .validation.manifest import ManifestStore
+from .validation.binaries import get_binary_manager, configured_versions
+import asyncio
+import json
 import logging
 import os
+import uuid
 
 # Configure logging
 logging.basicConfig(level=logging.DEBUG)
@@ -35,13 +50,59 @@ app = FastAPI(
 # Create database tables
 Base.metadata.create_all(bind=engine)
 
-class ModuleVersion(BaseModel):
+job_queue = JobQueue()
+
+@app.on_event("startup")
+async def start_upload_workers():
+    if int(os.getenv("UPLOAD_WORKERS", 2)) > 0:
+        await get_validation_workers().start()
+        get_worker_pool().start()
+
+@app.on_event("shutdown")
+async def stop_upload_workers():
+    await get_worker_pool().stop()
+    await get_validation_workers().stop()
+
+@app.on_event("startup")
+async def start_rate_limit_sync():
+    get_rate_limiter().start()
+
+@app.on_event("shutdown")
+async def flush_rate_limits():
+    await get_rate_limiter().close()
+
+@app.on_event("startup")
+async def warm_provider_mirror():
+    count = int(os.getenv("TERRAFORM_MIRROR_WARM", 0))
+    if count > 0 and os.getenv("TERRAFORM_PROVIDER_MIRROR"):
+        async def warm():
+            try:
+                await asyncio.to_thread(get_provider_cache().warm_mirror, count)
+            except Exception as e:
+                logger.error(f"Failed to warm provider mirror: {str(e)}")
+        app.state.provider_mirror = asyncio.create_task(warm())
+
+@app.on_event("startup")
+async def preinstall_terraform_versions():
+    versions = configured_versions()
+    if versions:
+        app.state.terraform_install = asyncio.create_task(get_binary_manager().preinstall(versions))
+
+@app.on_event("startup")
+async def start_storage_gc():
+    interval = float(os.getenv("GC_INTERVAL", 0))
+    if interval > 0:
+        app.state.storage_gc = asyncio.create_task(
+            run_periodically(StorageGarbageCollector(), interval)
+        )
+
+class ModuleVersionSummary(BaseModel):
     version: str
     protocols: List[str]
     platforms: List[dict]
 
 class ModuleVersions(BaseModel):
-    modules: List[ModuleVersion]
+    modules: List[ModuleVersionSummary]
 
 @app.get("/.well-known/terraform.json")
 async def terraform_discovery():
@@ -50,6 +111,10 @@ async def terraform_discovery():
         "providers.v1": "/v1/providers/"
     })
 
+@app.get("/health")
+async def health():
+    return {"status": "ok"}
+
 # Initialize services with dependency injection support
 def get_cache_service():
     redis_client = get_redis_client(
@@ -58,9 +123,6 @@ def get_cache_service():
     )
     return CacheService(redis_client=redis_client)
 
-def get_rate_limiter():
-    return RateLimiter()
-
 def get_stats_tracker():
     return StatsTracker()
 
@@ -68,12 +130,10 @@ app.dependency_overrides[get_cache_service] = get_cache_service
 app.dependency_overrides[get_rate_limiter] = get_rate_limiter
 app.dependency_overrides[get_stats_tracker] = get_stats_tracker
 
-@app.middleware("http")
-async def rate_limit_middleware(request: Request, call_next):
-    rate_limiter = get_rate_limiter()
-    if not await rate_limiter.check_rate_limit(str(request.client.host)):
-        raise HTTPException(status_code=429, detail="Rate limit exceeded")
-    return await call_next(request)
+# Added innermost first. The limiter is looked up per request so tests can swap it
+app.add_middleware(RateLimitMiddleware, get_limiter=lambda: get_rate_limiter())
+app.add_middleware(TimingMiddleware)
+app.add_middleware(RequestIdMiddleware)
 
 @app.get("/v1/modules/search")
 async def search_modules(
@@ -82,18 +142,42 @@ async def search_modules(
     namespace: str = None,
     limit: int = 10,
     offset: int = 0,
+    provider_source: Optional[str] = None,
+    provider_version: Optional[str] = None,
+    terraform_version: Optional[str] = None,
     db: Session = Depends(get_db),
     cache_service: CacheService = Depends(get_cache_service)
 ):
-    cache_key = f"search:{query}:{provider}:{namespace}:{limit}:{offset}"
+    """Search modules, optionally only those compatible with a provider and/or Terraform version"""
+    cache_key = (f"search:{query}:{provider}:{namespace}:{limit}:{offset}:"
+                 f"{provider_source}:{provider_version}:{terraform_version}")
     cached_result = await cache_service.get(cache_key)
     if cached_result:
         return cached_result
-        
-    results = await SearchService.search_modules(
-        db, query, provider, namespace, limit, offset
-    )
-    response = {"modules": [module.dict() for module in results]}
+
+    try:
+        results = await SearchService.search_modules(
+            db, query, provider, namespace, limit, offset,
+            provider_source=provider_source,
+            provider_version=provider_version,
+            terraform_version=terraform_version
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    response = {"modules": [
+        {
+            "id": f"{module.namespace}/{module.name}/{module.provider}/{module.version}",
+            "owner": module.owner,
+            "namespace": module.namespace,
+            "name": module.name,
+            "version": module.version,
+            "provider": module.provider,
+            "description": module.description,
+            "source": module.source_url,
+            "published_at": module.published_at.isoformat() if module.published_at else None
+        }
+        for module in results
+    ]}
     await cache_service.set(cache_key, response)
     return response
 
@@ -124,41 +208,205 @@ async def list_versions(
         logger.error(f"Error listing versions: {str(e)}")
         raise
 
+ARCHIVE_FORMATS = {
+    "zip": ("module.zip", "application/zip"),
+    "tar.gz": ("module.tar.gz", "application/gzip")
+}
+
+def _find_version(db: Session, namespace: str, name: str, provider: str, version: str):
+    return db.query(ModuleVersion).join(Module).filter(
+        Module.namespace == namespace,
+        Module.name == name,
+        Module.provider == provider,
+        ModuleVersion.version == version
+    ).first()
+
 @app.get("/v1/modules/{namespace}/{name}/{provider}/{version}/download")
 async def download_module(
     namespace: str, 
     name: str, 
     provider: str, 
     version: str, 
+    format: Optional[str] = None,
     db: Session = Depends(get_db),
     stats_tracker: StatsTracker = Depends(get_stats_tracker),
     token: dict = Depends(verify_token)
 ):
-    module = db.query(Module).filter(
-        Module.namespace == namespace,
-        Module.name == name,
-        Module.provider == provider,
-        Module.version == version
-    ).first()
-    
-    if not module:
+    """Registry protocol download: point Terraform at the smallest archive variant"""
+    module_version = _find_version(db, namespace, name, provider, version)
+    if not module_version:
         raise HTTPException(status_code=404, detail="Module not found")
-    
-    await stats_tracker.track_download(str(module.id))
-    return {"download_url": module.download_url}
 
-@app.post("/api/modules/{namespace}/{name}/{provider}/{version}/upload")
+    if format is None:
+        archive = db.query(ModuleArchive).filter_by(version_id=module_version.id).first()
+        format = "tar.gz" if archive and archive.tar_gz_size and archive.tar_gz_size < archive.archive_size else "zip"
+    if format not in ARCHIVE_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported archive format: {format}")
+
+    await stats_tracker.track_download(str(module_version.module_id))
+    filename = ARCHIVE_FORMATS[format][0]
+    return Response(status_code=204, headers={
+        "X-Terraform-Get": f"/v1/modules/{namespace}/{name}/{provider}/{version}/archive/{filename}"
+    })
+
+def _stream_file(handle, media_type: str, filename: str) -> StreamingResponse:
+    """Stream an open file; unlike FileResponse it keeps working if the path is removed meanwhile"""
+    size = os.fstat(handle.fileno()).st_size
+
+    def chunks():
+        with handle:
+            for chunk in iter(lambda: handle.read(1024 * 1024), b""):
+                yield chunk
+
+    return StreamingResponse(chunks(), media_type=media_type, headers={
+        "Content-Length": str(size),
+        "Content-Disposition": f'attachment; filename="{filename}"'
+    })
+
+@app.get("/v1/modules/{namespace}/{name}/{provider}/{version}/archive/{filename}")
+async def get_module_archive(
+    namespace: str,
+    name: str,
+    provider: str,
+    version: str,
+    filename: str,
+    db: Session = Depends(get_db),
+    token: dict = Depends(verify_token)
+):
+    """Serve a stored archive variant (module.zip or module.tar.gz)"""
+    media_types = dict(ARCHIVE_FORMATS.values())
+    if filename not in media_types:
+        raise HTTPException(status_code=404, detail="Archive not found")
+    module_version = _find_version(db, namespace, name, provider, version)
+    if not module_version or not module_version.source_zip:
+        raise HTTPException(status_code=404, detail="Module not found")
+    path = Path(module_version.source_zip).with_name(filename)
+    cache = get_disk_cache()
+    archive = db.query(ModuleArchive).filter_by(version_id=module_version.id).first() if cache else None
+    digest = None
+    if archive:
+        digest = archive.digest if filename == "module.zip" else archive.tar_gz_digest
+    if digest:
+        key = os.path.relpath(path, ModuleStorage.BASE_PATH)
+        try:
+            handle = await cache.open(key, digest)
+        except FileNotFoundError:
+            raise HTTPException(status_code=404, detail="Archive not found")
+        return _stream_file(handle, media_types[filename], filename)
+    elif not path.exists():
+        raise HTTPException(status_code=404, detail="Archive not found")
+    return FileResponse(path, media_type=media_types[filename], filename=filename)
+
+@app.get("/v1/modules/{namespace}/{name}/{provider}/{version}/docs")
+async def get_module_docs(
+    namespace: str,
+    name: str,
+    provider: str,
+    version: str,
+    request: Request,
+    format: str = "json",
+    db: Session = Depends(get_db)
+):
+    """Rendered documentation (json, md or html), generated on first request"""
+    if format not in DOC_FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unsupported docs format: {format}")
+    module_version = _find_version(db, namespace, name, provider, version)
+    if not module_version or not module_version.source_zip:
+        raise HTTPException(status_code=404, detail="Module not found")
+    archive = db.query(ModuleArchive).filter_by(version_id=module_version.id).first()
+    if archive:
+        digest = archive.digest
+    elif os.path.exists(module_version.source_zip):
+        digest = await asyncio.to_thread(sha256_file, module_version.source_zip)
+    else:
+        raise HTTPException(status_code=404, detail="Archive not found")
+
+    store = get_doc_store()
+    try:
+        await store.ensure(digest, module_version.source_zip)
+    except DocArtifactError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+    path, encoding = store.variant(digest, format, request.headers.get("accept-encoding", ""))
+    headers = {
+        "ETag": store.etag(digest, format, encoding),
+        "Cache-Control": "public, max-age=86400",
+        "Vary": "Accept-Encoding"
+    }
+    if request.headers.get("if-none-match") == headers["ETag"]:
+        return Response(status_code=304, headers=headers)
+    if encoding:
+        headers["Content-Encoding"] = encoding
+    return FileResponse(path, media_type=DOC_FORMATS[format][1], headers=headers)
+
+async def _parsed_version(db: Session, module_version: ModuleVersion):
+    """Parsed .tf files of a version from the manifest store, filling it from the archive if missing"""
+    parsed = ManifestStore.load(db, module_version.id)
+    if parsed is not None:
+        return parsed
+    if not module_version.source_zip or not os.path.exists(module_version.source_zip):
+        raise HTTPException(status_code=404, detail=f"Archive for version {module_version.version} not found")
+    parsed, errors = await get_validation_workers().run("prevalidate", module_version.source_zip)
+    if errors:
+        raise HTTPException(status_code=422, detail={"version": module_version.version, "errors": errors})
+    await asyncio.to_thread(ManifestStore.record, module_version.id, parsed)
+    return parsed
+
+@app.get("/v1/modules/{namespace}/{name}/{provider}/{version}/diff")
+async def diff_module_versions(
+    namespace: str,
+    name: str,
+    provider: str,
+    version: str,
+    base: str,
+    db: Session = Depends(get_db)
+):
+    """Input, output, resource and requirement changes from version ``base`` to ``version``"""
+    target = _find_version(db, namespace, name, provider, version)
+    previous = _find_version(db, namespace, name, provider, base)
+    if not target or not previous:
+        raise HTTPException(status_code=404, detail="Module not found")
+    old_docs = DocGenerator.generate_from_parsed(await _parsed_version(db, previous))
+    new_docs = DocGenerator.generate_from_parsed(await _parsed_version(db, target))
+    return {"module": f"{namespace}/{name}/{provider}", "from": base, "to": version, **DocGenerator.diff(old_docs, new_docs)}
+
+@app.get("/api/admin/storage/cache")
+async def get_storage_cache_stats(
+    _: dict = Depends(check_permissions([Permission.DELETE_MODULE]))
+):
+    """Hit ratio and bytes served by the local archive cache"""
+    cache = get_disk_cache()
+    if not cache:
+        return {"enabled": False}
+    return {"enabled": True, **cache.stats()}
+
+@app.get("/api/admin/validation/stats")
+async def get_validation_stats(
+    _: dict = Depends(check_permissions([Permission.DELETE_MODULE]))
+):
+    """Validation slot usage: queue depth, running jobs and wait times"""
+    return {**get_terraform_runner().stats(), "workers": get_validation_workers().stats()}
+
+@app.post("/api/modules/{namespace}/{name}/{provider}/{version}/upload", status_code=202)
 async def upload_module(
     namespace: str,
     name: str,
     provider: str,
     version: str,
     file: UploadFile = File(...),
+    lane: str = Form(INTERACTIVE),
     db: Session = Depends(get_db),
     _: dict = Depends(check_permissions([Permission.UPLOAD_MODULE]))
 ):
+    """Store an uploaded module archive and queue it for processing.
+
+    Validation, documentation, repository creation and registration run in
+    the upload worker pool; poll the returned status URL for progress.
+    Imports pass ``lane=bulk`` so they queue behind interactive uploads.
+    """
     try:
         logger.debug(f"Starting upload for {namespace}/{name}/{provider}/{version}")
+        if lane not in LANES:
+            raise HTTPException(status_code=400, detail=f"Lane must be one of: {', '.join(LANES)}")
         
         # Validate metadata first
         logger.debug("Validating metadata")
@@ -168,80 +416,27 @@ async def upload_module(
         if not is_valid_metadata:
             logger.error(f"Metadata validation failed: {metadata_errors}")
             raise HTTPException(status_code=400, detail=metadata_errors)
+        if _find_version(db, namespace, name, provider, version):
+            raise HTTPException(status_code=409, detail=f"Version {version} already exists")
 
-        # Save the uploaded file first
+        # Stage the uploaded file under the job; it moves to the version path on registration
         logger.debug("Saving uploaded file")
         storage = ModuleStorage()
-        temp_path = await storage.save_module(namespace, name, provider, version, file)
+        job_id = uuid.uuid4().hex
+        temp_path = await storage.save_upload(job_id, namespace, name, file)
         logger.debug(f"File saved to {temp_path}")
 
-        # Now validate the saved file
-        logger.debug("Validating module structure")
-        is_valid_structure, structure_errors = ModuleValidator.validate_module_structure(temp_path)
-        if not is_valid_structure:
-            logger.error(f"Structure validation failed: {structure_errors}")
-            # Clean up the invalid module
-            await storage.delete_module(namespace, name, provider, version)
-            raise HTTPException(status_code=400, detail=structure_errors)
-        
-        # Generate documentation from the saved file
-        logger.debug("Generating documentation")
-        docs = DocGenerator.generate_module_docs(Path(temp_path).parent)
-        
-        # Create GitHub repository if configured
-        repo_url = None
-        if os.getenv("GITHUB_TOKEN"):
-            logger.debug("Creating GitHub repository")
-            github_service = GitHubService(os.getenv("GITHUB_TOKEN"))
-            repo_url = await github_service.create_module_repo(
-                namespace, name, provider, version, Path(temp_path).parent
-            )
-        
-        # Create database entries
-        logger.debug("Creating database entries")
-        try:
-            # Create or get the module first
-            module_id = f"{namespace}-{name}-{provider}"
-            module = db.query(Module).filter_by(id=module_id).first()
-            if not module:
-                module = Module(
-                    id=module_id,
-                    namespace=namespace,
-                    name=name,
-                    provider=provider,
-                    source=repo_url
-                )
-                db.add(module)
-                db.flush()  # Flush to get the module.id
-            
-            # Now create the module version
-            module_version = ModuleVersion(
-                id=f"{module_id}-{version}",
-                module_id=module.id,  # Use the module.id from the existing or newly created module
-                version=version,
-                protocols=["5.0"],
-                platforms=[{"os": "linux", "arch": "amd64"}],
-                source_zip=temp_path,
-                documentation=docs,
-                repository_url=repo_url
-            )
-            db.add(module_version)
-            db.commit()
-            logger.debug("Database entries created successfully")
-            
-        except Exception as db_error:
-            logger.error(f"Database error: {str(db_error)}")
-            db.rollback()
-            # Clean up stored module on database failure
-            await storage.delete_module(namespace, name, provider, version)
-            raise HTTPException(status_code=500, detail=f"Failed to save module metadata: {str(db_error)}")
-        
-        return {
-            "status": "success",
+        await asyncio.to_thread(
+            job_queue.enqueue, namespace, name, provider, version, temp_path, lane=lane, job_id=job_id
+        )
+        get_worker_pool().notify()
+
+        return JSONResponse(status_code=202, content={
+            "status": "queued",
+            "job_id": job_id,
             "file_path": temp_path,
-            "documentation": docs,
-            "repository_url": repo_url
-        }
+            "status_url": f"/api/jobs/{job_id}"
+        })
         
     except HTTPException:
         raise
@@ -249,6 +444,163 @@ async def upload_module(
         logger.error(f"Unexpected error in upload_module: {str(e)}", exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", 100))
+MAX_BATCH_BYTES = int(os.getenv("MAX_BATCH_BYTES", 512 * 1024 ** 2))
+
+@app.post("/api/modules/batch", status_code=202)
+async def upload_module_batch(
+    request: Request,
+    db: Session = Depends(get_db),
+    _: dict = Depends(check_permissions([Permission.UPLOAD_MODULE]))
+):
+    """Store many module archives from one multipart request and queue each one.
+
+    The form holds a ``manifest`` field and the archives as ``files``.
+    ``manifest`` is a JSON list with one entry per file:
+    ``{"filename", "namespace", "name", "provider", "version"}``. Entries are
+    accepted or rejected individually so one bad module doesn't fail the batch.
+
+    The body is parsed here rather than by FastAPI so ``MAX_BATCH_BYTES`` and
+    ``MAX_BATCH_FILES`` are enforced before an oversized batch is spooled.
+    """
+    length = request.headers.get("content-length")
+    if length is None or not length.isdigit():
+        raise HTTPException(status_code=411, detail="Batch uploads must send a Content-Length")
+    if int(length) > MAX_BATCH_BYTES:
+        raise HTTPException(status_code=413, detail=f"Batch may be at most {MAX_BATCH_BYTES} bytes")
+    # One file past the limit is enough to reject the batch
+    form = await request.form(max_files=MAX_BATCH_FILES + 1)
+    try:
+        manifest = form.get("manifest")
+        files = [f for f in form.getlist("files") if not isinstance(f, str)]
+        if not isinstance(manifest, str) or not files:
+            raise HTTPException(status_code=400, detail="Batch needs a manifest field and at least one file")
+        if len(files) > MAX_BATCH_FILES:
+            raise HTTPException(status_code=413, detail=f"Batch may contain at most {MAX_BATCH_FILES} files")
+        return await _queue_batch(manifest, files, db)
+    finally:
+        await form.close()
+
+async def _queue_batch(manifest: str, files: List[UploadFile], db: Session) -> JSONResponse:
+    try:
+        entries = json.loads(manifest)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="Manifest must be valid JSON")
+    if not isinstance(entries, list):
+        raise HTTPException(status_code=400, detail="Manifest must be a list of modules")
+
+    uploads: Dict[str, UploadFile] = {}
+    duplicates = set()
+    for upload in files:
+        if upload.filename in uploads:
+            duplicates.add(upload.filename)
+        uploads[upload.filename] = upload
+    storage = ModuleStorage()
+    results = []
+    claimed = set()
+    for entry in entries:
+        if not isinstance(entry, dict):
+            results.append({"filename": None, "module": None, "status": "rejected",
+                            "errors": {"entry": "Manifest entries must be objects"}})
+            continue
+        coordinates = {key: entry.get(key) for key in ("namespace", "name", "provider", "version")}
+        filename = entry.get("filename")
+        result = {"filename": filename, "module": coordinates}
+        type_errors = {key: f"{key} must be a string" for key, value in {**coordinates, "filename": filename}.items()
+                       if not isinstance(value, str)}
+        if type_errors:
+            results.append({**result, "status": "rejected", "errors": type_errors})
+            continue
+        if filename in duplicates:
+            results.append({**result, "status": "rejected", "errors": {"file": "More than one file with this name in the request"}})
+            continue
+        if filename in claimed:
+            results.append({**result, "status": "rejected", "errors": {"file": "File is used by an earlier entry"}})
+            continue
+        upload = uploads.get(filename)
+        if upload is None:
+            results.append({**result, "status": "rejected", "errors": {"file": "No file with this name in the request"}})
+            continue
+        claimed.add(filename)
+        is_valid, errors = ModuleValidator.validate_module_metadata(**coordinates)
+        if not is_valid:
+            results.append({**result, "status": "rejected", "errors": errors})
+            continue
+        if _find_version(db, **coordinates):
+            results.append({**result, "status": "rejected", "errors": {"version": "Version already exists"}})
+            continue
+        try:
+            job_id = uuid.uuid4().hex
+            path = await storage.save_upload(job_id, coordinates["namespace"], coordinates["name"], upload)
+            await asyncio.to_thread(job_queue.enqueue, source_zip=path, lane=BULK, job_id=job_id, **coordinates)
+        except Exception as e:
+            logger.error(f"Failed to queue {coordinates} from batch: {str(e)}", exc_info=True)
+            results.append({**result, "status": "error", "errors": {"upload": str(e)}})
+            continue
+        results.append({**result, "status": "queued", "job_id": job_id, "status_url": f"/api/jobs/{job_id}"})
+
+    get_worker_pool().notify()
+    return JSONResponse(status_code=202, content={
+        "queued": sum(1 for r in results if r["status"] == "queued"),
+        "rejected": sum(1 for r in results if r["status"] != "queued"),
+        "results": results
+    })
+
+@app.get("/api/admin/jobs/stats")
+async def get_job_queue_stats(
+    _: dict = Depends(check_permissions([Permission.DELETE_MODULE]))
+):
+    """Queued jobs and claim wait times per scheduling lane"""
+    return await asyncio.to_thread(job_queue.lane_stats)
+
+@app.get("/api/jobs/{job_id}")
+async def get_upload_job(
+    job_id: str,
+    _: dict = Depends(check_permissions([Permission.UPLOAD_MODULE]))
+):
+    """Report the status of an upload job with per-stage progress and timings"""
+    job = await asyncio.to_thread(job_queue.get, job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    stages = job["stages"]
+    return {
+        "id": job["id"],
+        "status": job["status"],
+        "module": {
+            "namespace": job["namespace"],
+            "name": job["name"],
+            "provider": job["provider"],
+            "version": job["version"]
+        },
+        "lane": job["lane"],
+        "attempts": job["attempts"],
+        "max_attempts": job["max_attempts"],
+        "stages": [
+            {"name": name, **stages.get(name, {"status": "pending"})}
+            for name in default_pipeline.stage_names
+        ],
+        "result": {
+            key: job["result"].get(key)
+            for key in ("module_id", "version_id", "repository_url", "archive", "validation")
+            if key in job["result"]
+        },
+        "error": job["error"],
+        "created_at": job["created_at"],
+        "updated_at": job["updated_at"]
+    }
+
+@app.post("/api/admin/storage/gc")
+async def collect_storage_garbage(
+    dry_run: bool = True,
+    grace_period: Optional[float] = None,
+    keep_prereleases: Optional[int] = None,
+    _: dict = Depends(check_permissions([Permission.DELETE_MODULE]))
+):
+    """Reconcile module storage against the database; dry run by default"""
+    collector = StorageGarbageCollector(grace_period=grace_period, keep_prereleases=keep_prereleases)
+    report = await collector.run(dry_run=dry_run)
+    return report.to_dict()
+
 @app.get("/v1/modules/{namespace}/{name}/{provider}/{version}/dependencies")
 async def get_module_dependencies(
     namespace: str,
@@ -257,12 +609,68 @@ async def get_module_dependencies(
     version: str,
     db: Session = Depends(get_db)
 ):
-    module_path = ModuleStorage.get_module_path(namespace, name, provider, version)
-    if not module_path:
+    """Direct module calls and the transitive closure resolved against published versions"""
+    module_version = _find_version(db, namespace, name, provider, version)
+    if not module_version:
         raise HTTPException(status_code=404, detail="Module not found")
-        
-    dependencies = DependencyManager.parse_dependencies(module_path.parent)
-    return {"dependencies": dependencies}
+    resolution = await asyncio.to_thread(
+        get_dependency_resolver().resolve, module_version.module_id, module_version.id
+    )
+    return {"module": f"{namespace}/{name}/{provider}", "version": version, **resolution.to_dict()}
+
+@app.get("/v1/modules/{namespace}/{name}/{provider}/dependents")
+async def get_module_dependents(
+    namespace: str,
+    name: str,
+    provider: str,
+    version: Optional[str] = None,
+    transitive: bool = False,
+    limit: int = 50,
+    offset: int = 0,
+    db: Session = Depends(get_db)
+):
+    """Published module versions that call this module, optionally only those whose constraint admits ``version``"""
+    if limit < 1 or limit > 500 or offset < 0:
+        raise HTTPException(status_code=400, detail="limit must be between 1 and 500 and offset non-negative")
+    module_id = f"{namespace}-{name}-{provider}"
+    if not db.query(Module.id).filter_by(id=module_id).first():
+        raise HTTPException(status_code=404, detail="Module not found")
+    try:
+        dependents = ReverseDependencyIndex.dependents(db, module_id, version, transitive)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    return {
+        "module": f"{namespace}/{name}/{provider}",
+        "version": version,
+        "transitive": transitive,
+        "total": len(dependents),
+        "limit": limit,
+        "offset": offset,
+        "dependents": dependents[offset:offset + limit]
+    }
+
+@app.post("/api/admin/dependencies/reindex")
+async def reindex_dependencies(
+    _: dict = Depends(check_permissions([Permission.DELETE_MODULE]))
+):
+    """Record dependency edges for versions uploaded before edges were extracted"""
+    return await DependencyManager.reindex()
+
+class RevokeTokenRequest(BaseModel):
+    jti: Optional[str] = None
+    token: Optional[str] = None
+
+@app.post("/api/admin/auth/revoke")
+async def revoke_token(
+    request: RevokeTokenRequest,
+    _: dict = Depends(check_permissions([Permission.MANAGE_USERS]))
+):
+    """Reject a token from now on, identified by its ``jti`` claim or the token itself"""
+    if not request.jti and not request.token:
+        raise HTTPException(status_code=400, detail="Provide a jti or a token")
+    value = request.jti or token_digest(request.token)
+    get_token_cache().revoke(value)
+    return {"revoked": value}
 
 @app.get("/v1/modules/{namespace}/{name}/{provider}/stats")
 async def get_module_stats(
@@ -1,3 +1,13 @@
-from .rate_limiter import RateLimiter
+from .rate_limiter import RateLimiter, RateLimitMiddleware
+from .request import RequestIdMiddleware, TimingMiddleware
+from .policies import RatePolicies, RouteClass, get_rate_policies
 
-__all__ = ['RateLimiter']
\ No newline at end of file
+__all__ = [
+    'RateLimiter',
+    'RateLimitMiddleware',
+    'RequestIdMiddleware',
+    'TimingMiddleware',
+    'RatePolicies',
+    'RouteClass',
+    'get_rate_policies'
+]
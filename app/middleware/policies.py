@@ -0,0 +1,160 @@
+"""Rate-limit policies: what a request costs and whose budget pays for it.
+
+Routes are grouped into classes, each with a cost and the budget it draws
+from. Cheap registry reads draw from ``read``; operations that occupy the
+validation workers or walk the dependency graph draw from ``heavy``, so a
+flood of uploads cannot starve downloads and the other way round. Budgets
+are per principal: the JWT subject when the request carries a valid token,
+its client address otherwise. Their sizes depend on the principal's role,
+so admins and CI service accounts get their own quotas.
+
+Discovery, health and API description endpoints bypass limiting altogether:
+no limiter call and no token verification. ``RATE_LIMIT_BYPASS`` replaces
+that list (comma separated; a trailing ``*`` matches a prefix).
+
+``RATE_LIMIT_POLICY_FILE`` may point to a JSON file overriding the defaults:
+``{"costs": {"upload": 30}, "budgets": {"service": {"heavy": 600}}, "bypass": ["/health"]}``.
+"""
+import os
+import re
+import json
+import jwt
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Pattern, Tuple
+from ..auth.auth import get_token_cache
+from ..auth.models import Role, Permission
+
+ANONYMOUS = "anonymous"
+ROLES = {role.value for role in Role}
+
+@dataclass(frozen=True)
+class RouteClass:
+    name: str
+    pattern: Pattern
+    method: Optional[str] = None
+    cost: int = 1
+    budget: str = "read"
+
+    def matches(self, method: str, path: str) -> bool:
+        return (self.method is None or self.method == method) and self.pattern.search(path) is not None
+
+def _route(name: str, pattern: str, method: Optional[str] = None, cost: int = 1, budget: str = "read") -> RouteClass:
+    return RouteClass(name, re.compile(pattern), method, cost, budget)
+
+_VERSION = r"^/v1/modules/[^/]+/[^/]+/[^/]+/[^/]+"
+
+# First match wins, so the catch-all ``admin`` class comes after every admin
+# route with a class of its own; anything unmatched is a registry read
+DEFAULT_ROUTES: List[RouteClass] = [
+    _route("upload", r"^/api/modules/[^/]+/[^/]+/[^/]+/[^/]+/upload$", "POST", cost=10, budget="heavy"),
+    _route("batch_upload", r"^/api/modules/batch$", "POST", cost=50, budget="heavy"),
+    _route("generate", r"^/api/generate$", "POST", cost=20, budget="heavy"),
+    _route("resolve", _VERSION + r"/(dependencies|diff)$", "GET", cost=5, budget="heavy"),
+    _route("resolve", r"^/v1/modules/[^/]+/[^/]+/[^/]+/dependents$", "GET", cost=5, budget="heavy"),
+    _route("docs", _VERSION + r"/docs$", "GET", cost=2),
+    _route("reindex", r"^/api/admin/dependencies/reindex$", "POST", cost=50, budget="heavy"),
+    _route("gc", r"^/api/admin/storage/gc$", "POST", cost=50, budget="heavy"),
+    _route("admin", r"^/api/admin/", cost=1, budget="admin"),
+    _route("read", r"", cost=1)
+]
+
+DEFAULT_BYPASS = "/.well-known/terraform.json,/health,/openapi.json,/docs,/docs/oauth2-redirect,/redoc"
+
+def default_budgets() -> Dict[str, Dict[str, int]]:
+    """Requests per window for each budget, by role"""
+    return {
+        ANONYMOUS: {"read": int(os.getenv("RATE_LIMIT_REQUESTS", 100)), "heavy": 20, "admin": 10},
+        Role.READER.value: {"read": 300, "heavy": 50, "admin": 10},
+        Role.PUBLISHER.value: {"read": 300, "heavy": 200, "admin": 10},
+        Role.SERVICE.value: {"read": 1000, "heavy": 1000, "admin": 10},
+        Role.ADMIN.value: {"read": 1000, "heavy": 500, "admin": 300}
+    }
+
+def default_bypass() -> List[str]:
+    return [p.strip() for p in os.getenv("RATE_LIMIT_BYPASS", DEFAULT_BYPASS).split(",") if p.strip()]
+
+@dataclass(frozen=True)
+class RateDecision:
+    """Key, cost and limit to charge a request with"""
+    key: str
+    cost: int
+    limit: int
+    route: str
+
+class RatePolicies:
+    def __init__(self, routes: Optional[List[RouteClass]] = None,
+                 budgets: Optional[Dict[str, Dict[str, int]]] = None,
+                 bypass: Optional[List[str]] = None):
+        self.routes = list(routes if routes is not None else DEFAULT_ROUTES)
+        self.budgets = {role: dict(limits) for role, limits in (budgets or default_budgets()).items()}
+        bypass = default_bypass() if bypass is None else bypass
+        self._bypass_paths = frozenset(path for path in bypass if not path.endswith("*"))
+        self._bypass_prefixes = tuple(path[:-1] for path in bypass if path.endswith("*"))
+
+    @classmethod
+    def from_file(cls, path: str) -> "RatePolicies":
+        with open(path) as f:
+            overrides = json.load(f)
+        costs = overrides.get("costs", {})
+        routes = [
+            RouteClass(route.name, route.pattern, route.method, int(costs.get(route.name, route.cost)), route.budget)
+            for route in DEFAULT_ROUTES
+        ]
+        budgets = default_budgets()
+        for role, limits in overrides.get("budgets", {}).items():
+            budgets.setdefault(role, {}).update({name: int(limit) for name, limit in limits.items()})
+        return cls(routes, budgets, overrides.get("bypass"))
+
+    def bypasses(self, path: str) -> bool:
+        return path in self._bypass_paths or (bool(self._bypass_prefixes) and path.startswith(self._bypass_prefixes))
+
+    def route_for(self, method: str, path: str) -> RouteClass:
+        for route in self.routes:
+            if route.matches(method, path):
+                return route
+        return self.routes[-1]
+
+    def decide(self, method: str, path: str, authorization: Optional[str] = None,
+               host: Optional[str] = None) -> RateDecision:
+        route = self.route_for(method, path)
+        principal, role = principal_for(authorization, host)
+        budgets = self.budgets.get(role) or self.budgets[ANONYMOUS]
+        limit = budgets.get(route.budget) or budgets["read"]
+        # A cost above the limit could never be admitted
+        return RateDecision(f"{route.budget}:{principal}", min(route.cost, limit), limit, route.name)
+
+def role_for(claims: dict) -> str:
+    """The token's ``role`` claim, or the narrowest role its permissions imply"""
+    role = claims.get("role")
+    if role in ROLES:
+        return role
+    permissions = set(claims.get("permissions", []))
+    if Permission.MANAGE_USERS.value in permissions:
+        return Role.ADMIN.value
+    if Permission.UPLOAD_MODULE.value in permissions or Permission.GENERATE_MODULE.value in permissions:
+        return Role.PUBLISHER.value
+    return Role.READER.value
+
+def principal_for(authorization: Optional[str], host: Optional[str]) -> Tuple[str, str]:
+    """``(principal, role)``; requests without a valid token are limited by address.
+
+    Tokens are only read here, never rejected: the endpoint answers 401 itself.
+    """
+    scheme, _, token = (authorization or "").partition(" ")
+    if scheme.lower() == "bearer" and token:
+        try:
+            claims = get_token_cache().verify(token)
+        except jwt.InvalidTokenError:
+            claims = None
+        if claims and claims.get("sub"):
+            return f"sub:{claims['sub']}", role_for(claims)
+    return f"ip:{host or 'unknown'}", ANONYMOUS
+
+_policies: Optional[RatePolicies] = None
+
+def get_rate_policies() -> RatePolicies:
+    global _policies
+    if _policies is None:
+        path = os.getenv("RATE_LIMIT_POLICY_FILE")
+        _policies = RatePolicies.from_file(path) if path else RatePolicies()
+    return _policies
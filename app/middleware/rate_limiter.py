@@ -1,34 +1,35 @@
-from redis import Redis
-from fastapi import HTTPException
-import os
-from typing import Optional
-import time
+from fastapi.responses import JSONResponse
+from typing import Callable, Optional
+from ..rate_limiter import RateLimiter
+from .policies import RatePolicies, get_rate_policies
+from .request import header, append_headers
 
-class RateLimiter:
-    def __init__(self):
-        self.redis = Redis(
-            host=os.getenv("REDIS_HOST", "localhost"),
-            port=int(os.getenv("REDIS_PORT", 6379)),
-            decode_responses=True
-        )
-        self.default_limit = 100  # requests
-        self.default_window = 3600  # 1 hour in seconds
+class RateLimitMiddleware:
+    """Pure ASGI middleware charging each request to its principal's budget.
 
-    async def check_rate_limit(self, key: str, limit: Optional[int] = None, window: Optional[int] = None) -> bool:
-        try:
-            current_limit = limit or self.default_limit
-            current_window = window or self.default_window
-            
-            current = int(self.redis.get(key) or 0)
-            if current >= current_limit:
-                return False
+    Paths the policies bypass never reach the limiter or the token cache.
+    Denied requests get a 429 with ``Retry-After``; every other response gets
+    ``RateLimit-*`` headers.
+    """
 
-            pipeline = self.redis.pipeline()
-            pipeline.incr(key)
-            pipeline.expire(key, current_window)
-            pipeline.execute()
-            
-            return True
-        except:
-            # Fail open if Redis is down
-            return True
\ No newline at end of file
+    def __init__(self, app, get_limiter: Callable[[], RateLimiter], policies: Optional[RatePolicies] = None):
+        self.app = app
+        self.get_limiter = get_limiter
+        self.policies = policies
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        policies = self.policies or get_rate_policies()
+        if policies.bypasses(scope["path"]):
+            return await self.app(scope, receive, send)
+
+        client = scope.get("client")
+        decision = policies.decide(scope["method"], scope["path"], header(scope, b"authorization"),
+                                   client[0] if client else None)
+        result = await self.get_limiter().hit(decision.key, cost=decision.cost, limit=decision.limit)
+        if not result.allowed:
+            response = JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=result.headers())
+            return await response(scope, receive, send)
+        headers = [(name.lower().encode(), value.encode()) for name, value in result.headers().items()]
+        await self.app(scope, receive, append_headers(send, headers))
@@ -0,0 +1,61 @@
+"""Pure ASGI middleware that tags every response with its request id and timing.
+
+Unlike ``@app.middleware("http")``, which runs each request through
+``BaseHTTPMiddleware`` and its extra task and stream per request, these
+wrap ``send`` and only touch the ``http.response.start`` message.
+"""
+import time
+import uuid
+from typing import Optional
+
+MAX_REQUEST_ID_LENGTH = 128
+
+def header(scope, name: bytes) -> Optional[str]:
+    """First value of a request header; ``name`` is lower-case bytes"""
+    for key, value in scope.get("headers", ()):
+        if key == name:
+            return value.decode("latin-1")
+    return None
+
+def append_headers(send, headers):
+    """Wrap ``send`` to add ``headers`` (encoded pairs) to the response"""
+    async def send_with_headers(message):
+        if message["type"] == "http.response.start":
+            message["headers"] = list(message.get("headers", ())) + headers
+        await send(message)
+    return send_with_headers
+
+class RequestIdMiddleware:
+    """Reuses the caller's ``X-Request-ID`` or generates one, and exposes it as ``request.state.request_id``"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        request_id = header(scope, b"x-request-id")
+        if not request_id or len(request_id) > MAX_REQUEST_ID_LENGTH:
+            request_id = uuid.uuid4().hex
+        scope.setdefault("state", {})["request_id"] = request_id
+        await self.app(scope, receive, append_headers(send, [(b"x-request-id", request_id.encode("latin-1"))]))
+
+class TimingMiddleware:
+    """Reports the time until the response started as ``Server-Timing: app;dur=<ms>``"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        started = time.perf_counter()
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                duration = (time.perf_counter() - started) * 1000
+                message["headers"] = list(message.get("headers", ())) + [
+                    (b"server-timing", f"app;dur={duration:.1f}".encode())
+                ]
+            await send(message)
+        await self.app(scope, receive, send_with_timing)
@@ -8,5 +8,11 @@ __all__ = [
     'ModuleVersionResponse',
     'ModuleResponse',
     'ModuleProvider',
-    'ModuleDetail'
+    'ModuleDetail',
+    'UploadJob',
+    'ModuleArchive',
+    'ModuleDependency',
+    'ProviderRequirement',
+    'ModuleFile',
+    'ParsedFile'
 ]
\ No newline at end of file
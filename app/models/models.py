@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, Integer, Boolean, DateTime, JSON, ForeignKey, Text
+from sqlalchemy import Column, String, Integer, BigInteger, Boolean, DateTime, JSON, ForeignKey, Text
 from sqlalchemy.orm import relationship
 from .base import Base  # Import Base from local base.py
 from datetime import datetime
@@ -86,3 +86,85 @@ class ModuleDetail(ModuleResponse):
     submodules: List[dict]
     providers: List[ModuleProvider]
     dependencies: List[dict]
+
+class UploadJob(Base):
+    """Persistent queue entry for an asynchronous module upload"""
+    __tablename__ = "upload_jobs"
+
+    id = Column(String, primary_key=True)
+    namespace = Column(String, nullable=False)
+    name = Column(String, nullable=False)
+    provider = Column(String, nullable=False)
+    version = Column(String, nullable=False)
+    source_zip = Column(String, nullable=False)
+    status = Column(String, nullable=False, default="queued", index=True)
+    lane = Column(String, nullable=False, default="interactive")
+    size_bytes = Column(BigInteger, nullable=False, default=0)
+    roots = Column(Integer, nullable=False, default=1)
+    attempts = Column(Integer, nullable=False, default=0)
+    max_attempts = Column(Integer, nullable=False, default=3)
+    stages = Column(JSON, default=dict)
+    result = Column(JSON, default=dict)
+    error = Column(JSON)
+    available_at = Column(DateTime, default=datetime.utcnow, index=True)
+    locked_by = Column(String)
+    locked_at = Column(DateTime)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class ModuleArchive(Base):
+    """Normalized archive details for a registered module version"""
+    __tablename__ = "module_archives"
+
+    version_id = Column(String, ForeignKey("module_versions.id"), primary_key=True)
+    digest = Column(String, nullable=False, index=True)
+    original_size = Column(Integer)
+    archive_size = Column(Integer)
+    tar_gz_size = Column(Integer)
+    tar_gz_digest = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ModuleDependency(Base):
+    """A ``module`` block declared by a registered module version"""
+    __tablename__ = "module_dependencies"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    version_id = Column(String, ForeignKey("module_versions.id"), nullable=False, index=True)
+    name = Column(String, nullable=False)
+    source = Column(String)
+    version_constraint = Column(String)
+    # registry, local or external; only registry calls are resolved
+    kind = Column(String, nullable=False)
+    target_module_id = Column(String, index=True)
+    file = Column(String)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+class ProviderRequirement(Base):
+    """A provider or Terraform version constraint of a registered module version"""
+    __tablename__ = "provider_requirements"
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    version_id = Column(String, ForeignKey("module_versions.id"), nullable=False, index=True)
+    module_id = Column(String, ForeignKey("modules.id"), nullable=False, index=True)
+    # Provider source such as registry.terraform.io/hashicorp/aws, or "terraform"
+    source = Column(String, nullable=False, index=True)
+    version_constraint = Column(String)
+    # Encoded bounds of the admitted versions, inclusive; NULL is unbounded
+    min_version = Column(BigInteger)
+    max_version = Column(BigInteger)
+
+class ModuleFile(Base):
+    """Content hash of one .tf file of a registered module version"""
+    __tablename__ = "module_files"
+
+    version_id = Column(String, ForeignKey("module_versions.id"), primary_key=True)
+    path = Column(String, primary_key=True)
+    sha256 = Column(String, nullable=False, index=True)
+
+class ParsedFile(Base):
+    """python-hcl2 output for one .tf file, shared by every version containing the same content"""
+    __tablename__ = "parsed_files"
+
+    sha256 = Column(String, primary_key=True)
+    content = Column(JSON, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
@@ -1,21 +1,329 @@
+"""Request rate limiting shared by every API process through Redis.
+
+Limits use GCRA (the generic cell rate algorithm), a token bucket that stores
+a single timestamp per key: the "theoretical arrival time" at which the
+bucket would be full again. Requests are spread evenly over the window, and
+up to ``limit`` of them may arrive as a burst. The whole decision runs as one
+Lua script, so a request costs one round trip. The script reads the clock
+with Redis ``TIME``, so app servers with skewed clocks still agree. The key
+is written with its expiry in the same command and cannot be left without
+a TTL.
+
+``LocalRateLimiter`` puts an in-process token bucket per client in front of
+it. Requests are decided from the local bucket without touching Redis, and
+the usage is pushed to the same GCRA keys in one pipelined batch every
+``RATE_LIMIT_SYNC_INTERVAL`` seconds, or sooner once a client has spent
+``RATE_LIMIT_SYNC_FRACTION`` of its limit. Each batch returns the quota left
+across all processes, which caps the local buckets again. A bucket a process
+has not seen yet starts with ``1/RATE_LIMIT_PROCESSES`` of the limit, so
+fresh processes together cannot hand out more than one limit before their
+first sync.
+
+The global limit therefore holds to within the usage each process may admit
+before Redis sees it: with N processes a client can get through roughly
+``limit + N * (sync_fraction * limit + sync_interval * limit / window)``
+requests in a window. With the defaults and 4 processes that is about
+100 + 4 * (10 + 1.7) = 147 per minute instead of 100.
+"""
 from redis import Redis
+from redis.exceptions import RedisError
 import os
+import math
+import time
+import asyncio
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# KEYS[1]: bucket key; ARGV: limit, window in seconds, cost
+# Returns {allowed, remaining, retry_after, reset_after}; times as strings to keep fractions
+GCRA_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2]) * 1000000
+local cost = tonumber(ARGV[3])
+-- Microseconds stay exact in a double, unlike fractional epoch seconds
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local interval = window / limit
+
+local tat = tonumber(redis.call("GET", KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+local new_tat = tat + cost * interval
+local allowed_at = new_tat - window
+if allowed_at > now then
+    return {0, 0, tostring((allowed_at - now) / 1000000), tostring((tat - now) / 1000000)}
+end
+redis.call("SET", KEYS[1], string.format("%.0f", new_tat), "PX", math.max(math.ceil((new_tat - now) / 1000), 1))
+return {1, math.floor((now - allowed_at) / interval + 1e-9), "-1", tostring((new_tat - now) / 1000000)}
+"""
+
+# KEYS[1]: bucket key; ARGV: limit, window in seconds, cost already admitted locally
+# Always records the cost, then returns the requests left in the window (negative when overspent)
+RECONCILE_SCRIPT = """
+local limit = tonumber(ARGV[1])
+local window = tonumber(ARGV[2]) * 1000000
+local cost = tonumber(ARGV[3])
+local clock = redis.call("TIME")
+local now = tonumber(clock[1]) * 1000000 + tonumber(clock[2])
+local interval = window / limit
+
+local tat = tonumber(redis.call("GET", KEYS[1]))
+if not tat or tat < now then
+    tat = now
+end
+-- Overspending is carried as debt, but never for more than one extra window
+local new_tat = math.min(tat + cost * interval, now + 2 * window)
+redis.call("SET", KEYS[1], string.format("%.0f", new_tat), "PX", math.max(math.ceil((new_tat - now) / 1000), 1))
+return math.floor((now + window - new_tat) / interval + 1e-9)
+"""
+
+@dataclass
+class RateLimitResult:
+    allowed: bool
+    limit: int
+    remaining: int
+    # Seconds until the bucket is full again, and until a denied request could succeed
+    reset_after: float
+    retry_after: Optional[float] = None
+    window: int = 60
+
+    def headers(self) -> Dict[str, str]:
+        """``RateLimit-*`` response headers, plus ``Retry-After`` when denied"""
+        headers = {
+            "RateLimit-Limit": str(self.limit),
+            "RateLimit-Remaining": str(self.remaining),
+            "RateLimit-Reset": str(math.ceil(self.reset_after)),
+            "RateLimit-Policy": f"{self.limit};w={self.window}"
+        }
+        if not self.allowed and self.retry_after is not None:
+            headers["Retry-After"] = str(max(math.ceil(self.retry_after), 1))
+        return headers
 
 class RateLimiter:
-    def __init__(self, redis_client=None):
+    def __init__(self, redis_client=None, limit: Optional[int] = None, window: Optional[int] = None):
         self.redis = redis_client or Redis(
             host=os.getenv("REDIS_HOST", "localhost"),
             port=int(os.getenv("REDIS_PORT", 6379)),
-            decode_responses=True
+            decode_responses=True,
+            # A slow Redis should fail open quickly rather than stall requests
+            socket_timeout=float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", 0.25)),
+            socket_connect_timeout=float(os.getenv("RATE_LIMIT_REDIS_TIMEOUT", 0.25))
+        )
+        self.window = window or int(os.getenv("RATE_LIMIT_WINDOW", 60))
+        self.max_requests = limit or int(os.getenv("RATE_LIMIT_REQUESTS", 100))
+        # EVALSHA, falling back to EVAL the first time a server sees the script
+        self._script = self.redis.register_script(GCRA_SCRIPT)
+
+    async def hit(self, key: str, cost: int = 1, limit: Optional[int] = None,
+                  window: Optional[int] = None) -> RateLimitResult:
+        """Count a request against ``key`` and report the remaining quota.
+
+        The Redis round trip runs in a worker thread so it never blocks the event loop.
+        """
+        return await asyncio.to_thread(self.consume, key, cost, limit, window)
+
+    def consume(self, key: str, cost: int = 1, limit: Optional[int] = None,
+                window: Optional[int] = None) -> RateLimitResult:
+        limit = limit or self.max_requests
+        window = window or self.window
+        try:
+            allowed, remaining, retry_after, reset_after = self._script(
+                keys=[f"rate_limit:{key}"], args=[limit, window, cost]
+            )
+        except RedisError as e:
+            # Fail open if Redis is down
+            logger.warning(f"Rate limiter unavailable, allowing request: {str(e)}")
+            return RateLimitResult(True, limit, limit, 0.0, window=window)
+        return RateLimitResult(
+            allowed=bool(allowed),
+            limit=limit,
+            remaining=int(remaining),
+            reset_after=float(reset_after),
+            retry_after=float(retry_after) if float(retry_after) >= 0 else None,
+            window=window
         )
-        self.window = 60  # 1 minute window
-        self.max_requests = 100  # requests per window
 
-    async def check_rate_limit(self, key: str) -> bool:
-        current = self.redis.incr(f"rate_limit:{key}")
-        if current == 1:
-            self.redis.expire(f"rate_limit:{key}", self.window)
-        return current <= self.max_requests
+    async def check_rate_limit(self, key: str, limit: Optional[int] = None, window: Optional[int] = None) -> bool:
+        return (await self.hit(key, limit=limit, window=window)).allowed
+
+    def start(self) -> None:
+        pass
+
+    async def close(self) -> None:
+        pass
+
+class _Bucket:
+    __slots__ = ("limit", "window", "tokens", "updated", "pending")
+
+    def __init__(self, limit: int, window: int, now: float, tokens: Optional[float] = None):
+        self.limit = limit
+        self.window = window
+        self.tokens = float(limit if tokens is None else tokens)
+        self.updated = now
+        # Cost admitted locally that Redis has not seen yet
+        self.pending = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(self.limit, self.tokens + (now - self.updated) * self.limit / self.window)
+        self.updated = now
+
+class LocalRateLimiter:
+    """Token buckets in this process, reconciled with ``RateLimiter``'s keys in batches"""
+
+    def __init__(self, limiter: Optional[RateLimiter] = None, sync_interval: Optional[float] = None,
+                 sync_fraction: Optional[float] = None, processes: Optional[int] = None):
+        self.limiter = limiter or RateLimiter()
+        self.max_requests = self.limiter.max_requests
+        self.window = self.limiter.window
+        self.sync_interval = sync_interval if sync_interval is not None else float(
+            os.getenv("RATE_LIMIT_SYNC_INTERVAL", 1))
+        self.sync_fraction = sync_fraction if sync_fraction is not None else float(
+            os.getenv("RATE_LIMIT_SYNC_FRACTION", 0.1))
+        # API processes sharing the limits; each starts a new bucket with its share
+        self.processes = max(processes or int(
+            os.getenv("RATE_LIMIT_PROCESSES", os.getenv("WEB_CONCURRENCY", 1))), 1)
+        self._script = self.limiter.redis.register_script(RECONCILE_SCRIPT)
+        self._buckets: Dict[str, _Bucket] = {}
+        # Decisions run on the event loop, syncs in a worker thread
+        self._lock = threading.Lock()
+        self._last_sync = time.monotonic()
+        self._sync_requested = False
+        self._syncing: Optional[asyncio.Future] = None
+        self._timer: Optional[asyncio.Task] = None
+
+    async def hit(self, key: str, cost: int = 1, limit: Optional[int] = None,
+                  window: Optional[int] = None) -> RateLimitResult:
+        """Decide locally; Redis is only contacted by a background sync"""
+        result = self.consume(key, cost, limit, window)
+        if self.sync_due():
+            self._start_sync()
+        return result
+
+    def _start_sync(self) -> asyncio.Future:
+        if self._syncing is None or self._syncing.done():
+            self._syncing = asyncio.ensure_future(asyncio.to_thread(self.sync))
+        return self._syncing
+
+    def _new_bucket(self, limit: int, window: int, now: float, cost: int = 0) -> _Bucket:
+        # A share smaller than one request's cost would deny that request on every
+        # fresh process until a sync; the next sync corrects the overshoot
+        return _Bucket(limit, window, now, tokens=max(limit / self.processes, min(cost, limit)))
+
+    def start(self) -> None:
+        """Sync every ``sync_interval`` seconds, also while no requests arrive"""
+        if self._timer is None or self._timer.done():
+            self._timer = asyncio.create_task(self._sync_periodically())
+
+    async def _sync_periodically(self) -> None:
+        while True:
+            await asyncio.sleep(self.sync_interval)
+            try:
+                # Shielded so stopping the timer leaves an in-flight sync for close to await
+                await asyncio.shield(self._start_sync())
+            except Exception as e:
+                logger.error(f"Rate limit sync failed: {str(e)}", exc_info=True)
+
+    def consume(self, key: str, cost: int = 1, limit: Optional[int] = None,
+                window: Optional[int] = None) -> RateLimitResult:
+        limit = limit or self.max_requests
+        window = window or self.window
+        now = time.monotonic()
+        with self._lock:
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = self._new_bucket(limit, window, now, cost)
+            else:
+                bucket.limit, bucket.window = limit, window
+                bucket.refill(now)
+            allowed = bucket.tokens >= cost
+            if allowed:
+                bucket.tokens -= cost
+                bucket.pending += cost
+                if bucket.pending >= self.sync_fraction * limit:
+                    self._sync_requested = True
+            tokens = bucket.tokens
+        rate = limit / window
+        return RateLimitResult(
+            allowed=allowed,
+            limit=limit,
+            remaining=max(int(tokens), 0),
+            reset_after=(limit - tokens) / rate,
+            retry_after=None if allowed else (cost - tokens) / rate,
+            window=window
+        )
+
+    async def check_rate_limit(self, key: str, limit: Optional[int] = None, window: Optional[int] = None) -> bool:
+        return (await self.hit(key, limit=limit, window=window)).allowed
+
+    def sync_due(self) -> bool:
+        return self._sync_requested or time.monotonic() - self._last_sync >= self.sync_interval
+
+    def sync(self) -> int:
+        """Push locally admitted usage to Redis in one pipeline and cap the buckets
+        at the quota left globally. Returns the number of keys sent."""
+        now = time.monotonic()
+        with self._lock:
+            self._last_sync = now
+            self._sync_requested = False
+            batch = {}
+            for key, bucket in list(self._buckets.items()):
+                if bucket.pending:
+                    batch[key] = (bucket.limit, bucket.window, bucket.pending)
+                    bucket.pending = 0
+                else:
+                    bucket.refill(now)
+                    if bucket.tokens >= bucket.limit:
+                        # Idle and full: nothing to remember
+                        del self._buckets[key]
+        if not batch:
+            return 0
+
+        pipeline = self.limiter.redis.pipeline(transaction=False)
+        for key, args in batch.items():
+            self._script(keys=[f"rate_limit:{key}"], args=list(args), client=pipeline)
+        try:
+            results = pipeline.execute()
+        except RedisError as e:
+            # Keep deciding locally and retry the same usage on the next sync
+            logger.warning(f"Rate limit sync failed, will retry: {str(e)}")
+            with self._lock:
+                for key, (limit, window, cost) in batch.items():
+                    bucket = self._buckets.get(key)
+                    if bucket is None:
+                        bucket = self._buckets[key] = self._new_bucket(limit, window, now)
+                    bucket.pending += cost
+            return 0
+
+        with self._lock:
+            for key, remaining in zip(batch, results):
+                bucket = self._buckets.get(key)
+                if bucket is not None:
+                    # Usage admitted here while the batch was in flight is not in Redis yet
+                    bucket.tokens = min(bucket.tokens, int(remaining) - bucket.pending)
+        return len(batch)
+
+    async def close(self) -> None:
+        """Stop the sync timer and flush usage that has not been synced yet"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._syncing is not None:
+            await self._syncing
+        await asyncio.to_thread(self.sync)
+
+_rate_limiter = None
 
 def get_rate_limiter():
-    return RateLimiter()
\ No newline at end of file
+    """Process-wide limiter; ``RATE_LIMIT_SYNC_INTERVAL=0`` asks Redis on every request"""
+    global _rate_limiter
+    if _rate_limiter is None:
+        limiter = RateLimiter()
+        if float(os.getenv("RATE_LIMIT_SYNC_INTERVAL", 1)) > 0:
+            limiter = LocalRateLimiter(limiter)
+        _rate_limiter = limiter
+    return _rate_limiter
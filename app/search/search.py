@@ -1,6 +1,8 @@
-from sqlalchemy.orm import Session
+from sqlalchemy import and_, or_
+from sqlalchemy.orm import Session, aliased
 from typing import List, Optional
-from ..models import Module
+from ..models import Module, ModuleVersion, ProviderRequirement
+from ..dependencies.requirements import RequirementIndex, TERRAFORM_SOURCE, version_bounds
 
 class SearchService:
     @staticmethod
@@ -10,8 +12,15 @@ class SearchService:
         provider: Optional[str] = None,
         namespace: Optional[str] = None,
         limit: int = 10,
-        offset: int = 0
+        offset: int = 0,
+        provider_source: Optional[str] = None,
+        provider_version: Optional[str] = None,
+        terraform_version: Optional[str] = None
     ) -> List[Module]:
+        """Search modules; requirement filters keep modules with a version compatible with all of them.
+
+        Raises ``ValueError`` for filters that cannot be interpreted.
+        """
         filter_conditions = []
         if query:
             filter_conditions.append(Module.name.ilike(f"%{query}%"))
@@ -19,5 +28,32 @@ class SearchService:
             filter_conditions.append(Module.provider == provider)
         if namespace:
             filter_conditions.append(Module.namespace == namespace)
-        
-        return db.query(Module).filter(*filter_conditions).offset(offset).limit(limit).all()
\ No newline at end of file
+
+        requirements = []
+        if provider_source or provider_version:
+            source = provider_source or provider
+            if not source:
+                raise ValueError("provider_version needs provider_source or provider")
+            requirements.append((RequirementIndex.normalize_source(source), provider_version))
+        if terraform_version:
+            requirements.append((TERRAFORM_SOURCE, terraform_version))
+        if requirements:
+            filter_conditions.append(SearchService._compatible_version(db, requirements))
+
+        return db.query(Module).filter(*filter_conditions).order_by(Module.id).offset(offset).limit(limit).all()
+
+    @staticmethod
+    def _compatible_version(db: Session, requirements):
+        """EXISTS clause for a version of the module whose indexed constraints admit every requirement"""
+        versions = db.query(ModuleVersion.id).filter(ModuleVersion.module_id == Module.id)
+        for source, version in requirements:
+            requirement = aliased(ProviderRequirement)
+            conditions = [requirement.version_id == ModuleVersion.id, requirement.source == source]
+            if version:
+                low, high = version_bounds(version)
+                conditions += [
+                    or_(requirement.min_version.is_(None), requirement.min_version <= high),
+                    or_(requirement.max_version.is_(None), requirement.max_version >= low)
+                ]
+            versions = versions.filter(db.query(requirement.id).filter(and_(*conditions)).exists())
+        return versions.exists()
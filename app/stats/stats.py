@@ -5,7 +5,7 @@ import os
 from sqlalchemy.orm import Session
 import redis
 from sqlalchemy import func
-from ..models.models import Module, ModuleVersion
+from ..models.models import Module, ModuleVersion, ModuleArchive
 
 class StatsTracker:
     def __init__(self, redis_client=None):
@@ -39,10 +39,24 @@ class StatsTracker:
             ModuleVersion.module_id == module_id
         ).count()
 
+        original_size, archive_size, tar_gz_size = db.query(
+            func.coalesce(func.sum(ModuleArchive.original_size), 0),
+            func.coalesce(func.sum(ModuleArchive.archive_size), 0),
+            func.coalesce(func.sum(ModuleArchive.tar_gz_size), 0)
+        ).join(ModuleVersion, ModuleVersion.id == ModuleArchive.version_id).filter(
+            ModuleVersion.module_id == module_id
+        ).one()
+
         return {
             "downloads": 0,  # Implement download tracking in future
             "versions": versions,
-            "published_at": module.published_at.isoformat() if module.published_at else None
+            "published_at": module.published_at.isoformat() if module.published_at else None,
+            "archives": {
+                "original_bytes": original_size,
+                "zip_bytes": archive_size,
+                "tar_gz_bytes": tar_gz_size,
+                "bytes_saved": original_size - archive_size
+            }
         }
         
     @staticmethod
@@ -0,0 +1,48 @@
+"""Storage backends that hold module archive blobs"""
+import os
+import shutil
+import asyncio
+from pathlib import Path
+from typing import Optional
+
+class StorageBackend:
+    """Interface for blob stores that module archives can live in.
+
+    Keys are storage-relative paths such as
+    ``namespace/name/provider/version/module.zip``.
+    """
+
+    async def fetch(self, key: str, destination: Path) -> None:
+        """Copy the blob stored under ``key`` to a local file"""
+        raise NotImplementedError
+
+    async def exists(self, key: str) -> bool:
+        raise NotImplementedError
+
+class LocalStorageBackend(StorageBackend):
+    """Blobs stored on a local or network-mounted filesystem"""
+
+    def __init__(self, base_path: str):
+        self.base_path = Path(base_path)
+
+    def _path(self, key: str) -> Path:
+        path = (self.base_path / key).resolve()
+        if self.base_path.resolve() not in path.parents:
+            raise ValueError(f"Key escapes storage root: {key}")
+        return path
+
+    async def fetch(self, key: str, destination: Path) -> None:
+        source = self._path(key)
+        if not source.exists():
+            raise FileNotFoundError(key)
+        await asyncio.to_thread(shutil.copyfile, source, destination)
+
+    async def exists(self, key: str) -> bool:
+        return self._path(key).exists()
+
+def get_storage_backend(base_path: Optional[str] = None) -> StorageBackend:
+    from .storage import ModuleStorage
+    backend = os.getenv("STORAGE_BACKEND", "local")
+    if backend == "local":
+        return LocalStorageBackend(base_path or ModuleStorage.BASE_PATH)
+    raise ValueError(f"Unsupported storage backend: {backend}")
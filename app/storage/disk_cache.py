@@ -0,0 +1,177 @@
+"""Size-bounded local disk cache in front of a storage backend.
+
+Blobs are stored under their sha256 digest, so identical archives share one
+cache entry and a corrupted fill is detected before it is ever served.
+Concurrent requests for the same missing blob share a single fetch.
+Entries being opened for a response are pinned, and responses read from the
+open handle, so eviction never removes a file out from under a download.
+"""
+import os
+import time
+import asyncio
+import hashlib
+import logging
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import Any, AsyncIterator, BinaryIO, Dict, Optional
+from .backends import StorageBackend, get_storage_backend
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 1024 * 1024
+
+class CacheIntegrityError(Exception):
+    """Raised when a fetched blob does not match its expected digest"""
+
+class DiskCache:
+    def __init__(self, backend: StorageBackend, directory: str, max_bytes: int):
+        self.backend = backend
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._entries: "OrderedDict[str, int]" = OrderedDict()
+        self._size = 0
+        self._fills: Dict[str, asyncio.Future] = {}
+        # Digests eviction must skip, with the number of callers holding each
+        self._pins: Dict[str, int] = {}
+        self.hits = 0
+        self.misses = 0
+        self.bytes_served = 0
+        self.bytes_filled = 0
+        self.evictions = 0
+        self._load()
+
+    def _load(self) -> None:
+        """Rebuild the LRU order from what is already on disk, oldest access first"""
+        entries = []
+        for path in self.directory.iterdir():
+            if path.name.endswith(".tmp"):
+                path.unlink(missing_ok=True)
+                continue
+            stat = path.stat()
+            entries.append((stat.st_mtime, path.name, stat.st_size))
+        for _, digest, size in sorted(entries):
+            self._entries[digest] = size
+            self._size += size
+        self._evict()
+
+    def _path(self, digest: str) -> Path:
+        return self.directory / digest
+
+    async def get(self, key: str, digest: str) -> Path:
+        """Return a local path for the blob ``key`` whose sha256 is ``digest``"""
+        if digest in self._entries and self._path(digest).exists():
+            self._entries.move_to_end(digest)
+            # Recency survives restarts through the file mtime
+            os.utime(self._path(digest))
+            self.hits += 1
+            self.bytes_served += self._entries[digest]
+            return self._path(digest)
+
+        self.misses += 1
+        fill = self._fills.get(digest)
+        if fill is None:
+            # The fill runs as its own task so a cancelled request can't strand
+            # the other callers waiting on the same blob
+            fill = asyncio.ensure_future(self._fill(key, digest))
+            self._fills[digest] = fill
+            fill.add_done_callback(lambda _: self._fills.pop(digest, None))
+        path = await asyncio.shield(fill)
+        self.bytes_served += self._entries.get(digest, 0)
+        return path
+
+    @asynccontextmanager
+    async def pinned(self, key: str, digest: str) -> AsyncIterator[Path]:
+        """``get``, with the entry kept from eviction until the block exits"""
+        self._pins[digest] = self._pins.get(digest, 0) + 1
+        try:
+            yield await self.get(key, digest)
+        finally:
+            self._pins[digest] -= 1
+            if not self._pins[digest]:
+                del self._pins[digest]
+            # Catch up on evictions the pin held back
+            self._evict()
+
+    async def open(self, key: str, digest: str) -> BinaryIO:
+        """Open the blob for reading; the handle stays valid if the entry is evicted later"""
+        async with self.pinned(key, digest) as path:
+            return open(path, "rb")
+
+    async def _fill(self, key: str, digest: str) -> Path:
+        started = time.perf_counter()
+        tmp = self.directory / f"{digest}.{os.getpid()}.tmp"
+        try:
+            await self.backend.fetch(key, tmp)
+            actual, size = await asyncio.to_thread(_sha256, tmp)
+            if actual != digest:
+                raise CacheIntegrityError(f"Digest mismatch for {key}: expected {digest}, got {actual}")
+            os.replace(tmp, self._path(digest))
+        finally:
+            tmp.unlink(missing_ok=True)
+
+        # A refill replaces an entry whose file vanished
+        self._size += size - self._entries.get(digest, 0)
+        self._entries[digest] = size
+        self._entries.move_to_end(digest)
+        self.bytes_filled += size
+        self._evict(keep=digest)
+        logger.debug(f"Filled cache entry {digest} ({size} bytes) in {time.perf_counter() - started:.3f}s")
+        return self._path(digest)
+
+    def _evict(self, keep: Optional[str] = None) -> None:
+        for digest in list(self._entries):
+            if self._size <= self.max_bytes:
+                break
+            if digest == keep or digest in self._pins:
+                continue
+            size = self._entries.pop(digest)
+            self._size -= size
+            self._path(digest).unlink(missing_ok=True)
+            self.evictions += 1
+
+    def invalidate(self, digest: str) -> None:
+        size = self._entries.pop(digest, None)
+        if size is not None:
+            self._size -= size
+            self._path(digest).unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0,
+            "bytes_served": self.bytes_served,
+            "bytes_filled": self.bytes_filled,
+            "evictions": self.evictions,
+            "entries": len(self._entries),
+            "size_bytes": self._size,
+            "max_bytes": self.max_bytes
+        }
+
+def _sha256(path: Path):
+    digest = hashlib.sha256()
+    size = 0
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+            size += len(chunk)
+    return digest.hexdigest(), size
+
+_disk_cache: Optional[DiskCache] = None
+
+def get_disk_cache() -> Optional[DiskCache]:
+    """Process-wide archive cache, enabled by setting ``STORAGE_CACHE_DIR``"""
+    global _disk_cache
+    directory = os.getenv("STORAGE_CACHE_DIR")
+    if not directory:
+        return None
+    if _disk_cache is None:
+        _disk_cache = DiskCache(
+            get_storage_backend(),
+            directory,
+            int(os.getenv("STORAGE_CACHE_MAX_BYTES", 10 * 1024 ** 3))
+        )
+    return _disk_cache
@@ -0,0 +1,125 @@
+"""Bounded, streaming extraction of module archives.
+
+Uploaded zips are untrusted, so before anything reads them the central
+directory is checked against budgets for entry count, total uncompressed
+size and compression ratio, and entries with absolute paths, ``..``
+components or symlink modes are refused. Extraction then streams each entry
+in chunks and re-counts the bytes actually written. Every entry within the
+budgets is extracted, since ``terraform validate`` evaluates ``file()`` and
+``templatefile()`` calls against the module's other files; callers that only
+read HCL can pass ``include=is_validation_file``. Scratch directories go on
+a tmpfs (``/dev/shm``) when one is available.
+"""
+import os
+import stat
+import shutil
+import tempfile
+import zipfile
+import logging
+import posixpath
+from dataclasses import dataclass
+from typing import Callable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+CHUNK_SIZE = 256 * 1024
+# Ratios are only meaningful for entries big enough to matter
+RATIO_MIN_BYTES = 1024 * 1024
+TMPFS_PATH = "/dev/shm"
+
+# Terraform configuration and version files, for callers that only read HCL
+VALIDATION_SUFFIXES = (".tf", ".tf.json", ".terraform-version", ".terraform.lock.hcl")
+
+class ArchiveLimitError(Exception):
+    """The archive exceeds an extraction budget or contains an unsafe entry"""
+
+@dataclass
+class ExtractionLimits:
+    max_total_bytes: int = 256 * 1024 * 1024
+    max_entries: int = 10000
+    max_ratio: float = 100.0
+
+    @classmethod
+    def from_env(cls) -> "ExtractionLimits":
+        return cls(
+            max_total_bytes=int(os.getenv("ARCHIVE_MAX_UNCOMPRESSED_BYTES", cls.max_total_bytes)),
+            max_entries=int(os.getenv("ARCHIVE_MAX_ENTRIES", cls.max_entries)),
+            max_ratio=float(os.getenv("ARCHIVE_MAX_COMPRESSION_RATIO", cls.max_ratio))
+        )
+
+def is_validation_file(name: str) -> bool:
+    return posixpath.basename(name).endswith(VALIDATION_SUFFIXES)
+
+def safe_name(name: str) -> Optional[str]:
+    """Normalized relative path of an entry, or None if it would escape the destination"""
+    if name.startswith(("/", "\\")) or "\\" in name or (len(name) > 1 and name[1] == ":"):
+        return None
+    normalized = posixpath.normpath(name)
+    if normalized == ".." or normalized.startswith("../"):
+        return None
+    return normalized
+
+def check_archive(zip_ref: zipfile.ZipFile, limits: Optional[ExtractionLimits] = None) -> List[zipfile.ZipInfo]:
+    """Validate the central directory against the budgets; returns the file entries"""
+    limits = limits or ExtractionLimits.from_env()
+    infos = zip_ref.infolist()
+    if len(infos) > limits.max_entries:
+        raise ArchiveLimitError(f"Archive has {len(infos)} entries, limit is {limits.max_entries}")
+
+    total = 0
+    files = []
+    for info in infos:
+        if safe_name(info.filename) is None:
+            raise ArchiveLimitError(f"Unsafe path in archive: {info.filename}")
+        if stat.S_ISLNK(info.external_attr >> 16):
+            raise ArchiveLimitError(f"Symbolic links are not allowed: {info.filename}")
+        if info.is_dir():
+            continue
+        total += info.file_size
+        if total > limits.max_total_bytes:
+            raise ArchiveLimitError(f"Archive expands to more than {limits.max_total_bytes} bytes")
+        if info.file_size >= RATIO_MIN_BYTES and info.file_size > limits.max_ratio * max(info.compress_size, 1):
+            raise ArchiveLimitError(f"Compression ratio of {info.filename} exceeds {limits.max_ratio:g}")
+        files.append(info)
+    return files
+
+def extract_archive(zip_path: str, destination: str, limits: Optional[ExtractionLimits] = None,
+                    include: Optional[Callable[[str], bool]] = None) -> List[str]:
+    """Stream the entries selected by ``include`` (default all) into ``destination``; returns their names"""
+    limits = limits or ExtractionLimits.from_env()
+    extracted = []
+    written = 0
+    root = os.path.realpath(destination)
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        for info in check_archive(zip_ref, limits):
+            name = safe_name(info.filename)
+            if include is not None and not include(name):
+                continue
+            target = os.path.join(root, name)
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+            with zip_ref.open(info) as src, open(target, "wb") as dst:
+                while True:
+                    chunk = src.read(CHUNK_SIZE)
+                    if not chunk:
+                        break
+                    written += len(chunk)
+                    # The header sizes were checked already; this guards against them lying
+                    if written > limits.max_total_bytes:
+                        raise ArchiveLimitError(f"Archive expands to more than {limits.max_total_bytes} bytes")
+                    dst.write(chunk)
+            extracted.append(name)
+    return extracted
+
+def scratch_root() -> Optional[str]:
+    """Directory for throwaway extractions: ``VALIDATION_TMPDIR``, else tmpfs if usable"""
+    configured = os.getenv("VALIDATION_TMPDIR")
+    if configured:
+        return configured
+    if os.path.isdir(TMPFS_PATH) and os.access(TMPFS_PATH, os.W_OK):
+        usage = shutil.disk_usage(TMPFS_PATH)
+        if usage.free >= ExtractionLimits.from_env().max_total_bytes:
+            return TMPFS_PATH
+    return None
+
+def make_scratch_dir(prefix: str = "terraform_module_") -> str:
+    return tempfile.mkdtemp(prefix=prefix, dir=scratch_root())
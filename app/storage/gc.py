@@ -0,0 +1,306 @@
+"""Garbage collection for module archives in storage.
+
+The sweeper reconciles the storage tree against ``ModuleVersion`` rows:
+
+* archives no row (or in-flight upload job) refers to are removed once they
+  are older than the grace period,
+* prereleases beyond the newest ``keep_prereleases`` per module are pruned,
+* rows whose ``source_zip`` no longer exists are reported.
+
+Work is done in small batches that resume from a cursor, and every
+filesystem operation draws from a token bucket whose rate drops during
+business hours so a sweep never competes with uploads and downloads.
+
+Run ``python -m app.storage.gc --dry-run`` for a report without deleting.
+"""
+import os
+import json
+import time
+import shutil
+import asyncio
+import logging
+import argparse
+from dataclasses import dataclass, field, asdict
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
+import semver
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.models import (
+    ModuleVersion, ModuleArchive, ModuleDependency, ProviderRequirement, ModuleFile, UploadJob
+)
+from ..dependencies import get_dependency_resolver
+from .storage import ModuleStorage
+
+logger = logging.getLogger(__name__)
+
+STATE_FILE = ".gc_state.json"
+
+@dataclass
+class GCReport:
+    dry_run: bool
+    scanned: int = 0
+    orphans: List[Dict[str, Any]] = field(default_factory=list)
+    expired_prereleases: List[Dict[str, Any]] = field(default_factory=list)
+    dangling_rows: List[str] = field(default_factory=list)
+    bytes_reclaimed: int = 0
+    cursor: Optional[str] = None
+    started_at: str = field(default_factory=lambda: datetime.utcnow().isoformat())
+    duration_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+class IOThrottle:
+    """Token bucket limiting filesystem operations and bytes removed per second.
+
+    The rate is re-evaluated on every call so a sweep that crosses into
+    business hours slows down immediately.
+    """
+
+    def __init__(self, ops_rate: float, bytes_rate: float, business_ops_rate: float,
+                 business_bytes_rate: float, business_hours: Tuple[int, int] = (9, 18),
+                 business_days: Tuple[int, int] = (0, 4), clock: Callable[[], datetime] = datetime.now):
+        self.ops_rate = ops_rate
+        self.bytes_rate = bytes_rate
+        self.business_ops_rate = business_ops_rate
+        self.business_bytes_rate = business_bytes_rate
+        self.business_hours = business_hours
+        self.business_days = business_days
+        self.clock = clock
+        self._ops = 0.0
+        self._bytes = 0.0
+        self._last = time.monotonic()
+
+    def in_business_hours(self) -> bool:
+        now = self.clock()
+        first_day, last_day = self.business_days
+        start, end = self.business_hours
+        return first_day <= now.weekday() <= last_day and start <= now.hour < end
+
+    def rates(self) -> Tuple[float, float]:
+        if self.in_business_hours():
+            return self.business_ops_rate, self.business_bytes_rate
+        return self.ops_rate, self.bytes_rate
+
+    async def acquire(self, ops: int = 1, nbytes: int = 0) -> None:
+        ops_rate, bytes_rate = self.rates()
+        now = time.monotonic()
+        elapsed = now - self._last
+        self._last = now
+        # Debt accumulates as work is done and drains at the current rate
+        self._ops = max(0.0, self._ops - elapsed * ops_rate) + ops
+        self._bytes = max(0.0, self._bytes - elapsed * bytes_rate) + nbytes
+        wait = max(self._ops / ops_rate - 1.0 if ops_rate else 0.0,
+                   self._bytes / bytes_rate - 1.0 if bytes_rate else 0.0)
+        if wait > 0:
+            await asyncio.sleep(wait)
+
+    @classmethod
+    def from_env(cls) -> "IOThrottle":
+        hours = os.getenv("GC_BUSINESS_HOURS", "9-18").split("-")
+        days = os.getenv("GC_BUSINESS_DAYS", "0-4").split("-")
+        return cls(
+            ops_rate=float(os.getenv("GC_OPS_RATE", 200)),
+            bytes_rate=float(os.getenv("GC_BYTES_RATE", 50 * 1024 * 1024)),
+            business_ops_rate=float(os.getenv("GC_BUSINESS_OPS_RATE", 10)),
+            business_bytes_rate=float(os.getenv("GC_BUSINESS_BYTES_RATE", 1024 * 1024)),
+            business_hours=(int(hours[0]), int(hours[1])),
+            business_days=(int(days[0]), int(days[1]))
+        )
+
+class StorageGarbageCollector:
+    def __init__(self, base_path: Optional[str] = None,
+                 session_factory: Callable[[], Session] = SessionLocal,
+                 grace_period: Optional[float] = None, keep_prereleases: Optional[int] = None,
+                 batch_size: Optional[int] = None, throttle: Optional[IOThrottle] = None):
+        self.base_path = Path(base_path or ModuleStorage.BASE_PATH)
+        self.session_factory = session_factory
+        self.grace_period = grace_period if grace_period is not None else float(os.getenv("GC_GRACE_PERIOD", 86400))
+        self.keep_prereleases = keep_prereleases if keep_prereleases is not None else int(os.getenv("GC_KEEP_PRERELEASES", 3))
+        self.batch_size = batch_size or int(os.getenv("GC_BATCH_SIZE", 500))
+        self.throttle = throttle or IOThrottle.from_env()
+
+    async def run(self, dry_run: bool = True) -> GCReport:
+        """Sweep one batch of version directories and apply retention policies"""
+        started = time.perf_counter()
+        report = GCReport(dry_run=dry_run)
+        referenced, dangling = await asyncio.to_thread(self._referenced_archives)
+        report.dangling_rows = dangling
+
+        await self._sweep_orphans(referenced, report)
+        if self.keep_prereleases >= 0:
+            await self._apply_retention(report)
+
+        report.duration_ms = round((time.perf_counter() - started) * 1000, 2)
+        logger.info(
+            f"Storage GC {'dry run ' if dry_run else ''}scanned {report.scanned} directories, "
+            f"{len(report.orphans)} orphans, {len(report.expired_prereleases)} expired prereleases, "
+            f"{report.bytes_reclaimed} bytes"
+        )
+        return report
+
+    def _referenced_archives(self) -> Tuple[Set[str], List[str]]:
+        """Archive paths still referenced by versions or in-flight uploads"""
+        db = self.session_factory()
+        try:
+            referenced = set()
+            dangling = []
+            for version_id, source_zip in db.query(ModuleVersion.id, ModuleVersion.source_zip):
+                if not source_zip:
+                    continue
+                path = os.path.abspath(source_zip)
+                referenced.add(os.path.dirname(path))
+                if not os.path.exists(path):
+                    dangling.append(version_id)
+            for (source_zip,) in db.query(UploadJob.source_zip).filter(
+                UploadJob.status.in_(["queued", "running"])
+            ):
+                referenced.add(os.path.dirname(os.path.abspath(source_zip)))
+            return referenced, dangling
+        finally:
+            db.close()
+
+    def _version_dirs(self) -> List[str]:
+        """Version directories (``namespace/name/provider/version``) in storage order"""
+        if not self.base_path.exists():
+            return []
+        found = []
+        for root, dirs, files in os.walk(self.base_path):
+            dirs.sort()
+            depth = len(Path(root).relative_to(self.base_path).parts)
+            if depth == 4:
+                if any(name.startswith("module.") for name in files):
+                    found.append(root)
+                dirs[:] = []
+        return sorted(found)
+
+    async def _sweep_orphans(self, referenced: Set[str], report: GCReport) -> None:
+        directories = await asyncio.to_thread(self._version_dirs)
+        cursor = self._load_cursor()
+        pending = [d for d in directories if cursor is None or d > cursor]
+        batch = pending[:self.batch_size]
+        now = time.time()
+
+        for directory in batch:
+            await self.throttle.acquire()
+            report.scanned += 1
+            if os.path.abspath(directory) in referenced:
+                continue
+            size, mtime = await asyncio.to_thread(_dir_stats, directory)
+            if now - mtime < self.grace_period:
+                continue
+            report.orphans.append({"path": directory, "bytes": size, "age_seconds": round(now - mtime)})
+            if not report.dry_run:
+                await self.throttle.acquire(nbytes=size)
+                await asyncio.to_thread(shutil.rmtree, directory, True)
+                report.bytes_reclaimed += size
+
+        # Wrap around once the end of the tree is reached
+        report.cursor = batch[-1] if len(pending) > len(batch) else None
+        if not report.dry_run:
+            self._save_cursor(report.cursor)
+
+    async def _apply_retention(self, report: GCReport) -> None:
+        expired = await asyncio.to_thread(self._expired_prereleases)
+        for version_id, source_zip in expired:
+            directory = os.path.dirname(source_zip) if source_zip else None
+            size = (await asyncio.to_thread(_dir_stats, directory))[0] if directory and os.path.isdir(directory) else 0
+            report.expired_prereleases.append({"version_id": version_id, "path": directory, "bytes": size})
+            if report.dry_run:
+                continue
+            await self.throttle.acquire(nbytes=size)
+            await asyncio.to_thread(self._delete_version, version_id, directory)
+            report.bytes_reclaimed += size
+
+    def _expired_prereleases(self) -> List[Tuple[str, Optional[str]]]:
+        db = self.session_factory()
+        try:
+            by_module: Dict[str, List[Tuple[semver.VersionInfo, str, Optional[str]]]] = {}
+            for version_id, module_id, version, source_zip in db.query(
+                ModuleVersion.id, ModuleVersion.module_id, ModuleVersion.version, ModuleVersion.source_zip
+            ):
+                try:
+                    parsed = semver.VersionInfo.parse(version)
+                except ValueError:
+                    continue
+                if parsed.prerelease:
+                    by_module.setdefault(module_id, []).append((parsed, version_id, source_zip))
+
+            expired = []
+            for prereleases in by_module.values():
+                prereleases.sort(key=lambda item: item[0], reverse=True)
+                expired.extend((version_id, source_zip) for _, version_id, source_zip in prereleases[self.keep_prereleases:])
+            return expired
+        finally:
+            db.close()
+
+    def _delete_version(self, version_id: str, directory: Optional[str]) -> None:
+        db = self.session_factory()
+        try:
+            module_id = db.query(ModuleVersion.module_id).filter_by(id=version_id).scalar()
+            db.query(ModuleDependency).filter_by(version_id=version_id).delete(synchronize_session=False)
+            db.query(ProviderRequirement).filter_by(version_id=version_id).delete(synchronize_session=False)
+            db.query(ModuleFile).filter_by(version_id=version_id).delete(synchronize_session=False)
+            db.query(ModuleArchive).filter_by(version_id=version_id).delete(synchronize_session=False)
+            db.query(ModuleVersion).filter_by(id=version_id).delete(synchronize_session=False)
+            db.commit()
+        finally:
+            db.close()
+        if module_id:
+            get_dependency_resolver().invalidate(module_id, version_id)
+        if directory:
+            shutil.rmtree(directory, ignore_errors=True)
+
+    def _load_cursor(self) -> Optional[str]:
+        try:
+            with open(self.base_path / STATE_FILE) as f:
+                return json.load(f).get("cursor")
+        except (OSError, ValueError):
+            return None
+
+    def _save_cursor(self, cursor: Optional[str]) -> None:
+        if not self.base_path.exists():
+            return
+        with open(self.base_path / STATE_FILE, "w") as f:
+            json.dump({"cursor": cursor, "updated_at": datetime.utcnow().isoformat()}, f)
+
+def _dir_stats(directory: str) -> Tuple[int, float]:
+    """Total size and newest mtime of the files under a directory"""
+    size = 0
+    mtime = os.path.getmtime(directory)
+    for root, _, files in os.walk(directory):
+        for name in files:
+            stat = os.stat(os.path.join(root, name))
+            size += stat.st_size
+            mtime = max(mtime, stat.st_mtime)
+    return size, mtime
+
+async def run_periodically(collector: StorageGarbageCollector, interval: float) -> None:
+    """Background sweeper used when ``GC_INTERVAL`` is set"""
+    while True:
+        await asyncio.sleep(interval)
+        try:
+            await collector.run(dry_run=False)
+        except Exception as e:
+            logger.error(f"Storage GC failed: {str(e)}", exc_info=True)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Reconcile module storage against the registry database")
+    parser.add_argument("--dry-run", action="store_true", help="report what would be removed without deleting")
+    parser.add_argument("--grace-period", type=float, help="seconds before an unreferenced archive is removed")
+    parser.add_argument("--keep-prereleases", type=int, help="prereleases to keep per module (-1 disables)")
+    parser.add_argument("--batch-size", type=int, help="version directories to examine per run")
+    args = parser.parse_args()
+
+    collector = StorageGarbageCollector(
+        grace_period=args.grace_period,
+        keep_prereleases=args.keep_prereleases,
+        batch_size=args.batch_size
+    )
+    report = asyncio.run(collector.run(dry_run=args.dry_run))
+    print(json.dumps(report.to_dict(), indent=2))
+
+if __name__ == "__main__":
+    main()
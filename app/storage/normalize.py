@@ -0,0 +1,147 @@
+"""Deterministic repacking of uploaded module archives.
+
+Uploaded zips are rewritten so the same module content always produces the
+same bytes: excluded paths (``.terraform/``, ``.git/``, provider binaries,
+state files) are dropped, entries are sorted, timestamps and permissions are
+fixed and everything is recompressed at ``ARCHIVE_COMPRESS_LEVEL``. A
+``module.tar.gz`` variant is written next to the zip so clients can fetch
+whichever is smaller.
+"""
+import os
+import gzip
+import shutil
+import hashlib
+import tarfile
+import zipfile
+import logging
+import fnmatch
+from dataclasses import dataclass, field, asdict
+from pathlib import Path
+from typing import Any, Dict, List
+from .extract import check_archive
+
+logger = logging.getLogger(__name__)
+
+FIXED_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+COMPRESS_LEVEL = int(os.getenv("ARCHIVE_COMPRESS_LEVEL", 9))
+CHUNK_SIZE = 1024 * 1024
+
+EXCLUDED_DIRECTORIES = {".terraform", ".git", ".svn", ".hg", "__MACOSX", ".idea", ".vscode"}
+EXCLUDED_PATTERNS = [
+    "terraform-provider-*",
+    "*.tfstate",
+    "*.tfstate.*",
+    "*.tfplan",
+    "crash.log",
+    ".DS_Store",
+    "Thumbs.db",
+]
+
+@dataclass
+class NormalizationResult:
+    digest: str
+    original_size: int
+    archive_size: int
+    tar_gz_size: int
+    tar_gz_digest: str
+    entries: int
+    removed: List[str] = field(default_factory=list)
+
+    @property
+    def bytes_saved(self) -> int:
+        return self.original_size - self.archive_size
+
+    def to_dict(self) -> Dict[str, Any]:
+        data = asdict(self)
+        data["bytes_saved"] = self.bytes_saved
+        return data
+
+def is_excluded(name: str) -> bool:
+    """Whether an archive entry should be dropped during normalization"""
+    parts = [part for part in name.split("/") if part]
+    if not parts or any(part == ".." for part in parts) or name.startswith("/"):
+        return True
+    if any(part in EXCLUDED_DIRECTORIES for part in parts[:-1]):
+        return True
+    return any(fnmatch.fnmatch(parts[-1], pattern) for pattern in EXCLUDED_PATTERNS)
+
+def _file_mode(info: zipfile.ZipInfo) -> int:
+    mode = (info.external_attr >> 16) & 0o777
+    return 0o755 if mode & 0o111 else 0o644
+
+def normalize_archive(zip_path: str) -> NormalizationResult:
+    """Repack ``zip_path`` in place and write a ``.tar.gz`` variant alongside it.
+
+    Raises ``ArchiveLimitError`` if the upload exceeds the extraction budgets.
+    """
+    source = Path(zip_path)
+    original_size = source.stat().st_size
+    tmp_zip = source.with_name(source.name + ".tmp")
+    tar_path = source.with_name(source.stem + ".tar.gz")
+    tmp_tar = tar_path.with_name(tar_path.name + ".tmp")
+    removed: List[str] = []
+
+    try:
+        with zipfile.ZipFile(source) as zin:
+            members = []
+            for info in check_archive(zin):
+                if is_excluded(info.filename):
+                    removed.append(info.filename)
+                    continue
+                members.append(info)
+            members.sort(key=lambda info: info.filename)
+
+            with zipfile.ZipFile(tmp_zip, "w", zipfile.ZIP_DEFLATED, compresslevel=COMPRESS_LEVEL) as zout:
+                for info in members:
+                    out_info = zipfile.ZipInfo(info.filename, date_time=FIXED_DATE_TIME)
+                    out_info.compress_type = zipfile.ZIP_DEFLATED
+                    out_info.create_system = 3
+                    out_info.external_attr = (0o100000 | _file_mode(info)) << 16
+                    with zin.open(info) as src, zout.open(out_info, "w") as dst:
+                        shutil.copyfileobj(src, dst, CHUNK_SIZE)
+
+            with open(tmp_tar, "wb") as raw:
+                with gzip.GzipFile(filename="", mode="wb", fileobj=raw,
+                                   compresslevel=COMPRESS_LEVEL, mtime=0) as gz:
+                    with tarfile.open(fileobj=gz, mode="w", format=tarfile.PAX_FORMAT) as tar:
+                        for info in members:
+                            tar_info = tarfile.TarInfo(info.filename)
+                            tar_info.size = info.file_size
+                            tar_info.mode = _file_mode(info)
+                            tar_info.mtime = 0
+                            with zin.open(info) as src:
+                                tar.addfile(tar_info, src)
+
+        digest = sha256_file(tmp_zip)
+        tar_gz_digest = sha256_file(tmp_tar)
+        for tmp in (tmp_zip, tmp_tar):
+            with open(tmp, "rb") as f:
+                os.fsync(f.fileno())
+        os.replace(tmp_zip, source)
+        os.replace(tmp_tar, tar_path)
+    finally:
+        for tmp in (tmp_zip, tmp_tar):
+            if tmp.exists():
+                tmp.unlink()
+
+    result = NormalizationResult(
+        digest=digest,
+        original_size=original_size,
+        archive_size=source.stat().st_size,
+        tar_gz_size=tar_path.stat().st_size,
+        tar_gz_digest=tar_gz_digest,
+        entries=len(members),
+        removed=removed
+    )
+    logger.debug(
+        f"Normalized {zip_path}: {result.entries} entries, {len(removed)} removed, "
+        f"{result.bytes_saved} bytes saved"
+    )
+    return result
+
+def sha256_file(path: Path) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
@@ -8,15 +8,30 @@ from fastapi import UploadFile
 
 logger = logging.getLogger(__name__)
 
+STAGING_DIR = ".uploads"
+
 class ModuleStorage:
     BASE_PATH = "module_storage"
 
     @classmethod
     async def save_module(cls, namespace: str, name: str, provider: str, version: str, file: UploadFile) -> str:
         """Save an uploaded module file to storage"""
+        module_path = Path(cls.BASE_PATH) / namespace / name / provider / version
+        return await cls._write(module_path, file)
+
+    @classmethod
+    async def save_upload(cls, job_id: str, namespace: str, name: str, file: UploadFile) -> str:
+        """Save an upload under a path of its own until ``promote`` moves it to its version.
+
+        Staged archives sit at the same depth as version directories, so the
+        garbage collector removes those of failed jobs after its grace period.
+        """
+        return await cls._write(Path(cls.BASE_PATH) / STAGING_DIR / namespace / name / job_id, file)
+
+    @classmethod
+    async def _write(cls, module_path: Path, file: UploadFile) -> str:
         try:
             # Create directory structure
-            module_path = Path(cls.BASE_PATH) / namespace / name / provider / version
             module_path.mkdir(parents=True, exist_ok=True)
             logger.debug(f"Created module directory at {module_path}")
             
@@ -30,6 +45,10 @@ class ModuleStorage:
             
             with open(final_path, "wb") as f:
                 f.write(content)
+                # Uploads are acknowledged before validation runs, so make sure
+                # the archive survives a crash once we've handed out a job id
+                f.flush()
+                os.fsync(f.fileno())
             logger.debug(f"Successfully wrote module to {final_path}")
             
             return str(final_path)
@@ -38,6 +57,24 @@ class ModuleStorage:
             logger.error(f"Error saving module: {str(e)}", exc_info=True)
             raise
 
+    @staticmethod
+    def promote(staged_zip: str, final_zip: str) -> None:
+        """Move a staged upload directory (archive plus repacked copies) to its version path.
+
+        Callers must have reserved the version first: anything already at the
+        version path is a leftover no version row refers to and is replaced.
+        """
+        staged_dir, final_dir = Path(staged_zip).parent, Path(final_zip).parent
+        if staged_dir == final_dir:
+            return
+        if not staged_dir.exists() and Path(final_zip).exists():
+            # Moved by an earlier attempt that died before committing
+            return
+        if final_dir.exists():
+            shutil.rmtree(final_dir)
+        final_dir.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(staged_dir, final_dir)
+
     @classmethod
     def get_module_path(cls, namespace: str, name: str, provider: str, version: str = None) -> Path:
         """Get the path to a stored module"""
@@ -47,10 +84,37 @@ class ModuleStorage:
         return base_path
 
     @classmethod
-    async def delete_module(cls, namespace: str, name: str, provider: str, version: str) -> bool:
-        """Delete a stored module"""
+    async def delete_module(cls, namespace: str, name: str, provider: str, version: str, force: bool = False) -> bool:
+        """Delete a stored module.
+
+        Archives still referenced by a registered version are kept unless
+        ``force`` is set, so a failed re-upload can't strand the existing row.
+        """
         path = cls.get_module_path(namespace, name, provider, version)
-        if path.exists():
-            shutil.rmtree(path.parent)  # Remove the version directory
-            return True
-        return False
\ No newline at end of file
+        if not path.exists():
+            return False
+        if not force and cls._is_referenced(path):
+            logger.warning(f"Not deleting {path}: still referenced by a module version")
+            return False
+        shutil.rmtree(path.parent)  # Remove the version directory
+        return True
+
+    @staticmethod
+    async def discard_upload(staged_zip: str) -> bool:
+        """Remove the staged upload of a failed job; archives at version paths are left alone"""
+        staged_dir = Path(staged_zip).parent
+        if STAGING_DIR not in staged_dir.parts or not staged_dir.exists():
+            return False
+        shutil.rmtree(staged_dir)
+        return True
+
+    @staticmethod
+    def _is_referenced(path: Path) -> bool:
+        from ..database import SessionLocal
+        from ..models.models import ModuleVersion
+        db = SessionLocal()
+        try:
+            candidates = {str(path), os.path.abspath(path)}
+            return db.query(ModuleVersion.id).filter(ModuleVersion.source_zip.in_(candidates)).first() is not None
+        finally:
+            db.close()
\ No newline at end of file
@@ -26,4 +26,4 @@ def test_upload_module(client, auth_headers, test_module_zip):
             files={"file": ("test.zip", f)},
             headers=auth_headers
         )
-        assert response.status_code in [200, 401]
+        assert response.status_code in [202, 401]
@@ -0,0 +1,76 @@
+import io
+import asyncio
+import zipfile
+import pytest
+from ..validation.binaries import TerraformBinaryManager, TerraformInstallError
+
+def release_zip(version):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        zipf.writestr("terraform", f"#!/bin/sh\necho {version}\n")
+    return buffer.getvalue()
+
+@pytest.fixture
+def manager(tmp_path, monkeypatch):
+    manager = TerraformBinaryManager(str(tmp_path))
+    downloads = []
+
+    async def download(version):
+        downloads.append(version)
+        await asyncio.sleep(0.05)
+        return release_zip(version)
+
+    monkeypatch.setattr(manager, "_download", download)
+    manager.downloads = downloads
+    return manager
+
+def test_versions_install_side_by_side(manager, tmp_path):
+    async def main():
+        return await asyncio.gather(
+            manager.ensure("1.5.7"), manager.ensure("1.6.0"), manager.ensure("1.5.7")
+        )
+
+    paths = asyncio.run(main())
+    assert paths[0] == paths[2] == str(tmp_path / "1.5.7" / "terraform")
+    assert paths[1] == str(tmp_path / "1.6.0" / "terraform")
+    assert sorted(manager.downloads) == ["1.5.7", "1.6.0"]
+    assert manager.installed_versions() == ["1.5.7", "1.6.0"]
+
+    asyncio.run(manager.ensure("1.5.7"))
+    assert len(manager.downloads) == 2
+
+def test_rejects_unsafe_versions(manager):
+    with pytest.raises(TerraformInstallError):
+        asyncio.run(manager.ensure("../../bin"))
+    assert manager.downloads == []
+
+def test_latest_keywords_resolve_against_the_releases_index(manager, tmp_path, monkeypatch):
+    fetches = []
+
+    async def fetch_releases():
+        fetches.append(1)
+        return ["1.5.7", "1.6.0", "1.7.0-rc1", "1.6.6", "0.15.5"]
+
+    monkeypatch.setattr(manager, "_fetch_releases", fetch_releases)
+    assert asyncio.run(manager.ensure("latest")) == str(tmp_path / "1.6.6" / "terraform")
+    assert asyncio.run(manager.resolve("latest:^1\\.5")) == "1.5.7"
+    assert asyncio.run(manager.resolve("latest:rc")) == "1.7.0-rc1"
+    assert asyncio.run(manager.resolve("1.5.7")) == "1.5.7"
+    assert len(fetches) == 1
+    with pytest.raises(TerraformInstallError, match="No Terraform release"):
+        asyncio.run(manager.resolve("latest:^2\\."))
+    with pytest.raises(TerraformInstallError, match="latest:<regex>"):
+        asyncio.run(manager.ensure("min-required"))
+
+def test_release_without_binary_is_an_install_error(tmp_path, monkeypatch):
+    manager = TerraformBinaryManager(str(tmp_path))
+
+    async def download(version):
+        buffer = io.BytesIO()
+        with zipfile.ZipFile(buffer, "w") as zipf:
+            zipf.writestr("LICENSE.txt", "")
+        return buffer.getvalue()
+
+    monkeypatch.setattr(manager, "_download", download)
+    with pytest.raises(TerraformInstallError, match="no terraform binary"):
+        asyncio.run(manager.ensure("1.5.7"))
@@ -0,0 +1,232 @@
+import json
+import asyncio
+import zipfile
+import aiohttp
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from .. import main
+from ..auth import verify_token
+from ..bulk_import import BulkImporter, discover_modules, build_module_zip, Checkpoint, ModuleSpec
+from ..jobs import JobQueue, BULK, INTERACTIVE
+from ..models.base import Base
+from ..rate_limiter import RateLimitResult
+
+class _Unlimited:
+    async def hit(self, key, cost=1, limit=None, window=None):
+        return RateLimitResult(True, 100, 100, 0.0)
+
+@pytest.fixture
+def api(tmp_path, monkeypatch):
+    # Uploads are staged under module_storage relative to cwd
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine(f"sqlite:///{tmp_path}/api.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    queue = JobQueue(session_factory)
+    monkeypatch.setattr(main, "job_queue", queue)
+    monkeypatch.setattr(main, "get_rate_limiter", lambda: _Unlimited())
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    main.app.dependency_overrides[main.get_db] = override_get_db
+    main.app.dependency_overrides[verify_token] = lambda: {"sub": "importer", "permissions": ["upload:module"]}
+    yield TestClient(main.app), queue
+    main.app.dependency_overrides.clear()
+
+def _zip(tmp_path, name="module.zip"):
+    path = tmp_path / name
+    with zipfile.ZipFile(path, "w") as zipf:
+        zipf.writestr("main.tf", 'variable "name" {}\n')
+    return str(path)
+
+def _as_request(form):
+    """Split an aiohttp form into the data and files arguments of a test client request"""
+    data, files = {}, []
+    for options, _, value in form._fields:
+        if "filename" in options:
+            files.append((options["name"], (options["filename"], value)))
+        else:
+            data[options["name"]] = value
+    return data, files
+
+def test_discover_and_build(tmp_path):
+    module = tmp_path / "src" / "acme" / "vpc" / "aws" / "1.2.0"
+    (module / ".terraform").mkdir(parents=True)
+    (module / "main.tf").write_text('resource "aws_vpc" "this" {}\n')
+    (module / ".terraform" / "terraform.tfstate").write_text("{}")
+    (tmp_path / "src" / "acme" / "empty" / "aws" / "1.0.0").mkdir(parents=True)
+
+    modules = discover_modules(str(tmp_path / "src"))
+    assert modules == [ModuleSpec(str(module), "acme", "vpc", "aws", "1.2.0")]
+
+    output = build_module_zip(modules[0].path, str(tmp_path / "vpc.zip"))
+    with zipfile.ZipFile(output) as zipf:
+        assert zipf.namelist() == ["main.tf"]
+
+def test_checkpoint_resumes(tmp_path):
+    path = str(tmp_path / "import.checkpoint")
+    spec = ModuleSpec("unused", "acme", "vpc", "aws", "1.2.0")
+    Checkpoint(path).record(spec, {"job_id": "abc"})
+    assert Checkpoint(path).done == {"acme/vpc/aws/1.2.0"}
+
+def test_cli_uploads_queue_in_bulk_lane(api, tmp_path):
+    client, queue = api
+    importer = BulkImporter("http://testserver", token=None)
+    sent = []
+
+    async def post(session, url, form):
+        sent.append((url, form()))
+        return {"job_id": "unused"}
+
+    importer._post = post
+    spec = ModuleSpec("unused", "acme", "vpc", "aws", "1.2.0")
+    asyncio.run(importer._upload(None, [spec], [_zip(tmp_path)]))
+
+    url, form = sent[0]
+    data, files = _as_request(form)
+    response = client.post(url.replace("http://testserver", ""), data=data, files=files)
+    assert response.status_code == 202
+    assert queue.get(response.json()["job_id"])["lane"] == BULK
+
+def test_upload_lane_defaults_to_interactive(api, tmp_path):
+    client, queue = api
+    with open(_zip(tmp_path), "rb") as f:
+        archive = f.read()
+    response = client.post("/api/modules/acme/vpc/aws/1.0.0/upload", files={"file": ("module.zip", archive)})
+    assert queue.get(response.json()["job_id"])["lane"] == INTERACTIVE
+    response = client.post("/api/modules/acme/vpc/aws/1.0.1/upload", data={"lane": "urgent"},
+                           files={"file": ("module.zip", archive)})
+    assert response.status_code == 400
+
+def test_batch_accepts_and_rejects_entries_individually(api, tmp_path):
+    client, queue = api
+    with open(_zip(tmp_path), "rb") as f:
+        archive = f.read()
+    manifest = [
+        {"filename": "a.zip", "namespace": "acme", "name": "vpc", "provider": "aws", "version": "1.0.0"},
+        "not-an-entry",
+        {"filename": "b.zip", "namespace": 7, "name": "dns", "provider": "aws", "version": "1.0.0"},
+        {"filename": "dup.zip", "namespace": "acme", "name": "dup", "provider": "aws", "version": "1.0.0"},
+        {"filename": "missing.zip", "namespace": "acme", "name": "gone", "provider": "aws", "version": "1.0.0"},
+        {"filename": "c.zip", "namespace": "acme", "name": "bad", "provider": "aws", "version": "latest"},
+        {"filename": "a.zip", "namespace": "acme", "name": "vpc", "provider": "aws", "version": "1.0.1"},
+    ]
+    files = [("files", (name, archive)) for name in ("a.zip", "b.zip", "dup.zip", "dup.zip", "c.zip")]
+    response = client.post("/api/modules/batch", data={"manifest": json.dumps(manifest)}, files=files)
+
+    assert response.status_code == 202
+    body = response.json()
+    assert (body["queued"], body["rejected"]) == (1, 6)
+    results = body["results"]
+    assert [r["status"] for r in results] == ["queued"] + ["rejected"] * 6
+    assert queue.get(results[0]["job_id"])["lane"] == BULK
+    assert "entry" in results[1]["errors"]
+    assert results[2]["errors"] == {"namespace": "namespace must be a string"}
+    assert "More than one" in results[3]["errors"]["file"]
+    assert "No file" in results[4]["errors"]["file"]
+    assert "version" in results[5]["errors"]
+    assert "earlier entry" in results[6]["errors"]["file"]
+
+class _Response:
+    def __init__(self, status, body=None, headers=None):
+        self.status = status
+        self.body = body or {}
+        self.headers = headers or {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def json(self, content_type=None):
+        return self.body
+
+class _Session:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.forms = []
+
+    def post(self, url, data=None):
+        self.forms.append(data)
+        response = self.responses.pop(0)
+        if isinstance(response, Exception):
+            raise response
+        return response
+
+def test_post_retries_transient_failures(monkeypatch):
+    importer = BulkImporter("http://testserver", token=None, retries=3)
+    delays = []
+
+    async def backoff(attempt, delay, reason):
+        delays.append(delay)
+
+    monkeypatch.setattr(importer, "_backoff", backoff)
+    session = _Session([
+        _Response(503),
+        aiohttp.ClientConnectionError("reset"),
+        _Response(429, headers={"Retry-After": "7"}),
+        _Response(202, {"job_id": "abc"}),
+    ])
+    assert asyncio.run(importer._post(session, "http://testserver/upload", lambda: object())) == {"job_id": "abc"}
+    assert delays == [None, None, 7.0]
+    # Every attempt sends a freshly built form
+    assert len(session.forms) == 4 and len(set(map(id, session.forms))) == 4
+
+def test_post_gives_up_on_client_errors_and_exhausted_retries(monkeypatch):
+    importer = BulkImporter("http://testserver", token=None, retries=1)
+
+    async def backoff(attempt, delay, reason):
+        pass
+
+    monkeypatch.setattr(importer, "_backoff", backoff)
+    with pytest.raises(RuntimeError, match="HTTP 400"):
+        asyncio.run(importer._post(_Session([_Response(400, {"detail": "bad"})]), "http://testserver", dict))
+    with pytest.raises(RuntimeError, match="HTTP 503"):
+        asyncio.run(importer._post(_Session([_Response(503), _Response(503)]), "http://testserver", dict))
+
+def test_versions_the_server_already_has_count_as_imported(tmp_path):
+    checkpoint = str(tmp_path / "import.checkpoint")
+    importer = BulkImporter("http://testserver", token=None, checkpoint=checkpoint)
+    vpc = ModuleSpec("unused", "acme", "vpc", "aws", "1.0.0")
+    dns = ModuleSpec("unused", "acme", "dns", "aws", "1.0.0")
+    bad = ModuleSpec("unused", "acme", "bad", "aws", "1.0.0")
+    archive = _zip(tmp_path)
+
+    # Accepted before a crash, or before the response to a retried POST was lost
+    session = _Session([_Response(409, {"detail": "Version 1.0.0 already exists"})])
+    asyncio.run(importer._upload(session, [vpc], [archive]))
+    session = _Session([_Response(202, {"results": [
+        {"status": "rejected", "errors": {"version": "Version already exists"}},
+        {"status": "rejected", "errors": {"version": "Version must be in semantic versioning format (e.g., 1.0.0)"}},
+    ]})])
+    asyncio.run(importer._upload(session, [dns, bad], [archive, archive]))
+
+    assert (importer.succeeded, importer.existing) == (0, 2)
+    assert [f["module"] for f in importer.failed] == [bad.key]
+    assert Checkpoint(checkpoint).done == {vpc.key, dns.key}
+
+def test_oversized_batches_are_rejected_before_parsing(api, tmp_path, monkeypatch):
+    client, queue = api
+    manifest = json.dumps([])
+    monkeypatch.setattr(main, "MAX_BATCH_FILES", 2)
+    files = [("files", (f"{i}.zip", b"zip")) for i in range(3)]
+    assert client.post("/api/modules/batch", data={"manifest": manifest}, files=files).status_code == 413
+
+    monkeypatch.setattr(main, "MAX_BATCH_BYTES", 100)
+    response = client.post("/api/modules/batch", data={"manifest": manifest}, files=[("files", ("a.zip", b"x" * 200))])
+    assert response.status_code == 413 and "bytes" in response.json()["detail"]
+
+def test_job_status_needs_the_upload_permission(api, tmp_path):
+    client, queue = api
+    job_id = queue.enqueue("acme", "vpc", "aws", "1.0.0", _zip(tmp_path))
+    assert client.get(f"/api/jobs/{job_id}").json()["status"] == "queued"
+    main.app.dependency_overrides[verify_token] = lambda: {"sub": "reader", "permissions": ["read:module"]}
+    assert client.get(f"/api/jobs/{job_id}").status_code == 403
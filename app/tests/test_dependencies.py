@@ -0,0 +1,156 @@
+import time
+import zipfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..models.base import Base
+from ..models.models import Module, ModuleVersion, ModuleDependency
+from ..dependencies import DependencyManager, DependencyResolver, ReverseDependencyIndex
+from ..dependencies.constraints import ConstraintError, parse_constraint
+from ..validation.hcl import parse_archive
+
+MODULE = '''
+module "vpc" {
+  source  = "acme/vpc/aws"
+  version = "~> 2.1"
+}
+module "local" {
+  source = "./modules/local"
+}
+module "git" {
+  source = "git::https://example.com/network.git?ref=v1.0.0"
+}
+module "public" {
+  source  = "registry.terraform.io/hashicorp/consul/aws"
+  version = "0.1.0"
+}
+'''
+
+@pytest.mark.parametrize("constraint,versions,expected", [
+    ("1.2.0", ["1.2.0", "1.3.0"], "1.2.0"),
+    (">= 1.0, < 2.0", ["0.9.0", "1.5.0", "2.0.0"], "1.5.0"),
+    ("~> 1.2", ["1.1.0", "1.9.9", "2.0.0"], "1.9.9"),
+    ("~> 1.2.3", ["1.2.9", "1.3.0"], "1.2.9"),
+    ("!= 1.3.0", ["1.2.0", "1.3.0"], "1.2.0"),
+    (None, ["1.0.0", "2.0.0-beta.1"], "1.0.0"),
+    ("2.0.0-beta.1", ["1.0.0", "2.0.0-beta.1"], "2.0.0-beta.1"),
+    ("> 3.0", ["1.0.0"], None),
+])
+def test_constraint_selects_highest_match(constraint, versions, expected):
+    assert parse_constraint(constraint).select(versions) == expected
+
+def test_invalid_constraint():
+    with pytest.raises(ConstraintError):
+        parse_constraint(">= banana")
+
+def test_build_edges_classifies_sources(tmp_path, monkeypatch):
+    monkeypatch.delenv("REGISTRY_HOSTNAMES", raising=False)
+    path = tmp_path / "module.zip"
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        zip_ref.writestr("main.tf", MODULE)
+    parsed, errors = parse_archive(str(path))
+    assert not errors
+
+    edges = {edge.name: edge for edge in DependencyManager.build_edges("v1", parsed)}
+    assert (edges["vpc"].kind, edges["vpc"].target_module_id, edges["vpc"].version_constraint) == \
+        ("registry", "acme-vpc-aws", "~> 2.1")
+    assert edges["local"].kind == "local"
+    assert edges["git"].kind == "external"
+    assert edges["public"].kind == "external"
+
+    monkeypatch.setenv("REGISTRY_HOSTNAMES", "registry.terraform.io")
+    assert DependencyManager.parse_source("registry.terraform.io/hashicorp/consul/aws//modules/x") == \
+        ("registry", ("hashicorp", "consul", "aws"))
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/deps.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _publish(db, name, version, calls=()):
+    module_id = f"acme-{name}-aws"
+    if not db.query(Module).filter_by(id=module_id).first():
+        db.add(Module(id=module_id, namespace="acme", name=name, provider="aws", version=version))
+        db.flush()
+    version_id = f"{module_id}-{version}"
+    db.add(ModuleVersion(id=version_id, module_id=module_id, version=version))
+    db.flush()
+    for target, constraint in calls:
+        db.add(ModuleDependency(version_id=version_id, name=target, source=f"acme/{target}/aws",
+                                version_constraint=constraint, kind="registry", target_module_id=f"acme-{target}-aws"))
+    db.commit()
+    return module_id, version_id
+
+def test_resolves_transitive_closure_and_invalidates(session_factory):
+    db = session_factory()
+    _publish(db, "base", "1.0.0")
+    _publish(db, "network", "1.0.0", [("base", "~> 1.0")])
+    _publish(db, "network", "1.1.0", [("base", "~> 1.0"), ("missing", "1.0.0")])
+    root = _publish(db, "app", "1.0.0", [("network", ">= 1.0"), ("base", "< 2.0")])
+    resolver = DependencyResolver(session_factory, ttl=3600)
+
+    resolution = resolver.resolve(*root)
+    assert [d["resolved"] for d in resolution.direct] == ["1.1.0", "1.0.0"]
+    assert [(t["module"], t["version"], t["depth"]) for t in resolution.transitive] == [
+        ("acme/base/aws", "1.0.0", 1), ("acme/network/aws", "1.1.0", 1)
+    ]
+    assert resolution.transitive[0]["required_by"] == ["acme/app/aws/1.0.0", "acme/network/aws/1.1.0"]
+    assert resolution.unresolved[0]["source"] == "acme/missing/aws"
+    assert resolver.resolve(*root) is resolution
+
+    # A new version of a module in the graph drops the cached result
+    _publish(db, "base", "1.2.0")
+    resolver.invalidate("acme-base-aws", "acme-base-aws-1.2.0")
+    assert {t["version"] for t in resolver.resolve(*root).transitive} == {"1.2.0", "1.1.0"}
+    db.close()
+
+def test_cycles_terminate(session_factory):
+    db = session_factory()
+    _publish(db, "a", "1.0.0", [("b", "1.0.0")])
+    _publish(db, "b", "1.0.0", [("a", "1.0.0")])
+    resolution = DependencyResolver(session_factory).resolve("acme-a-aws", "acme-a-aws-1.0.0")
+    assert [t["module"] for t in resolution.transitive] == ["acme/b/aws"]
+
+def test_deep_graph_resolves_quickly(session_factory):
+    db = session_factory()
+    _publish(db, "m0", "1.0.0")
+    for i in range(1, 300):
+        calls = [(f"m{i - 1}", ">= 1.0")] + ([(f"m{i - 2}", "~> 1.0")] if i > 1 else [])
+        root = _publish(db, f"m{i}", "1.0.0", calls)
+    db.close()
+    resolver = DependencyResolver(session_factory)
+
+    started = time.perf_counter()
+    resolution = resolver.resolve(*root)
+    cold = time.perf_counter() - started
+    started = time.perf_counter()
+    resolver.resolve(*root)
+    warm = time.perf_counter() - started
+
+    assert len(resolution.transitive) == 299
+    assert cold < 2 and warm < 0.01
+
+def test_dependents_direct_transitive_and_by_version(session_factory):
+    db = session_factory()
+    _publish(db, "base", "1.0.0")
+    _publish(db, "network", "1.0.0", [("base", "~> 1.0")])
+    _publish(db, "network", "2.0.0", [("base", ">= 1.0")])
+    _publish(db, "app", "1.0.0", [("network", "~> 1.0")])
+    _publish(db, "edge", "1.0.0", [("network", "2.0.0")])
+
+    direct = ReverseDependencyIndex.dependents(db, "acme-base-aws")
+    assert [(d["module"], d["version"], d["depth"]) for d in direct] == [
+        ("acme/network/aws", "1.0.0", 1), ("acme/network/aws", "2.0.0", 1)
+    ]
+    assert direct[0]["calls"] == [{"name": "base", "source": "acme/base/aws", "version": "~> 1.0"}]
+
+    # Only network 2.0.0 admits base 2.0.0, and only edge calls network 2.0.0
+    affected = ReverseDependencyIndex.dependents(db, "acme-base-aws", "2.0.0", transitive=True)
+    assert [(d["module"], d["version"], d["depth"]) for d in affected] == [
+        ("acme/network/aws", "2.0.0", 1), ("acme/edge/aws", "1.0.0", 2)
+    ]
+    assert len(ReverseDependencyIndex.dependents(db, "acme-base-aws", transitive=True)) == 4
+    with pytest.raises(ValueError):
+        ReverseDependencyIndex.dependents(db, "acme-base-aws", "latest")
+    db.close()
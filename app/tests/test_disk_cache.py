@@ -0,0 +1,92 @@
+import pytest
+import asyncio
+import hashlib
+from ..storage.backends import LocalStorageBackend
+from ..storage.disk_cache import DiskCache, CacheIntegrityError
+
+class CountingBackend(LocalStorageBackend):
+    def __init__(self, base_path):
+        super().__init__(base_path)
+        self.fetches = 0
+
+    async def fetch(self, key, destination):
+        self.fetches += 1
+        await asyncio.sleep(0.01)
+        await super().fetch(key, destination)
+
+def _blob(base, key, content):
+    path = base / key
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return hashlib.sha256(content).hexdigest()
+
+@pytest.fixture
+def backend(tmp_path):
+    return CountingBackend(str(tmp_path / "remote"))
+
+def test_concurrent_fills_are_coalesced(tmp_path, backend):
+    digest = _blob(backend.base_path, "a/module.zip", b"a" * 100)
+    cache = DiskCache(backend, str(tmp_path / "cache"), max_bytes=1000)
+
+    async def fetch_many():
+        return await asyncio.gather(*[cache.get("a/module.zip", digest) for _ in range(5)])
+
+    paths = asyncio.run(fetch_many())
+    assert len(set(paths)) == 1
+    assert backend.fetches == 1
+
+    asyncio.run(cache.get("a/module.zip", digest))
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["bytes_served"] == 600
+
+def test_lru_eviction(tmp_path, backend):
+    digests = {key: _blob(backend.base_path, f"{key}/module.zip", key.encode() * 100) for key in "abc"}
+    cache = DiskCache(backend, str(tmp_path / "cache"), max_bytes=250)
+
+    async def access(*keys):
+        for key in keys:
+            await cache.get(f"{key}/module.zip", digests[key])
+
+    asyncio.run(access("a", "b", "a", "c"))
+    assert cache.stats()["evictions"] == 1
+    assert (tmp_path / "cache" / digests["a"]).exists()
+    assert not (tmp_path / "cache" / digests["b"]).exists()
+
+def test_integrity_is_verified_on_fill(tmp_path, backend):
+    _blob(backend.base_path, "a/module.zip", b"tampered")
+    cache = DiskCache(backend, str(tmp_path / "cache"), max_bytes=1000)
+
+    with pytest.raises(CacheIntegrityError):
+        asyncio.run(cache.get("a/module.zip", hashlib.sha256(b"original").hexdigest()))
+    assert list((tmp_path / "cache").iterdir()) == []
+
+def test_refill_replaces_the_size_of_a_vanished_entry(tmp_path, backend):
+    digest = _blob(backend.base_path, "a/module.zip", b"a" * 100)
+    cache = DiskCache(backend, str(tmp_path / "cache"), max_bytes=1000)
+
+    path = asyncio.run(cache.get("a/module.zip", digest))
+    path.unlink()
+    asyncio.run(cache.get("a/module.zip", digest))
+    assert backend.fetches == 2
+    assert cache.stats()["size_bytes"] == 100
+
+def test_open_entries_survive_eviction(tmp_path, backend):
+    digests = {key: _blob(backend.base_path, f"{key}/module.zip", key.encode() * 100) for key in "abc"}
+    cache = DiskCache(backend, str(tmp_path / "cache"), max_bytes=150)
+
+    async def serve_a_while_filling_b():
+        async with cache.pinned("a/module.zip", digests["a"]) as path:
+            await cache.get("b/module.zip", digests["b"])
+            # Over the bound, but a is still being served
+            assert path.exists() and cache.stats()["size_bytes"] == 200
+        handle = await cache.open("b/module.zip", digests["b"])
+        await cache.get("c/module.zip", digests["c"])
+        return handle
+
+    with asyncio.run(serve_a_while_filling_b()) as handle:
+        # The pin on a was released, then c evicted b from under the open handle
+        assert not (tmp_path / "cache" / digests["a"]).exists()
+        assert not (tmp_path / "cache" / digests["b"]).exists()
+        assert handle.read() == b"b" * 100
+    assert cache.stats()["size_bytes"] == 100
@@ -0,0 +1,89 @@
+import gzip
+import json
+import asyncio
+import zipfile
+import brotli
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from .. import main
+from ..doc_artifacts import DocArtifactStore
+from ..models.base import Base
+from ..models.models import Module, ModuleVersion
+from ..rate_limiter import RateLimitResult
+
+def test_renders_once_per_digest_with_compressed_variants(tmp_path, monkeypatch):
+    archive = tmp_path / "module.zip"
+    with zipfile.ZipFile(archive, "w") as zipf:
+        zipf.writestr("main.tf", 'variable "name" {\n  description = "Bucket <name>"\n}\n'
+                                 'module "vpc" {\n  source = "terraform-aws-modules/vpc/aws"\n}\n')
+        zipf.writestr("README.md", "# Title\n\nA bucket.\n")
+    store = DocArtifactStore(str(tmp_path / "artifacts"))
+    writes = []
+    original = store._write
+    monkeypatch.setattr(store, "_write", lambda *args: writes.append(args[0]) or original(*args))
+
+    async def main():
+        return await asyncio.gather(*(store.ensure("abc123", str(archive)) for _ in range(3)))
+
+    directories = asyncio.run(main())
+    assert len(set(directories)) == 1 and writes == ["abc123"]
+
+    docs = json.loads((directories[0] / "docs.json").read_text())
+    assert docs["description"] == "A bucket."
+    assert docs["dependencies"][0]["source"] == "terraform-aws-modules/vpc/aws"
+    assert "| `name` | Bucket <name> |" in (directories[0] / "docs.md").read_text()
+    assert "Bucket &lt;name&gt;" in (directories[0] / "docs.html").read_text()
+
+    path, encoding = store.variant("abc123", "md", "gzip, deflate")
+    assert encoding == "gzip"
+    assert gzip.decompress(path.read_bytes()) == (directories[0] / "docs.md").read_bytes()
+    assert store.variant("abc123", "md", "")[1] is None
+    # Brotli is preferred whenever the client accepts it
+    path, encoding = store.variant("abc123", "html", "gzip, deflate, br;q=0.9")
+    assert encoding == "br"
+    assert brotli.decompress(path.read_bytes()) == (directories[0] / "docs.html").read_bytes()
+    assert store.etag("abc123", "html", "br") != store.etag("abc123", "html", "gzip")
+    assert store.etag("abc123", "md", "gzip") != store.etag("abc123", "md")
+
+    asyncio.run(store.ensure("abc123", str(archive)))
+    assert writes == ["abc123"]
+
+class _Unlimited:
+    async def hit(self, key, cost=1, limit=None, window=None):
+        return RateLimitResult(True, 100, 100, 0.0)
+
+def test_docs_endpoint_serves_brotli(tmp_path, monkeypatch):
+    archive = tmp_path / "module.zip"
+    with zipfile.ZipFile(archive, "w") as zipf:
+        zipf.writestr("main.tf", 'variable "name" {\n  description = "Bucket name"\n}\n')
+    engine = create_engine(f"sqlite:///{tmp_path}/docs.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session_factory = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+    with session_factory() as db:
+        db.add(Module(id="acme-bucket-aws", namespace="acme", name="bucket", provider="aws", version="1.0.0"))
+        db.add(ModuleVersion(id="acme-bucket-aws-1.0.0", module_id="acme-bucket-aws", version="1.0.0",
+                             source_zip=str(archive)))
+        db.commit()
+
+    def override_get_db():
+        db = session_factory()
+        try:
+            yield db
+        finally:
+            db.close()
+
+    store = DocArtifactStore(str(tmp_path / "artifacts"))
+    monkeypatch.setattr(main, "get_doc_store", lambda: store)
+    monkeypatch.setattr(main, "get_rate_limiter", lambda: _Unlimited())
+    main.app.dependency_overrides[main.get_db] = override_get_db
+    try:
+        response = TestClient(main.app).get("/v1/modules/acme/bucket/aws/1.0.0/docs?format=md",
+                                            headers={"Accept-Encoding": "br"})
+    finally:
+        main.app.dependency_overrides.clear()
+
+    assert response.status_code == 200
+    assert response.headers["Content-Encoding"] == "br"
+    assert response.headers["ETag"].endswith('-md-br"')
+    assert "| `name` | Bucket name |" in response.text
@@ -0,0 +1,79 @@
+import time
+from ..docs import DocGenerator
+from ..validation import hcl
+
+MODULE = '''
+terraform {
+  required_version = ">= 1.3"
+  required_providers {
+    aws = { source = "hashicorp/aws", version = "~> 5.0" }
+  }
+}
+variable "name" {
+  description = "Bucket name"
+  type        = string
+}
+variable "tags" {
+  type    = map(string)
+  default = {}
+}
+variable "password" {
+  type      = string
+  sensitive = true
+  default   = "x"
+}
+resource "aws_s3_bucket" "this" {
+  bucket = var.name
+}
+data "aws_caller_identity" "current" {}
+output "arn" {
+  description = "Bucket ARN"
+  value       = aws_s3_bucket.this.arn
+}
+'''
+
+README = """# terraform-aws-bucket
+
+[![CI](https://example.com/badge.svg)](https://example.com)
+
+Creates an S3 bucket with sensible defaults.
+Versioning is enabled.
+
+## Usage
+
+Lots more text that should not be stored.
+"""
+
+def test_extracts_docs_from_all_tf_files(tmp_path):
+    (tmp_path / "main.tf").write_text(MODULE)
+    (tmp_path / "README.md").write_text(README)
+    docs = DocGenerator.generate_module_docs(tmp_path)
+
+    assert docs["inputs"][0] == {
+        "name": "name", "type": "string", "description": "Bucket name",
+        "default": None, "required": True, "sensitive": False, "file": "main.tf"
+    }
+    password = next(item for item in docs["inputs"] if item["name"] == "password")
+    assert password["sensitive"] and not password["required"]
+    assert next(item for item in docs["inputs"] if item["name"] == "tags")["type"] == "map(string)"
+    assert docs["outputs"] == [{"name": "arn", "description": "Bucket ARN", "sensitive": False, "file": "main.tf"}]
+    assert docs["resources"] == [{"type": "aws_s3_bucket", "name": "this", "file": "main.tf"}]
+    assert docs["data_sources"] == [{"type": "aws_caller_identity", "name": "current", "file": "main.tf"}]
+    assert docs["required_providers"] == {"registry.terraform.io/hashicorp/aws": "~> 5.0"}
+    assert docs["required_version"] == ">= 1.3"
+    assert docs["description"] == "Creates an S3 bucket with sensible defaults. Versioning is enabled."
+
+def test_large_module_is_fast_and_parses_are_memoized(tmp_path, monkeypatch):
+    for i in range(50):
+        (tmp_path / f"vars{i}.tf").write_text("".join(
+            f'variable "v{i}_{j}" {{\n  type = string\n  default = "{j}"\n}}\n' for j in range(20)
+        ))
+    started = time.perf_counter()
+    docs = DocGenerator.generate_module_docs(tmp_path)
+    assert len(docs["inputs"]) == 1000
+    assert time.perf_counter() - started < 1.0
+
+    calls = []
+    monkeypatch.setattr(hcl.hcl2, "loads", lambda text: calls.append(text) or {})
+    DocGenerator.generate_module_docs(tmp_path)
+    assert calls == []
@@ -0,0 +1,60 @@
+import os
+import stat
+import zipfile
+import pytest
+from ..storage.extract import ArchiveLimitError, ExtractionLimits, extract_archive, is_validation_file
+
+def make_archive(tmp_path, entries):
+    path = tmp_path / "module.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        for name, content in entries.items():
+            # A ZipInfo keeps the name as given; writestr(str) would sanitise it
+            zipf.writestr(zipfile.ZipInfo(name), content, zipfile.ZIP_DEFLATED)
+    return str(path)
+
+def test_extracts_every_file_or_only_terraform_files(tmp_path):
+    archive = make_archive(tmp_path, {
+        "main.tf": 'locals {\n  policy = file("${path.module}/policies/bucket.json")\n}\n',
+        "modules/net/main.tf.json": "{}",
+        ".terraform-version": "1.6.0",
+        "policies/bucket.json": "{}",
+        "templates/user_data.sh.tpl": "#!/bin/sh",
+        "README.md": "readme",
+    })
+    # file() and templatefile() need the module's other files at validation time
+    everything = tmp_path / "all"
+    everything.mkdir()
+    assert sorted(extract_archive(archive, str(everything))) == [
+        ".terraform-version", "README.md", "main.tf", "modules/net/main.tf.json",
+        "policies/bucket.json", "templates/user_data.sh.tpl"
+    ]
+    assert (everything / "policies" / "bucket.json").read_text() == "{}"
+
+    hcl = tmp_path / "hcl"
+    hcl.mkdir()
+    assert sorted(extract_archive(archive, str(hcl), include=is_validation_file)) == [
+        ".terraform-version", "main.tf", "modules/net/main.tf.json"
+    ]
+    assert not (hcl / "policies").exists()
+
+@pytest.mark.parametrize("entries, limits", [
+    ({f"f{i}.tf": "" for i in range(11)}, ExtractionLimits(max_entries=10)),
+    ({"main.tf": "x" * 2048}, ExtractionLimits(max_total_bytes=1024)),
+    ({"main.tf": "", "bomb.bin": b"\0" * (4 * 1024 * 1024)}, ExtractionLimits(max_ratio=100)),
+    ({"../../etc/cron.d/evil.tf": ""}, ExtractionLimits()),
+    ({"/abs/main.tf": ""}, ExtractionLimits()),
+])
+def test_budgets_and_unsafe_paths(tmp_path, entries, limits):
+    archive = make_archive(tmp_path, entries)
+    with pytest.raises(ArchiveLimitError):
+        extract_archive(archive, str(tmp_path), limits)
+
+def test_rejects_symlinks(tmp_path):
+    archive = str(tmp_path / "link.zip")
+    with zipfile.ZipFile(archive, "w") as zipf:
+        info = zipfile.ZipInfo("main.tf")
+        info.external_attr = (stat.S_IFLNK | 0o777) << 16
+        zipf.writestr(info, "/etc/passwd")
+    with pytest.raises(ArchiveLimitError):
+        extract_archive(archive, str(tmp_path))
+    assert not os.path.islink(tmp_path / "main.tf")
@@ -0,0 +1,46 @@
+import zipfile
+import pytest
+from ..validation.hcl import parse_archive
+from ..docs import DocGenerator
+from ..dependencies import DependencyManager
+
+def make_archive(tmp_path, files):
+    path = tmp_path / "module.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        for name, content in files.items():
+            zipf.writestr(name, content)
+    return str(path)
+
+def test_parses_each_file_once_for_docs_and_dependencies(tmp_path):
+    archive = make_archive(tmp_path, {
+        "variables.tf": 'variable "region" {\n  description = "AWS region"\n  type = string\n}\n',
+        "main.tf": 'module "vpc" {\n  source = "terraform-aws-modules/vpc/aws"\n  version = "~> 5.0"\n}\n'
+                   'resource "aws_s3_bucket" "logs" {}\n',
+        "outputs.tf": 'output "bucket" {\n  value = aws_s3_bucket.logs.id\n}\n',
+        "examples/basic/main.tf": 'module "root" {\n  source = "../.."\n}\n',
+        "README.md": "Log bucket",
+    })
+    parsed, errors = parse_archive(archive)
+    assert errors == {}
+    assert sorted(parsed.files) == ["examples/basic/main.tf", "main.tf", "outputs.tf", "variables.tf"]
+
+    docs = DocGenerator.generate_from_parsed(parsed)
+    assert [item["name"] for item in docs["inputs"]] == ["region"]
+    assert [item["name"] for item in docs["outputs"]] == ["bucket"]
+    assert docs["resources"] == [{"type": "aws_s3_bucket", "name": "logs", "file": "main.tf"}]
+    assert docs["description"] == "Log bucket"
+    assert DependencyManager.extract_dependencies(parsed) == [
+        {"name": "vpc", "source": "terraform-aws-modules/vpc/aws", "version": "~> 5.0", "file": "main.tf"}
+    ]
+
+@pytest.mark.parametrize("files, key", [
+    ({"README.md": "no terraform"}, "terraform_files"),
+    ({"main.tf": 'variable "x" {'}, "hcl"),
+    ({"main.tf": 'variable "x" {\n  typo = string\n}\n'}, "hcl"),
+    ({"a.tf": 'variable "x" {}\n', "b.tf": 'variable "x" {}\n'}, "hcl"),
+    ({"main.tf": 'output "x" {\n  description = "missing value"\n}\n'}, "hcl"),
+])
+def test_rejects_malformed_modules(tmp_path, files, key):
+    parsed, errors = parse_archive(make_archive(tmp_path, files))
+    assert parsed is None
+    assert list(errors) == [key]
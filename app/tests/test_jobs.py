@@ -0,0 +1,105 @@
+import pytest
+import asyncio
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..models.base import Base
+from ..jobs import JobQueue, UploadPipeline, StageError, WorkerPool, pipeline
+from ..storage import ModuleStorage
+from ..storage.storage import STAGING_DIR
+
+@pytest.fixture
+def job_queue(tmp_path, monkeypatch):
+    # Failed jobs remove their archive from storage, which is relative to cwd
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine(f"sqlite:///{tmp_path}/jobs.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    queue = JobQueue(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    queue.retry_delay = 0
+    return queue
+
+def _run(pool, job_queue):
+    job = job_queue.claim("test-worker")
+    asyncio.run(pool.process(job))
+    return job_queue.get(job["id"])
+
+def test_job_runs_all_stages(job_queue):
+    async def first(ctx):
+        return {"value": 1}
+
+    async def second(ctx):
+        return {"doubled": ctx["value"] * 2}
+
+    pool = WorkerPool(queue=job_queue, pipeline=UploadPipeline([("first", first), ("second", second)]))
+    job_id = job_queue.enqueue("test", "module", "aws", "1.0.0", "/tmp/module.zip")
+
+    job = _run(pool, job_queue)
+    assert job["id"] == job_id
+    assert job["status"] == "succeeded"
+    assert job["result"]["doubled"] == 2
+    assert all(stage["status"] == "succeeded" for stage in job["stages"].values())
+    assert "duration_ms" in job["stages"]["second"]
+
+def test_transient_failure_is_retried_from_failed_stage(job_queue):
+    calls = {"first": 0, "flaky": 0}
+
+    async def first(ctx):
+        calls["first"] += 1
+        return {}
+
+    async def flaky(ctx):
+        calls["flaky"] += 1
+        if calls["flaky"] == 1:
+            raise RuntimeError("provider download timed out")
+        return {}
+
+    pool = WorkerPool(queue=job_queue, pipeline=UploadPipeline([("first", first), ("flaky", flaky)]))
+    job_queue.enqueue("test", "module", "aws", "1.0.0", "/tmp/module.zip")
+
+    job = _run(pool, job_queue)
+    assert job["status"] == "queued"
+    assert job["stages"]["flaky"]["status"] == "failed"
+
+    job = _run(pool, job_queue)
+    assert job["status"] == "succeeded"
+    assert calls == {"first": 1, "flaky": 2}
+
+def test_permanent_failure_is_not_retried(job_queue):
+    async def invalid(ctx):
+        raise StageError({"terraform_files": "Module must contain at least one .tf file"}, permanent=True)
+
+    pool = WorkerPool(queue=job_queue, pipeline=UploadPipeline([("validate", invalid)]))
+    job_queue.enqueue("test", "module", "aws", "1.0.0", "/tmp/module.zip")
+
+    job = _run(pool, job_queue)
+    assert job["status"] == "failed"
+    assert job["error"]["stage"] == "validate"
+    assert job_queue.claim("test-worker") is None
+
+def test_register_moves_staged_upload_and_rejects_duplicates(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    engine = create_engine(f"sqlite:///{tmp_path}/register.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    monkeypatch.setattr(pipeline, "SessionLocal", sessionmaker(autocommit=False, autoflush=False, bind=engine))
+
+    def stage(job_id, content):
+        staged = tmp_path / ModuleStorage.BASE_PATH / STAGING_DIR / "acme" / "bucket" / job_id
+        staged.mkdir(parents=True)
+        (staged / "module.zip").write_bytes(content)
+        (staged / "module.tar.gz").write_bytes(content)
+        return str(staged / "module.zip")
+
+    ctx = {"namespace": "acme", "name": "bucket", "provider": "aws", "version": "1.0.0"}
+    first = stage("job1", b"original")
+    result = pipeline._register({**ctx, "source_zip": first})
+    final = tmp_path / result["source_zip"]
+    assert final.read_bytes() == b"original" and final.with_name("module.tar.gz").exists()
+    assert not (tmp_path / first).exists()
+
+    second = stage("job2", b"replacement")
+    with pytest.raises(StageError) as e:
+        pipeline._register({**ctx, "source_zip": second})
+    assert e.value.permanent
+    assert final.read_bytes() == b"original"
+    assert (tmp_path / second).exists()
+    assert asyncio.run(ModuleStorage.discard_upload(second)) is True
+    assert not (tmp_path / second).parent.exists()
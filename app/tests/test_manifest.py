@@ -0,0 +1,93 @@
+import zipfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..models.base import Base
+from ..models.models import Module, ModuleVersion
+from ..docs import DocGenerator
+from ..validation import hcl
+from ..validation.hcl import parse_archive
+from ..validation.manifest import ManifestStore
+
+VARIABLES = '''
+variable "name" {
+  type = string
+}
+variable "tags" {
+  type    = map(string)
+  default = {}
+}
+'''
+
+OUTPUTS = '''
+output "id" {
+  value = aws_s3_bucket.this.id
+}
+output "arn" {
+  value = aws_s3_bucket.this.arn
+}
+'''
+
+def _zip(path, files):
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        for name, content in files.items():
+            zip_ref.writestr(name, content)
+    return str(path)
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/manifest.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+def _register(session_factory, version, parsed):
+    db = session_factory()
+    if not db.query(Module).filter_by(id="acme-bucket-aws").first():
+        db.add(Module(id="acme-bucket-aws", namespace="acme", name="bucket", provider="aws", version=version))
+        db.flush()
+    db.add(ModuleVersion(id=f"acme-bucket-aws-{version}", module_id="acme-bucket-aws", version=version))
+    db.flush()
+    db.add_all(ManifestStore.manifest_rows(f"acme-bucket-aws-{version}", parsed))
+    db.commit()
+    db.close()
+
+def test_only_changed_files_are_parsed_again(tmp_path, session_factory, monkeypatch):
+    main = 'resource "aws_s3_bucket" "this" {\n  bucket = var.name\n}\n'
+    first, errors = parse_archive(_zip(tmp_path / "v1.zip", {"main.tf": main, "variables.tf": VARIABLES, "outputs.tf": OUTPUTS}))
+    assert not errors
+    ManifestStore.save_parsed(first, session_factory)
+    _register(session_factory, "1.0.0", first)
+
+    known = ManifestStore.previous_files("acme-bucket-aws", session_factory)
+    assert set(known) == set(first.hashes.values())
+
+    parsed_contents = []
+    real_parse = hcl.parse_hcl
+    monkeypatch.setattr(hcl, "parse_hcl", lambda content, key=None: parsed_contents.append(content) or real_parse(content, key))
+    changed = main.replace("var.name", "\"${var.name}-logs\"")
+    second, errors = parse_archive(_zip(tmp_path / "v2.zip", {"main.tf": changed, "variables.tf": VARIABLES, "outputs.tf": OUTPUTS}), known)
+    assert not errors
+    assert parsed_contents == [changed.encode()]
+    assert second.files["variables.tf"] == first.files["variables.tf"]
+
+    db = session_factory()
+    loaded = ManifestStore.load(db, "acme-bucket-aws-1.0.0")
+    assert loaded.files == first.files and loaded.hashes == first.hashes
+    assert ManifestStore.load(db, "acme-bucket-aws-9.9.9") is None
+    db.close()
+
+def test_interface_diff_flags_breaking_changes(tmp_path):
+    old, _ = parse_archive(_zip(tmp_path / "old.zip", {"variables.tf": VARIABLES, "outputs.tf": OUTPUTS}))
+    new_variables = VARIABLES.replace("map(string)", "map(any)") + 'variable "region" {\n  type = string\n}\n'
+    new_outputs = OUTPUTS.replace('output "arn"', 'output "bucket_arn"')
+    new, _ = parse_archive(_zip(tmp_path / "new.zip", {"variables.tf": new_variables, "outputs.tf": new_outputs,
+                                                       "main.tf": 'resource "aws_s3_bucket" "logs" {}\n'}))
+
+    diff = DocGenerator.diff(DocGenerator.generate_from_parsed(old), DocGenerator.generate_from_parsed(new))
+    assert diff["inputs"]["added"] == ["region"]
+    assert diff["inputs"]["changed"] == {"tags": {"type": {"from": "map(string)", "to": "map(any)"}}}
+    assert diff["outputs"] == {"added": ["bucket_arn"], "removed": ["arn"], "changed": {}}
+    assert diff["resources"] == {"added": ["aws_s3_bucket.logs"], "removed": []}
+    assert sorted(diff["breaking_changes"]) == [
+        'input "tags" changed type', 'new input "region" is required', 'output "arn" was removed'
+    ]
@@ -0,0 +1,53 @@
+import tarfile
+import zipfile
+from ..storage.normalize import normalize_archive, is_excluded
+
+def _write_zip(path, entries, date_time):
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_STORED) as zipf:
+        for name, content in entries:
+            zipf.writestr(zipfile.ZipInfo(name, date_time=date_time), content)
+
+ENTRIES = [
+    ("variables.tf", 'variable "name" {}\n' * 50),
+    ("main.tf", 'resource "aws_s3_bucket" "this" {}\n' * 50),
+    (".terraform/providers/registry.terraform.io/hashicorp/aws/terraform-provider-aws_v5.0.0", "binary" * 1000),
+    (".git/HEAD", "ref: refs/heads/main"),
+    ("terraform.tfstate", "{}"),
+]
+
+def test_normalization_is_deterministic(tmp_path):
+    first = tmp_path / "a" / "module.zip"
+    second = tmp_path / "b" / "module.zip"
+    first.parent.mkdir()
+    second.parent.mkdir()
+    _write_zip(first, ENTRIES, (2024, 1, 1, 12, 0, 0))
+    _write_zip(second, list(reversed(ENTRIES)), (2023, 6, 1, 8, 30, 0))
+
+    one = normalize_archive(str(first))
+    two = normalize_archive(str(second))
+
+    assert one.digest == two.digest
+    assert first.read_bytes() == second.read_bytes()
+    assert (tmp_path / "a" / "module.tar.gz").read_bytes() == (tmp_path / "b" / "module.tar.gz").read_bytes()
+
+def test_normalization_strips_excluded_paths(tmp_path):
+    archive = tmp_path / "module.zip"
+    _write_zip(archive, ENTRIES, (2024, 1, 1, 12, 0, 0))
+
+    result = normalize_archive(str(archive))
+
+    with zipfile.ZipFile(archive) as zipf:
+        assert zipf.namelist() == ["main.tf", "variables.tf"]
+        assert all(info.date_time == (1980, 1, 1, 0, 0, 0) for info in zipf.infolist())
+    with tarfile.open(tmp_path / "module.tar.gz") as tar:
+        assert tar.getnames() == ["main.tf", "variables.tf"]
+    assert len(result.removed) == 3
+    assert result.bytes_saved > 0
+    assert result.to_dict()["bytes_saved"] == result.original_size - result.archive_size
+
+def test_is_excluded():
+    assert is_excluded("modules/vpc/.terraform/terraform.tfstate")
+    assert is_excluded("../escape.tf")
+    assert is_excluded("terraform-provider-aws_v5.0.0_x5")
+    assert not is_excluded("modules/vpc/main.tf")
+    assert not is_excluded("files/lambda.zip")
@@ -0,0 +1,78 @@
+import os
+import fcntl
+import asyncio
+from ..validation import plugins
+from ..validation.plugins import ProviderCache, find_required_providers, normalize_provider_source
+
+def test_normalize_provider_source():
+    assert normalize_provider_source("aws") == "registry.terraform.io/hashicorp/aws"
+    assert normalize_provider_source("Integrations/GitHub") == "registry.terraform.io/integrations/github"
+    assert normalize_provider_source("example.com/acme/widget") == "example.com/acme/widget"
+
+def test_find_required_providers(tmp_path):
+    (tmp_path / "versions.tf").write_text('''
+terraform {
+  required_providers {
+    aws = { source = "hashicorp/aws", version = "~> 5.0" }
+    random = ">= 3.0"
+  }
+}
+''')
+    assert find_required_providers(str(tmp_path)) == {
+        "registry.terraform.io/hashicorp/aws": "~> 5.0",
+        "registry.terraform.io/hashicorp/random": ">= 3.0"
+    }
+
+def test_offline_mirror_config(tmp_path):
+    cache = ProviderCache(str(tmp_path / "cache"), str(tmp_path / "mirror"), offline=True)
+    config = cache.cli_config.read_text()
+    # The shared cache is only ever read by init, as a mirror
+    assert "plugin_cache_dir" not in config
+    assert f'path = "{tmp_path / "cache" / "providers"}"' in config
+    assert f'path = "{tmp_path / "mirror"}"' in config
+    assert "direct" not in config
+    assert cache.env()["TF_CLI_CONFIG_FILE"] == str(cache.cli_config)
+    assert "TF_PLUGIN_CACHE_DIR" not in cache.env()
+
+def test_offline_without_mirror_only_uses_the_cache(tmp_path):
+    cache = ProviderCache(str(tmp_path / "cache"), offline=True)
+    config = cache.cli_config.read_text()
+    assert f'path = "{tmp_path / "cache" / "providers"}"' in config
+    assert "direct" not in config
+    assert "direct {}" in ProviderCache(str(tmp_path / "online")).cli_config.read_text()
+
+def test_usage_ranking(tmp_path):
+    cache = ProviderCache(str(tmp_path / "cache"), str(tmp_path / "mirror"))
+    cache.record_usage(["registry.terraform.io/hashicorp/aws", "registry.terraform.io/hashicorp/random"])
+    cache.record_usage(["registry.terraform.io/hashicorp/aws"])
+    assert cache.top_providers(1) == ["registry.terraform.io/hashicorp/aws"]
+
+def test_inits_share_the_lock_whatever_their_constraints(tmp_path, monkeypatch):
+    cache = ProviderCache(str(tmp_path / "cache"), str(tmp_path / "mirror"))
+    modes = []
+    monkeypatch.setattr(plugins.fcntl, "flock", lambda lock, mode: modes.append(mode))
+
+    async def init():
+        async with cache.init_lock_async():
+            pass
+
+    asyncio.run(init())
+    assert modes == [fcntl.LOCK_SH, fcntl.LOCK_UN]
+
+def test_publish_moves_downloaded_providers_into_the_cache(tmp_path):
+    cache = ProviderCache(str(tmp_path / "cache"))
+    installed = tmp_path / "module" / ".terraform" / "providers" / "registry.terraform.io" / "hashicorp"
+    aws = installed / "aws" / "5.0.0" / "linux_amd64"
+    aws.mkdir(parents=True)
+    (aws / "terraform-provider-aws_v5.0.0").write_text("binary")
+    # Providers init linked from the cache are already shared
+    linked = cache.providers_dir / "registry.terraform.io" / "hashicorp" / "random" / "3.5.0" / "linux_amd64"
+    linked.mkdir(parents=True)
+    (installed / "random" / "3.5.0").mkdir(parents=True)
+    os.symlink(linked, installed / "random" / "3.5.0" / "linux_amd64")
+
+    assert cache.publish(str(tmp_path / "module")) == ["registry.terraform.io/hashicorp/aws/5.0.0/linux_amd64"]
+    published = cache.providers_dir / "registry.terraform.io" / "hashicorp" / "aws" / "5.0.0" / "linux_amd64"
+    assert (published / "terraform-provider-aws_v5.0.0").read_text() == "binary"
+    assert list(cache.staging_dir.iterdir()) == []
+    assert cache.publish(str(tmp_path / "module")) == []
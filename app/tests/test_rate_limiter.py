@@ -0,0 +1,224 @@
+import time
+import asyncio
+import jwt
+import pytest
+from fastapi import FastAPI, Request
+from fastapi.testclient import TestClient
+from redis.exceptions import ConnectionError
+from ..auth.auth import SECRET_KEY, ALGORITHM
+from ..middleware import RatePolicies, RateLimitMiddleware, RequestIdMiddleware, TimingMiddleware
+from ..rate_limiter import RECONCILE_SCRIPT, LocalRateLimiter, RateLimiter
+
+fakeredis = pytest.importorskip("fakeredis")
+pytest.importorskip("lupa")
+
+@pytest.fixture
+def redis_client():
+    return fakeredis.FakeRedis(decode_responses=True)
+
+def test_burst_then_deny_with_headers(redis_client):
+    limiter = RateLimiter(redis_client=redis_client, limit=3, window=60)
+    results = [asyncio.run(limiter.hit("1.2.3.4")) for _ in range(4)]
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    assert results[0].headers() == {
+        "RateLimit-Limit": "3", "RateLimit-Remaining": "2", "RateLimit-Reset": "20", "RateLimit-Policy": "3;w=60"
+    }
+    # One request is replenished every window / limit seconds
+    assert 19 < results[3].retry_after <= 20
+    assert results[3].headers()["Retry-After"] == "20"
+
+def test_key_always_has_a_ttl(redis_client):
+    limiter = RateLimiter(redis_client=redis_client, limit=10, window=60)
+    asyncio.run(limiter.hit("client", cost=4))
+    assert 0 < redis_client.pttl("rate_limit:client") <= 24000
+    assert asyncio.run(limiter.hit("client", cost=7)).allowed is False
+    assert asyncio.run(limiter.hit("client", cost=6)).remaining == 0
+
+def test_fails_open_without_redis(redis_client):
+    limiter = RateLimiter(redis_client=redis_client, limit=1)
+
+    def unavailable(**kwargs):
+        raise ConnectionError("connection refused")
+    limiter._script = unavailable
+
+    assert asyncio.run(limiter.check_rate_limit("client")) is True
+
+def test_hit_does_not_block_the_event_loop(redis_client, monkeypatch):
+    limiter = RateLimiter(redis_client=redis_client, limit=1)
+    consume = limiter.consume
+
+    def slow_redis(*args):
+        time.sleep(0.2)
+        return consume(*args)
+    monkeypatch.setattr(limiter, "consume", slow_redis)
+
+    async def run():
+        ticks = []
+
+        async def ticker():
+            for _ in range(5):
+                ticks.append(time.monotonic())
+                await asyncio.sleep(0.01)
+        _, result = await asyncio.gather(ticker(), limiter.hit("client"))
+        return result, ticks
+
+    result, ticks = asyncio.run(run())
+    assert result.allowed
+    assert ticks[-1] - ticks[0] < 0.15
+
+def test_local_buckets_sync_usage_in_batches(redis_client):
+    shared = RateLimiter(redis_client=redis_client, limit=10, window=60)
+    worker_a = LocalRateLimiter(shared, sync_interval=3600, sync_fraction=1)
+    worker_b = LocalRateLimiter(shared, sync_interval=3600, sync_fraction=1)
+
+    assert all(worker_a.consume("client").allowed for _ in range(6))
+    assert worker_a.consume("other", cost=2).allowed
+    # Nothing reaches Redis until a sync, which sends every key in one batch
+    assert redis_client.get("rate_limit:client") is None
+    assert worker_a.sync() == 2
+    assert shared.consume("client", cost=4).remaining == 0
+
+    # The other worker learns about the usage on its next sync
+    assert worker_b.consume("client").allowed
+    worker_b.sync()
+    result = worker_b.consume("client")
+    assert result.allowed is False and result.retry_after > 0
+
+def test_new_buckets_start_with_a_share_of_the_limit(redis_client):
+    shared = RateLimiter(redis_client=redis_client, limit=8, window=60)
+    workers = [LocalRateLimiter(shared, sync_interval=3600, sync_fraction=1, processes=4) for _ in range(4)]
+
+    admitted = [sum(worker.consume("client").allowed for _ in range(8)) for worker in workers]
+    # Fresh processes together admit one limit, not one limit each
+    assert admitted == [2, 2, 2, 2]
+
+def test_fresh_buckets_admit_a_request_costing_more_than_the_share(redis_client):
+    shared = RateLimiter(redis_client=redis_client, limit=200, window=60)
+    workers = [LocalRateLimiter(shared, sync_interval=3600, sync_fraction=1, processes=8) for _ in range(2)]
+
+    # A batch upload costs 50 against a share of 25
+    assert all(worker.consume("publisher", cost=50).allowed for worker in workers)
+    assert not workers[0].consume("publisher", cost=50).allowed
+    for worker in workers:
+        worker.sync()
+    assert shared.consume("publisher", cost=1).remaining == 99
+
+def test_usage_is_synced_on_a_timer(redis_client):
+    worker = LocalRateLimiter(RateLimiter(redis_client=redis_client, limit=10, window=60),
+                              sync_interval=0.05, sync_fraction=1)
+
+    async def run():
+        worker.start()
+        worker.consume("client", cost=3)
+        # No further requests arrive, the timer pushes the usage anyway
+        await asyncio.sleep(0.3)
+        synced = redis_client.get("rate_limit:client")
+        await worker.close()
+        return synced
+
+    assert asyncio.run(run()) is not None
+    assert worker._timer is None
+
+def test_local_buckets_survive_redis_errors(redis_client):
+    worker = LocalRateLimiter(RateLimiter(redis_client=redis_client, limit=5, window=60), sync_interval=3600)
+
+    def unavailable(*args, **kwargs):
+        raise ConnectionError("timeout")
+    real_pipeline = redis_client.pipeline
+    redis_client.pipeline = lambda **kwargs: type("Pipeline", (), {"execute": unavailable})()
+    worker._script = lambda **kwargs: None
+
+    assert [worker.consume("client").allowed for _ in range(6)] == [True] * 5 + [False]
+    assert worker.sync() == 0
+
+    redis_client.pipeline = real_pipeline
+    worker._script = redis_client.register_script(RECONCILE_SCRIPT)
+    assert worker.sync() == 1
+    assert int(redis_client.pttl("rate_limit:client")) > 59000
+
+def _token(**claims):
+    return {"Authorization": f"Bearer {jwt.encode(claims, SECRET_KEY, algorithm=ALGORITHM)}"}
+
+def test_policies_weight_routes_and_principals(redis_client):
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, get_limiter=lambda: limiter, policies=RatePolicies(budgets={
+        "anonymous": {"read": 5, "heavy": 2}, "publisher": {"read": 5, "heavy": 20}, "service": {"read": 5, "heavy": 40}
+    }))
+    limiter = RateLimiter(redis_client=redis_client)
+
+    @app.get("/v1/modules/{namespace}/{name}/{provider}/versions")
+    async def versions():
+        return {}
+
+    @app.post("/api/modules/{namespace}/{name}/{provider}/{version}/upload")
+    async def upload():
+        return {}
+
+    client = TestClient(app)
+    upload = "/api/modules/acme/bucket/aws/1.0.0/upload"
+    publisher = _token(sub="alice", permissions=["read:module", "upload:module"])
+    # Uploads cost 10 against the heavy budget and leave reads alone
+    assert [client.post(upload, headers=publisher).status_code for _ in range(3)] == [200, 200, 429]
+    assert client.get("/v1/modules/acme/bucket/aws/versions", headers=publisher).headers["RateLimit-Remaining"] == "4"
+    # A CI account and an anonymous client each have their own quota
+    ci = _token(sub="ci", role="service")
+    assert [client.post(upload, headers=ci).status_code for _ in range(5)] == [200] * 4 + [429]
+    response = client.post(upload, headers={"Authorization": "Bearer not-a-token"})
+    assert response.status_code == 200 and response.headers["RateLimit-Policy"] == "2;w=60"
+
+@pytest.mark.parametrize("method, path, route, budget, cost", [
+    ("POST", "/api/modules/acme/bucket/aws/1.0.0/upload", "upload", "heavy", 10),
+    ("POST", "/api/modules/batch", "batch_upload", "heavy", 50),
+    ("POST", "/api/generate", "generate", "heavy", 20),
+    ("GET", "/v1/modules/acme/bucket/aws/1.0.0/dependencies", "resolve", "heavy", 5),
+    ("GET", "/v1/modules/acme/bucket/aws/1.0.0/diff", "resolve", "heavy", 5),
+    ("GET", "/v1/modules/acme/bucket/aws/dependents", "resolve", "heavy", 5),
+    ("GET", "/v1/modules/acme/bucket/aws/1.0.0/docs", "docs", "read", 2),
+    ("POST", "/api/admin/dependencies/reindex", "reindex", "heavy", 50),
+    ("POST", "/api/admin/storage/gc", "gc", "heavy", 50),
+    ("GET", "/api/admin/jobs/stats", "admin", "admin", 1),
+    ("POST", "/api/admin/auth/revoke", "admin", "admin", 1),
+    ("GET", "/v1/modules/acme/bucket/aws/versions", "read", "read", 1),
+    # A module or provider named after a heavy route is still a read
+    ("GET", "/v1/modules/acme/diff/aws", "read", "read", 1),
+    ("GET", "/v1/modules/acme/docs/aws/1.0.0", "read", "read", 1),
+])
+def test_route_classes_draw_from_their_budget(method, path, route, budget, cost):
+    policies = RatePolicies(budgets={"anonymous": {"read": 100, "heavy": 60, "admin": 10}})
+    decision = policies.decide(method, path, host="1.2.3.4")
+    assert (decision.route, decision.key, decision.cost) == (route, f"{budget}:ip:1.2.3.4", cost)
+    assert decision.limit == {"read": 100, "heavy": 60, "admin": 10}[budget]
+
+def test_budgets_and_bypass_are_read_when_policies_are_built(monkeypatch):
+    monkeypatch.setenv("RATE_LIMIT_REQUESTS", "7")
+    monkeypatch.setenv("RATE_LIMIT_BYPASS", "/ping")
+    policies = RatePolicies()
+    assert policies.decide("GET", "/v1/modules/search", host="1.2.3.4").limit == 7
+    assert policies.bypasses("/ping") and not policies.bypasses("/health")
+
+def test_bypassed_paths_skip_the_limiter():
+    def unavailable():
+        raise AssertionError("limiter used for a bypassed path")
+
+    app = FastAPI()
+    app.add_middleware(RateLimitMiddleware, get_limiter=unavailable,
+                       policies=RatePolicies(bypass=["/.well-known/terraform.json", "/static/*"]))
+    app.add_middleware(TimingMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+
+    @app.get("/.well-known/terraform.json")
+    async def discovery(request: Request):
+        return {"request_id": request.state.request_id}
+
+    @app.get("/static/{name}")
+    async def static(name: str):
+        return {}
+
+    client = TestClient(app)
+    response = client.get("/.well-known/terraform.json", headers={"X-Request-ID": "abc123"})
+    assert response.json() == {"request_id": "abc123"} and response.headers["X-Request-ID"] == "abc123"
+    assert response.headers["Server-Timing"].startswith("app;dur=")
+    assert "RateLimit-Limit" not in response.headers
+    assert len(client.get("/static/logo.svg").headers["X-Request-ID"]) == 32
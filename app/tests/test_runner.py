@@ -0,0 +1,31 @@
+import asyncio
+import pytest
+from ..validation.runner import TerraformRunner, TerraformTimeout
+
+def test_run_captures_output():
+    result = asyncio.run(TerraformRunner(1).run(["sh", "-c", "echo out; echo err >&2; exit 3"], stage="validate"))
+    assert (result.returncode, result.stdout, result.stderr) == (3, "out\n", "err\n")
+
+def test_timeout_kills_process_group():
+    runner = TerraformRunner(1)
+    with pytest.raises(TerraformTimeout):
+        asyncio.run(runner.run(["sh", "-c", "sleep 30 & wait"], stage="init", timeout=0.2))
+    assert runner.stats()["timeouts"] == 1
+
+def test_slots_bound_concurrency():
+    runner = TerraformRunner(2)
+    peak = []
+
+    async def job():
+        async with runner.slot():
+            peak.append(runner.running)
+            await asyncio.sleep(0.05)
+
+    async def main():
+        await asyncio.gather(*(job() for _ in range(6)))
+
+    asyncio.run(main())
+    stats = runner.stats()
+    assert max(peak) == 2
+    assert stats["completed"] == 6 and stats["queue_depth"] == 0
+    assert stats["wait_ms"]["max"] >= 50
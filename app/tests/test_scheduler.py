@@ -0,0 +1,77 @@
+import zipfile
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..models.base import Base
+from ..jobs import JobQueue, FairScheduler, BULK
+from ..jobs.scheduler import Candidate
+
+NOW = datetime(2024, 1, 1, 12, 0, 0)
+
+def candidate(job_id, namespace, lane="interactive", size=0, roots=1, waited=0):
+    return Candidate(job_id, namespace, lane, size, roots, NOW - timedelta(seconds=waited))
+
+def ids(ordered):
+    return [c.id for c in ordered]
+
+def test_interactive_lane_goes_first_until_bulk_ages():
+    scheduler = FairScheduler()
+    jobs = [candidate("bulk", "team", BULK, waited=60), candidate("single", "other", waited=1)]
+    assert ids(scheduler.order(jobs, {}, NOW)) == ["single", "bulk"]
+
+    jobs[0] = candidate("bulk", "team", BULK, waited=scheduler.bulk_max_wait)
+    assert ids(scheduler.order(jobs, {}, NOW)) == ["bulk", "single"]
+
+def test_namespaces_take_turns_and_small_jobs_go_first():
+    scheduler = FairScheduler()
+    jobs = [candidate(f"big{i}", "bulkteam", size=10 ** 9, waited=100 - i) for i in range(3)]
+    jobs += [candidate("tiny", "bulkteam", size=10, waited=1)]
+    jobs += [candidate("solo", "other", size=10 ** 6, waited=2)]
+    assert ids(scheduler.order(jobs, {}, NOW)) == ["tiny", "solo", "big0", "big1", "big2"]
+    # A namespace already running work yields to one that is idle
+    assert ids(scheduler.order(jobs, {"bulkteam": 2}, NOW))[:2] == ["solo", "tiny"]
+
+def test_roots_count_towards_cost_and_old_jobs_are_not_starved():
+    scheduler = FairScheduler()
+    jobs = [candidate("many-roots", "ns", size=100, roots=20), candidate("one-root", "ns", size=200)]
+    assert ids(scheduler.order(jobs, {}, NOW)) == ["one-root", "many-roots"]
+    jobs[0] = candidate("many-roots", "ns", size=100, roots=20, waited=scheduler.max_wait)
+    assert ids(scheduler.order(jobs, {}, NOW)) == ["many-roots", "one-root"]
+
+def test_claim_uses_scheduler_and_reports_lane_waits(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/jobs.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    queue = JobQueue(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    archive = tmp_path / "module.zip"
+    with zipfile.ZipFile(archive, "w") as zipf:
+        zipf.writestr("main.tf", "")
+        zipf.writestr("modules/a/main.tf", "")
+
+    bulk = [queue.enqueue("bulkteam", f"m{i}", "aws", "1.0.0", str(archive), lane=BULK) for i in range(3)]
+    single = queue.enqueue("other", "app", "aws", "1.0.0", str(archive))
+    assert queue.get(single)["lane"] == "interactive"
+
+    assert queue.claim("w1")["id"] == single
+    assert queue.claim("w1")["id"] in bulk
+    stats = queue.lane_stats()["lanes"]
+    assert stats["bulk"]["queued"] == 2 and stats["bulk"]["claimed"] == 1
+    assert stats["interactive"]["claimed"] == 1
+
+def test_backlog_larger_than_scan_window_does_not_hide_new_jobs(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/jobs.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    queue = JobQueue(sessionmaker(autocommit=False, autoflush=False, bind=engine))
+    queue.scan_limit = 10
+    queue.namespace_scan_limit = 5
+    archive = tmp_path / "module.zip"
+    with zipfile.ZipFile(archive, "w") as zipf:
+        zipf.writestr("main.tf", "")
+
+    for i in range(queue.scan_limit * 3):
+        queue.enqueue("bulkteam", f"m{i}", "aws", "1.0.0", str(archive), lane=BULK)
+    same_team = queue.enqueue("bulkteam", "app", "aws", "1.0.0", str(archive))
+    other_team = queue.enqueue("other", "app", "aws", "1.0.0", str(archive), lane=BULK)
+
+    assert queue.claim("w1")["id"] == same_team
+    # Among bulk jobs the namespace with nothing running goes next
+    assert queue.claim("w1")["id"] == other_team
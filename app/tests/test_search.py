@@ -0,0 +1,105 @@
+import asyncio
+import zipfile
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from ..models.base import Base
+from ..models.models import Module, ModuleVersion
+from ..dependencies import RequirementIndex
+from ..dependencies.constraints import parse_version
+from ..dependencies.requirements import constraint_bounds, encode_version, version_bounds
+from ..search import SearchService
+from ..validation.hcl import parse_archive
+
+def _tf(providers, required_version=None):
+    lines = ["terraform {"]
+    if required_version:
+        lines.append(f'  required_version = "{required_version}"')
+    lines.append("  required_providers {")
+    lines += [f'    {name} = {{ source = "hashicorp/{name}", version = "{constraint}" }}'
+              for name, constraint in providers.items()]
+    lines += ["  }", "}", 'variable "name" {}']
+    return "\n".join(lines)
+
+def _admits(constraint, version):
+    low, high = constraint_bounds(constraint)
+    encoded = encode_version(parse_version(version))
+    return (low is None or low <= encoded) and (high is None or high >= encoded)
+
+@pytest.mark.parametrize("constraint,version,expected", [
+    ("~> 5.0", "5.31.0", True),
+    ("~> 5.0", "6.0.0", False),
+    ("~> 5.0", "6.0.0-beta1", False),
+    ("~> 5.1.2", "5.1.9", True),
+    ("~> 5.1.2", "5.2.0", False),
+    (">= 1.3, < 1.6", "1.5.7", True),
+    (">= 1.3, < 1.6", "1.6.0", False),
+    ("> 1.3.0", "1.3.0", False),
+    ("< 2.0.0-rc1", "1.9.9", True),
+    ("1.5.0", "1.5.0", True),
+    (None, "0.12.0", True),
+])
+def test_constraint_bounds(constraint, version, expected):
+    assert _admits(constraint, version) == expected
+
+@pytest.mark.parametrize("constraint,query", [
+    (">= 4.0, < 5.0", "5"),
+    (">= 4.0, < 5.0", "5.x"),
+    ("< 6.0.0", "6"),
+])
+def test_exclusive_upper_bound_excludes_partial_query(constraint, query):
+    _, high = constraint_bounds(constraint)
+    low, _ = version_bounds(query)
+    assert high < low
+
+def test_version_bounds_for_partial_versions():
+    low, high = version_bounds("5.x")
+    assert low <= encode_version(parse_version("5.0.0")) and high >= encode_version(parse_version("5.99.1"))
+    assert high < encode_version(parse_version("6.0.0-alpha"))
+    assert version_bounds("1.6.2") == (encode_version(parse_version("1.6.2")),) * 2
+    with pytest.raises(ValueError):
+        version_bounds("latest")
+
+@pytest.fixture
+def db(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/search.db", connect_args={"check_same_thread": False})
+    Base.metadata.create_all(bind=engine)
+    session = sessionmaker(autocommit=False, autoflush=False, bind=engine)()
+    yield session
+    session.close()
+
+def _publish(db, tmp_path, name, version, source):
+    module_id = f"acme-{name}-aws"
+    if not db.query(Module).filter_by(id=module_id).first():
+        db.add(Module(id=module_id, namespace="acme", name=name, provider="aws", version=version))
+    version_id = f"{module_id}-{version}"
+    db.add(ModuleVersion(id=version_id, module_id=module_id, version=version))
+    path = tmp_path / f"{name}-{version}.zip"
+    with zipfile.ZipFile(path, "w") as zip_ref:
+        zip_ref.writestr("versions.tf", source)
+    parsed, errors = parse_archive(str(path))
+    assert not errors
+    db.flush()
+    db.add_all(RequirementIndex.build_requirements(version_id, module_id, parsed))
+    db.commit()
+
+def test_search_filters_on_indexed_requirements(db, tmp_path):
+    _publish(db, tmp_path, "legacy", "1.0.0", _tf({"aws": "~> 4.0"}, ">= 0.13, < 1.0"))
+    _publish(db, tmp_path, "bucket", "1.0.0", _tf({"aws": "~> 4.0"}))
+    _publish(db, tmp_path, "bucket", "2.0.0", _tf({"aws": ">= 5.0, < 6.0"}, ">= 1.5"))
+    _publish(db, tmp_path, "dns", "1.0.0", _tf({"aws": ">= 4.0", "random": "~> 3.5"}))
+    _publish(db, tmp_path, "ancient", "1.0.0", _tf({"google": "~> 5.0"}))
+    _publish(db, tmp_path, "pinned", "1.0.0", _tf({"aws": ">= 4.0, < 5.0"}))
+
+    def search(**filters):
+        return sorted(m.name for m in asyncio.run(SearchService.search_modules(db, limit=100, **filters)))
+
+    assert search(provider_source="hashicorp/aws", provider_version="5.x") == ["bucket", "dns"]
+    assert search(provider="aws", provider_version="4.67.0") == ["bucket", "dns", "legacy", "pinned"]
+    assert search(provider_source="hashicorp/aws", provider_version="5", terraform_version="1.6") == ["bucket", "dns"]
+    assert search(terraform_version="1.4.0") == ["ancient", "bucket", "dns", "pinned"]
+    # bucket 2.0.0 needs Terraform 1.5 and bucket 1.0.0 is AWS 4.x only
+    assert search(provider_source="hashicorp/aws", provider_version="5", terraform_version="1.4") == ["dns"]
+    assert search(provider_source="hashicorp/random") == ["dns"]
+    with pytest.raises(ValueError):
+        search(provider_version="5")
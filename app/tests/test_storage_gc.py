@@ -0,0 +1,83 @@
+import os
+import time
+import pytest
+import asyncio
+from datetime import datetime
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from ..models.base import Base
+from ..models.models import Module, ModuleVersion, ModuleArchive
+from ..storage.gc import StorageGarbageCollector, IOThrottle
+
+def _archive(base, version, age=0):
+    directory = base / "test" / "module" / "aws" / version
+    directory.mkdir(parents=True)
+    archive = directory / "module.zip"
+    archive.write_bytes(b"x" * 100)
+    stamp = time.time() - age
+    os.utime(archive, (stamp, stamp))
+    os.utime(directory, (stamp, stamp))
+    return archive
+
+@pytest.fixture
+def session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/gc.db", connect_args={"check_same_thread": False})
+    # Enforce foreign keys like Postgres does
+    event.listen(engine, "connect", lambda connection, _: connection.execute("PRAGMA foreign_keys=ON"))
+    Base.metadata.create_all(bind=engine)
+    return sessionmaker(autocommit=False, autoflush=False, bind=engine)
+
+@pytest.fixture
+def storage(tmp_path, session_factory):
+    base = tmp_path / "module_storage"
+    db = session_factory()
+    db.add(Module(id="test-module-aws", namespace="test", name="module", provider="aws", version="1.0.0"))
+    for version in ["1.0.0", "1.1.0-rc.1", "1.1.0-rc.2", "1.1.0-rc.3"]:
+        archive = _archive(base, version, age=7200)
+        db.add(ModuleVersion(id=f"test-module-aws-{version}", module_id="test-module-aws",
+                             version=version, source_zip=str(archive)))
+    db.flush()
+    db.add(ModuleArchive(version_id="test-module-aws-1.1.0-rc.1", digest="0" * 64, original_size=100,
+                         archive_size=100, tar_gz_size=90))
+    db.add(ModuleVersion(id="test-module-aws-0.9.0", module_id="test-module-aws",
+                         version="0.9.0", source_zip=str(base / "missing" / "module.zip")))
+    db.commit()
+    db.close()
+    _archive(base, "2.0.0", age=7200)
+    _archive(base, "2.1.0", age=0)
+    return base
+
+def _collector(storage, session_factory):
+    throttle = IOThrottle(1e6, 1e12, 1e6, 1e12)
+    return StorageGarbageCollector(str(storage), session_factory, grace_period=3600,
+                                   keep_prereleases=2, throttle=throttle)
+
+def test_dry_run_reports_without_deleting(storage, session_factory):
+    report = asyncio.run(_collector(storage, session_factory).run(dry_run=True))
+
+    assert [os.path.basename(o["path"]) for o in report.orphans] == ["2.0.0"]
+    assert [p["version_id"] for p in report.expired_prereleases] == ["test-module-aws-1.1.0-rc.1"]
+    assert report.dangling_rows == ["test-module-aws-0.9.0"]
+    assert report.bytes_reclaimed == 0
+    assert (storage / "test" / "module" / "aws" / "2.0.0").exists()
+
+def test_sweep_removes_orphans_after_grace_period(storage, session_factory):
+    report = asyncio.run(_collector(storage, session_factory).run(dry_run=False))
+
+    versions = storage / "test" / "module" / "aws"
+    assert not (versions / "2.0.0").exists()
+    assert (versions / "2.1.0").exists()
+    assert not (versions / "1.1.0-rc.1").exists()
+    assert (versions / "1.1.0-rc.2").exists()
+    assert report.bytes_reclaimed == 200
+
+    db = session_factory()
+    assert db.query(ModuleVersion).filter_by(id="test-module-aws-1.1.0-rc.1").first() is None
+    assert db.query(ModuleArchive).filter_by(version_id="test-module-aws-1.1.0-rc.1").count() == 0
+    db.close()
+
+def test_throttle_uses_business_hours_rate():
+    throttle = IOThrottle(100, 1000, 1, 10, clock=lambda: datetime(2024, 1, 3, 10, 0))
+    assert throttle.rates() == (1, 10)
+    throttle.clock = lambda: datetime(2024, 1, 6, 10, 0)
+    assert throttle.rates() == (100, 1000)
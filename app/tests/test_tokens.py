@@ -0,0 +1,64 @@
+import time
+import asyncio
+import jwt
+import pytest
+from fastapi import HTTPException
+from ..auth import TokenCache, RevocationList, TokenRevokedError, check_permissions, Permission
+from ..auth import tokens
+from ..auth.tokens import token_digest
+
+SECRET = "test-secret-key-of-a-reasonable-length"
+
+def _token(**claims):
+    claims.setdefault("exp", int(time.time()) + 3600)
+    return jwt.encode(claims, SECRET, algorithm="HS256")
+
+def test_warm_tokens_skip_verification(monkeypatch):
+    cache = TokenCache(SECRET, "HS256", revocations=RevocationList())
+    token = _token(sub="ci", role="service")
+    decodes = []
+    real_decode = jwt.decode
+    monkeypatch.setattr(tokens.jwt, "decode", lambda *a, **kw: decodes.append(1) or real_decode(*a, **kw))
+
+    claims = cache.verify(token)
+    assert cache.verify(token) is claims and len(decodes) == 1
+    assert claims.permission_set == {"read:module", "upload:module"}
+    assert asyncio.run(check_permissions([Permission.UPLOAD_MODULE])(claims)) is claims
+    with pytest.raises(HTTPException) as e:
+        asyncio.run(check_permissions([Permission.DELETE_MODULE])(claims))
+    assert e.value.status_code == 403
+
+    # Entries leave the cache at exp and the token is verified again
+    expired = _token(sub="late", exp=int(time.time()) - 10)
+    with pytest.raises(jwt.ExpiredSignatureError):
+        cache.verify(expired)
+    monkeypatch.setattr(tokens.time, "time", lambda: claims["exp"] + 1)
+    cache.verify(token)
+    assert len(decodes) == 3
+    assert cache.stats()["hits"] == 1
+
+def test_cache_is_bounded():
+    cache = TokenCache(SECRET, "HS256", max_size=2, revocations=RevocationList())
+    first, second, third = (_token(sub=name) for name in ("a", "b", "c"))
+    cache.verify(first)
+    cache.verify(second)
+    cache.verify(first)
+    cache.verify(third)
+    assert list(cache._entries) == [token_digest(first), token_digest(third)]
+
+def test_revocations_are_shared_through_the_file(tmp_path):
+    path = str(tmp_path / "revoked")
+    here = TokenCache(SECRET, "HS256", revocations=RevocationList(path))
+    there = TokenCache(SECRET, "HS256", revocations=RevocationList(path, check_interval=0))
+    by_id, by_hash = _token(sub="a", jti="lost-laptop"), _token(sub="b")
+    for cache in (here, there):
+        cache.verify(by_id)
+        cache.verify(by_hash)
+
+    here.revoke("lost-laptop")
+    here.revoke(token_digest(by_hash))
+    for cache in (here, there):
+        for token in (by_id, by_hash):
+            with pytest.raises(TokenRevokedError):
+                cache.verify(token)
+    assert here.verify(_token(sub="a", jti="new-laptop"))["sub"] == "a"
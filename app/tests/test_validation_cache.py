@@ -0,0 +1,104 @@
+import os
+import asyncio
+import zipfile
+import pytest
+from unittest.mock import Mock
+from ..validation import module_validator
+from ..validation.module_validator import ModuleValidator
+from ..validation.result_cache import ValidationResultCache
+
+@pytest.fixture
+def cache(monkeypatch):
+    redis = Mock()
+    redis.get.return_value = None
+    cache = ValidationResultCache(redis_client=redis)
+    monkeypatch.setattr(module_validator, "get_validation_cache", lambda: cache)
+    monkeypatch.setattr(module_validator, "_default_terraform_version", "1.6.0")
+    return cache
+
+def stub_terraform(monkeypatch, runs, outcome):
+    async def validate_terraform_module(path, archive_root=None, providers=None):
+        runs.append(path)
+        return outcome[0], dict(outcome[1])
+    monkeypatch.setattr(ModuleValidator, "validate_terraform_module", staticmethod(validate_terraform_module))
+
+def validate(archive):
+    return asyncio.run(ModuleValidator.validate_module_structure(archive))
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "module.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        zipf.writestr("main.tf", 'resource "aws_s3_bucket" "test" {}\n')
+    return str(path)
+
+def test_identical_archive_skips_terraform(cache, archive, monkeypatch):
+    runs = []
+    stub_terraform(monkeypatch, runs, (True, {}))
+
+    assert validate(archive) == (True, {})
+    assert validate(archive) == (True, {})
+    assert len(runs) == 1
+    cache.redis.setex.assert_called_once()
+
+def test_validation_errors_are_cached(cache, archive, monkeypatch):
+    errors = {"terraform_validation": "Terraform validation failed: Unsupported argument"}
+    runs = []
+    stub_terraform(monkeypatch, runs, (False, errors))
+
+    expected = {"terraform_validation": {".": errors["terraform_validation"]}}
+    assert validate(archive) == (False, expected)
+    assert validate(archive) == (False, expected)
+    assert len(runs) == 1
+
+def test_init_failures_are_not_cached(cache, archive, monkeypatch):
+    runs = []
+    stub_terraform(monkeypatch, runs, (False, {"terraform_init": "timeout"}))
+
+    validate(archive)
+    validate(archive)
+    assert len(runs) == 2
+
+def test_cache_key_includes_terraform_version(cache, tmp_path):
+    path = tmp_path / "pinned.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        zipf.writestr("main.tf", "")
+        zipf.writestr(".terraform-version", "1.5.7\n")
+    assert module_validator.terraform_version_for_archive(str(path)) == "1.5.7"
+    assert cache.key("abc", "1.5.7") != cache.key("abc", "1.6.0")
+
+def test_submodules_and_examples_validated_concurrently(cache, tmp_path, monkeypatch):
+    path = tmp_path / "nested.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        zipf.writestr("main.tf", "")
+        zipf.writestr("modules/network/main.tf", 'terraform {\n  required_providers {\n    aws = ">= 5.0"\n  }\n}\n')
+        zipf.writestr("examples/basic/main.tf", "")
+        zipf.writestr("examples/basic/README.md", "")
+    active = []
+    peak = []
+    providers_by_root = {}
+
+    def read_from_disk(module_path):
+        raise AssertionError("required providers should come from the prevalidation parse")
+    monkeypatch.setattr(module_validator, "find_required_providers", read_from_disk)
+
+    async def validate_terraform_module(module_path, archive_root=None, providers=None):
+        providers_by_root[os.path.relpath(module_path, archive_root)] = providers
+        active.append(module_path)
+        peak.append(len(active))
+        await asyncio.sleep(0.02)
+        active.remove(module_path)
+        if module_path.endswith("basic"):
+            return False, {"terraform_validation": "bad example"}
+        return True, {}
+
+    monkeypatch.setattr(ModuleValidator, "validate_terraform_module", staticmethod(validate_terraform_module))
+    report = asyncio.run(ModuleValidator.validate_archive(str(path)))
+    assert [root["path"] for root in report.roots] == [".", "examples/basic", "modules/network"]
+    assert max(peak) == 3
+    assert all(root["duration_ms"] >= 20 for root in report.roots)
+    assert not report.is_valid
+    assert report.errors == {"terraform_validation": {"examples/basic": "bad example"}}
+    assert providers_by_root == {
+        ".": {}, "examples/basic": {}, "modules/network": {"registry.terraform.io/hashicorp/aws": ">= 5.0"}
+    }
@@ -0,0 +1,73 @@
+import asyncio
+import zipfile
+import pytest
+from ..validation.workers import ValidationWorkerPool
+
+@pytest.fixture
+def archive(tmp_path):
+    path = tmp_path / "module.zip"
+    with zipfile.ZipFile(path, "w") as zipf:
+        zipf.writestr("main.tf", 'variable "name" {}\n')
+    return str(path)
+
+def test_warm_workers_recycle_and_recover(archive, tmp_path):
+    pool = ValidationWorkerPool(size=1, max_jobs=2, timeout=30)
+    bad = tmp_path / "bad.zip"
+    bad.write_bytes(b"not a zip")
+
+    async def main():
+        await pool.start()
+        try:
+            pids = []
+            for _ in range(3):
+                parsed, errors = await pool.run("prevalidate", archive)
+                assert list(parsed.files) == ["main.tf"] and errors == {}
+                pids.append(pool._workers[0].process.pid)
+            # Recycled as soon as the second job finishes
+            assert pids[0] != pids[1] == pids[2] and pool.recycled == 1
+
+            # Task exceptions propagate without costing the worker
+            with pytest.raises(zipfile.BadZipFile):
+                await pool.run("normalize", str(bad))
+            assert pool.replaced == 0
+
+            pool._workers[0].process.kill()
+            pool._workers[0].process.join()
+            assert (await pool.run("prevalidate", archive))[1] == {}
+            assert pool.replaced == 1
+        finally:
+            await pool.stop()
+
+    asyncio.run(main())
+
+def test_cancelled_call_does_not_return_its_worker_busy(archive, tmp_path):
+    pool = ValidationWorkerPool(size=1, timeout=30)
+    bad = tmp_path / "bad.zip"
+    bad.write_bytes(b"not a zip")
+
+    async def main():
+        await pool.start()
+        try:
+            busy = pool._workers[0]
+            task = asyncio.create_task(pool.run("prevalidate", archive))
+            # Let the call reach its worker thread
+            await asyncio.sleep(0)
+            task.cancel()
+            with pytest.raises(asyncio.CancelledError):
+                await task
+            assert not busy.alive
+
+            # The next caller gets a fresh worker and its own reply
+            with pytest.raises(zipfile.BadZipFile):
+                await pool.run("normalize", str(bad))
+            assert pool._workers[0] is not busy and pool.replaced == 1
+        finally:
+            await pool.stop()
+
+    asyncio.run(main())
+
+def test_runs_in_thread_when_disabled(archive):
+    pool = ValidationWorkerPool(size=0)
+    asyncio.run(pool.start())
+    parsed, errors = asyncio.run(pool.run("prevalidate", archive))
+    assert not pool.running and errors == {}
@@ -0,0 +1,197 @@
+"""Side-by-side Terraform binaries, one directory per version.
+
+Validation used to run ``tfenv use``, which switches a global symlink and
+lets concurrent uploads that pin different versions race each other.
+Instead each job resolves the absolute path of the binary it needs:
+
+    <TERRAFORM_INSTALL_DIR>/<version>/terraform
+
+Missing versions are downloaded from the HashiCorp releases site (or
+``TERRAFORM_RELEASES_URL``), checked against the published SHA256SUMS and
+moved into place atomically. Concurrent requests for the same version share
+one download in-process, and a per-version file lock keeps several worker
+processes from installing it twice. ``TERRAFORM_VERSIONS`` lists versions
+to install at startup.
+
+Like ``tfenv``, a ``.terraform-version`` may say ``latest`` (newest stable
+release) or ``latest:<regex>`` (newest release matching the regex); both are
+resolved against the releases index, which is re-read at most every
+``TERRAFORM_INDEX_TTL`` seconds. tfenv's ``min-required`` and
+``latest-allowed`` keywords are not supported.
+"""
+import os
+import re
+import io
+import stat
+import fcntl
+import shutil
+import asyncio
+import hashlib
+import logging
+import platform
+import time
+import tempfile
+import zipfile
+from pathlib import Path
+from typing import Dict, List, Optional
+import aiohttp
+import semver
+
+logger = logging.getLogger(__name__)
+
+VERSION_PATTERN = re.compile(r"^\d+\.\d+\.\d+(-[0-9A-Za-z.]+)?$")
+LATEST = "latest"
+SUPPORTED_VERSIONS = "x.y.z, latest or latest:<regex>"
+ARCHITECTURES = {"x86_64": "amd64", "amd64": "amd64", "aarch64": "arm64", "arm64": "arm64", "i386": "386", "i686": "386"}
+
+class TerraformInstallError(Exception):
+    pass
+
+def platform_suffix() -> str:
+    machine = platform.machine().lower()
+    return f"{platform.system().lower()}_{ARCHITECTURES.get(machine, machine)}"
+
+class TerraformBinaryManager:
+    def __init__(self, install_dir: Optional[str] = None, releases_url: Optional[str] = None,
+                 install_timeout: Optional[float] = None):
+        self.install_dir = Path(install_dir or os.getenv(
+            "TERRAFORM_INSTALL_DIR",
+            os.path.join(tempfile.gettempdir(), "terraform-versions")
+        ))
+        self.releases_url = (releases_url or os.getenv(
+            "TERRAFORM_RELEASES_URL", "https://releases.hashicorp.com/terraform"
+        )).rstrip("/")
+        self.install_timeout = install_timeout or float(os.getenv("TERRAFORM_INSTALL_TIMEOUT", 300))
+        self.index_ttl = float(os.getenv("TERRAFORM_INDEX_TTL", 3600))
+        self.install_dir.mkdir(parents=True, exist_ok=True)
+        self._installs: Dict[str, asyncio.Task] = {}
+        self._releases: List[str] = []
+        self._releases_fetched = 0.0
+
+    def binary_path(self, version: str) -> Path:
+        if not VERSION_PATTERN.match(version):
+            raise TerraformInstallError(f"Invalid Terraform version: {version!r} (expected {SUPPORTED_VERSIONS})")
+        return self.install_dir / version / "terraform"
+
+    async def resolve(self, version: str) -> str:
+        """Concrete release for ``latest`` or ``latest:<regex>``; other versions are returned as is"""
+        if version != LATEST and not version.startswith(LATEST + ":"):
+            return version
+        _, _, pattern = version.partition(":")
+        try:
+            regex = re.compile(pattern) if pattern else None
+        except re.error as e:
+            raise TerraformInstallError(f"Invalid Terraform version regex {pattern!r}: {str(e)}")
+        candidates = []
+        for release in await self.releases():
+            parsed = semver.VersionInfo.parse(release)
+            # Plain latest means the newest stable release, as with tfenv
+            if (regex.search(release) if regex else not parsed.prerelease):
+                candidates.append((parsed, release))
+        if not candidates:
+            raise TerraformInstallError(f"No Terraform release matches {version!r}")
+        return max(candidates)[1]
+
+    async def releases(self) -> List[str]:
+        """Released Terraform versions from the releases index, cached for ``index_ttl`` seconds"""
+        if not self._releases or time.monotonic() - self._releases_fetched > self.index_ttl:
+            self._releases = await self._fetch_releases()
+            self._releases_fetched = time.monotonic()
+        return self._releases
+
+    async def _fetch_releases(self) -> List[str]:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{self.releases_url}/index.json") as response:
+                if response.status != 200:
+                    raise TerraformInstallError(f"Could not read the Terraform releases index ({response.status})")
+                index = await response.json(content_type=None)
+        return [version for version in index.get("versions", {}) if VERSION_PATTERN.match(version)]
+
+    def installed_versions(self) -> List[str]:
+        return sorted(p.parent.name for p in self.install_dir.glob("*/terraform"))
+
+    async def ensure(self, version: str) -> str:
+        """Absolute path of the binary for ``version``, installing it if needed"""
+        version = await self.resolve(version)
+        path = self.binary_path(version)
+        if path.exists():
+            return str(path)
+        task = self._installs.get(version)
+        if task is None:
+            task = asyncio.ensure_future(self._install(version))
+            self._installs[version] = task
+            task.add_done_callback(lambda _: self._installs.pop(version, None))
+        # Shielded so one cancelled caller does not abort the shared install
+        return await asyncio.shield(task)
+
+    async def preinstall(self, versions: List[str]) -> None:
+        results = await asyncio.gather(*(self.ensure(v) for v in versions), return_exceptions=True)
+        for version, result in zip(versions, results):
+            if isinstance(result, Exception):
+                logger.error(f"Failed to install Terraform {version}: {str(result)}")
+            else:
+                logger.info(f"Terraform {version} available at {result}")
+
+    async def _install(self, version: str) -> str:
+        path = self.binary_path(version)
+        with open(self.install_dir / f".{version}.lock", "a") as lock:
+            await asyncio.to_thread(fcntl.flock, lock, fcntl.LOCK_EX)
+            try:
+                # Another process may have finished the install while we waited
+                if path.exists():
+                    return str(path)
+                logger.info(f"Installing Terraform {version}")
+                archive = await asyncio.wait_for(self._download(version), timeout=self.install_timeout)
+                await asyncio.to_thread(self._unpack, version, archive)
+                return str(path)
+            except asyncio.TimeoutError:
+                raise TerraformInstallError(f"Installing Terraform {version} timed out")
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    async def _download(self, version: str) -> bytes:
+        filename = f"terraform_{version}_{platform_suffix()}.zip"
+        base = f"{self.releases_url}/{version}"
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"{base}/terraform_{version}_SHA256SUMS") as response:
+                if response.status != 200:
+                    raise TerraformInstallError(f"Terraform {version} is not available ({response.status})")
+                sums = await response.text()
+            async with session.get(f"{base}/{filename}") as response:
+                if response.status != 200:
+                    raise TerraformInstallError(f"Could not download {filename} ({response.status})")
+                archive = await response.read()
+        expected = next((line.split()[0] for line in sums.splitlines() if line.endswith(f" {filename}")), None)
+        if expected != hashlib.sha256(archive).hexdigest():
+            raise TerraformInstallError(f"Checksum mismatch for {filename}")
+        return archive
+
+    def _unpack(self, version: str, archive: bytes) -> None:
+        target = self.install_dir / version
+        staging = Path(tempfile.mkdtemp(prefix=f".{version}-", dir=self.install_dir))
+        try:
+            try:
+                with zipfile.ZipFile(io.BytesIO(archive)) as zipf:
+                    with zipf.open("terraform") as src, open(staging / "terraform", "wb") as dst:
+                        shutil.copyfileobj(src, dst)
+            except (KeyError, zipfile.BadZipFile):
+                raise TerraformInstallError(f"The Terraform {version} release has no terraform binary")
+            binary = staging / "terraform"
+            binary.chmod(binary.stat().st_mode | stat.S_IXUSR | stat.S_IXGRP | stat.S_IXOTH)
+            if target.exists():
+                shutil.rmtree(target)
+            os.replace(staging, target)
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+_manager: Optional[TerraformBinaryManager] = None
+
+def get_binary_manager() -> TerraformBinaryManager:
+    global _manager
+    if _manager is None:
+        _manager = TerraformBinaryManager()
+    return _manager
+
+def configured_versions() -> List[str]:
+    """Versions listed in ``TERRAFORM_VERSIONS`` to install ahead of time"""
+    return [v.strip() for v in os.getenv("TERRAFORM_VERSIONS", "").split(",") if v.strip()]
@@ -0,0 +1,144 @@
+"""In-process HCL checks that run before any ``terraform`` command.
+
+Every ``.tf`` file in an archive is read straight from the zip and parsed
+once with python-hcl2. Syntax errors and malformed ``variable`` / ``output``
+blocks are rejected in milliseconds, and the resulting ``ParsedModule`` is
+handed to documentation and dependency extraction so later stages do not
+read or parse the files again.
+"""
+import os
+import hashlib
+import zipfile
+import posixpath
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from dataclasses import dataclass, field
+from typing import Any, Dict, Iterator, Optional, Tuple
+import hcl2
+from ..storage.extract import check_archive
+
+VARIABLE_ARGUMENTS = {"type", "default", "description", "sensitive", "nullable", "validation", "ephemeral"}
+OUTPUT_ARGUMENTS = {"value", "description", "sensitive", "depends_on", "precondition", "ephemeral"}
+README_NAMES = ("README.md", "readme.md", "README")
+
+@dataclass
+class ParsedModule:
+    # Parsed body of every .tf file, keyed by its path inside the archive
+    files: Dict[str, Dict[str, Any]] = field(default_factory=dict)
+    readme: Optional[str] = None
+    # sha256 of every .tf file, keyed like ``files``
+    hashes: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def root_files(self) -> Dict[str, Dict[str, Any]]:
+        """Files of the root module, ignoring nested modules and examples"""
+        return {path: body for path, body in self.files.items() if "/" not in path}
+
+    def blocks(self, kind: str, root_only: bool = True) -> Iterator[Tuple[str, Dict[str, Any]]]:
+        """Yield ``(file, block)`` for every block of one type, e.g. ``variable``"""
+        files = self.root_files if root_only else self.files
+        for path in sorted(files):
+            for block in files[path].get(kind, []):
+                yield path, block
+
+    def labelled(self, kind: str, root_only: bool = True) -> Iterator[Tuple[str, str, Dict[str, Any]]]:
+        """Yield ``(file, label, body)`` for single-label blocks such as variables and modules"""
+        for path, block in self.blocks(kind, root_only):
+            for label, body in block.items():
+                yield path, label, body if isinstance(body, dict) else {}
+
+_parse_cache: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+_parse_cache_lock = threading.Lock()
+PARSE_CACHE_SIZE = int(os.getenv("HCL_PARSE_CACHE_SIZE", 4096))
+
+def parse_hcl(content: bytes, key: Optional[str] = None) -> Dict[str, Any]:
+    """Parse one .tf file, memoized by content hash; the result must be treated as read-only"""
+    key = key or hashlib.sha256(content).hexdigest()
+    with _parse_cache_lock:
+        if key in _parse_cache:
+            _parse_cache.move_to_end(key)
+            return _parse_cache[key]
+    parsed = hcl2.loads(content.decode("utf-8"))
+    with _parse_cache_lock:
+        _parse_cache[key] = parsed
+        while len(_parse_cache) > PARSE_CACHE_SIZE:
+            _parse_cache.popitem(last=False)
+    return parsed
+
+def parse_directory(module_path: str) -> ParsedModule:
+    """Parse the root module .tf files and README of an extracted module"""
+    root = Path(module_path)
+    parsed = ParsedModule()
+    for path in sorted(root.glob("*.tf")):
+        parsed.files[path.name] = parse_hcl(path.read_bytes())
+    for name in README_NAMES:
+        if (root / name).is_file():
+            parsed.readme = (root / name).read_text(errors="replace")
+            break
+    return parsed
+
+def parse_archive(zip_path: str, known: Optional[Dict[str, Dict[str, Any]]] = None
+                  ) -> Tuple[Optional[ParsedModule], Dict[str, Any]]:
+    """Parse the Terraform files of an archive, returning the module or validation errors.
+
+    ``known`` maps content hashes to parse results already available, e.g.
+    the files of the previous version; those files are not parsed again.
+    Raises ``ArchiveLimitError`` for archives over the extraction budgets.
+    """
+    parsed = ParsedModule()
+    syntax_errors: Dict[str, str] = {}
+    with zipfile.ZipFile(zip_path) as zip_ref:
+        for info in check_archive(zip_ref):
+            name = posixpath.normpath(info.filename)
+            if name in README_NAMES and parsed.readme is None:
+                parsed.readme = zip_ref.read(info).decode("utf-8", errors="replace")
+            if not name.endswith(".tf"):
+                continue
+            content = zip_ref.read(info)
+            digest = hashlib.sha256(content).hexdigest()
+            parsed.hashes[name] = digest
+            if known and digest in known:
+                parsed.files[name] = known[digest]
+                continue
+            try:
+                parsed.files[name] = parse_hcl(content, digest)
+            except Exception as e:
+                syntax_errors[name] = str(e).splitlines()[0] if str(e) else type(e).__name__
+
+    if not parsed.root_files and not syntax_errors:
+        return None, {"terraform_files": "Module must contain at least one .tf file"}
+    if syntax_errors:
+        return None, {"hcl": {path: f"Syntax error: {message}" for path, message in syntax_errors.items()}}
+
+    problems = _check_blocks(parsed)
+    if problems:
+        return None, {"hcl": problems}
+    return parsed, {}
+
+def _check_blocks(parsed: ParsedModule) -> Dict[str, str]:
+    problems: Dict[str, str] = {}
+    seen: Dict[Tuple[str, str], str] = {}
+
+    for kind, allowed in (("variable", VARIABLE_ARGUMENTS), ("output", OUTPUT_ARGUMENTS)):
+        for path, block in parsed.blocks(kind):
+            if not block:
+                problems[path] = f"{kind} block is missing a name"
+                continue
+            for label, body in block.items():
+                where = f"{path}: {kind}.{label}"
+                if not isinstance(body, dict):
+                    problems[where] = f"{kind} \"{label}\" must be a block"
+                    continue
+                if (kind, label) in seen:
+                    problems[where] = f"Duplicate {kind} \"{label}\", first declared in {seen[(kind, label)]}"
+                seen.setdefault((kind, label), path)
+                unknown = sorted(set(body) - allowed)
+                if unknown:
+                    problems[where] = f"Unsupported argument(s): {', '.join(unknown)}"
+                if kind == "output" and "value" not in body:
+                    problems[where] = "Output must set a value"
+                for rule in body.get("validation", []) if kind == "variable" else []:
+                    if "condition" not in rule or "error_message" not in rule:
+                        problems[where] = "validation blocks need both condition and error_message"
+    return problems
@@ -0,0 +1,98 @@
+"""Per-version manifest of .tf file hashes and a shared store of parse results.
+
+When a version is registered, the sha256 of each of its .tf files is recorded
+as ``ModuleFile`` rows. The python-hcl2 output for each distinct content is
+stored once in ``ParsedFile``. The next upload of the same module is parsed
+with the previous version's results in hand, so only files whose content
+changed go through the parser. The stored results also let the interface of
+any two versions be compared without opening either archive.
+"""
+import logging
+from typing import Any, Callable, Dict, List, Optional
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from ..database import SessionLocal
+from ..models.models import ModuleVersion, ModuleFile, ParsedFile
+from .hcl import ParsedModule
+
+logger = logging.getLogger(__name__)
+
+class ManifestStore:
+    @staticmethod
+    def previous_files(module_id: str, session_factory: Callable[[], Session] = SessionLocal) -> Dict[str, Dict[str, Any]]:
+        """Parse results of the most recently published version of a module, keyed by content hash"""
+        db = session_factory()
+        try:
+            latest = db.query(ModuleVersion.id).filter(
+                ModuleVersion.module_id == module_id,
+                ModuleVersion.id.in_(db.query(ModuleFile.version_id))
+            ).order_by(ModuleVersion.published_at.desc()).limit(1).scalar()
+            if latest is None:
+                return {}
+            rows = db.query(ParsedFile.sha256, ParsedFile.content).join(
+                ModuleFile, ModuleFile.sha256 == ParsedFile.sha256
+            ).filter(ModuleFile.version_id == latest)
+            return {sha256: content for sha256, content in rows}
+        finally:
+            db.close()
+
+    @staticmethod
+    def save_parsed(parsed: ParsedModule, session_factory: Callable[[], Session] = SessionLocal) -> int:
+        """Store parse results for content not seen before; returns the number of new rows.
+
+        Rows are content addressed, so they are written outside the registration
+        transaction and a concurrent writer storing the same file is harmless.
+        """
+        db = session_factory()
+        try:
+            hashes = set(parsed.hashes.values())
+            existing = {row for row, in db.query(ParsedFile.sha256).filter(ParsedFile.sha256.in_(hashes))}
+            missing = {
+                digest: parsed.files[path] for path, digest in parsed.hashes.items()
+                if digest not in existing and path in parsed.files
+            }
+            db.add_all(ParsedFile(sha256=digest, content=content) for digest, content in missing.items())
+            try:
+                db.commit()
+            except IntegrityError:
+                # Another upload stored some of the same files first; keep the rest
+                db.rollback()
+                for digest, content in missing.items():
+                    db.add(ParsedFile(sha256=digest, content=content))
+                    try:
+                        db.commit()
+                    except IntegrityError:
+                        db.rollback()
+            return len(missing)
+        finally:
+            db.close()
+
+    @staticmethod
+    def manifest_rows(version_id: str, parsed: ParsedModule) -> List[ModuleFile]:
+        return [ModuleFile(version_id=version_id, path=path, sha256=digest) for path, digest in sorted(parsed.hashes.items())]
+
+    @staticmethod
+    def record(version_id: str, parsed: ParsedModule, session_factory: Callable[[], Session] = SessionLocal) -> None:
+        """Store the manifest of a version registered before manifests were kept"""
+        ManifestStore.save_parsed(parsed, session_factory)
+        db = session_factory()
+        try:
+            db.add_all(ManifestStore.manifest_rows(version_id, parsed))
+            db.commit()
+        except IntegrityError:
+            db.rollback()
+        finally:
+            db.close()
+
+    @staticmethod
+    def load(db: Session, version_id: str) -> Optional[ParsedModule]:
+        """Rebuild a version's parsed .tf files from the store; None without a complete manifest"""
+        rows = db.query(ModuleFile.path, ModuleFile.sha256, ParsedFile.content).outerjoin(
+            ParsedFile, ParsedFile.sha256 == ModuleFile.sha256
+        ).filter(ModuleFile.version_id == version_id).all()
+        if not rows or any(content is None for _, _, content in rows):
+            return None
+        return ParsedModule(
+            files={path: content for path, _, content in rows},
+            hashes={path: digest for path, digest, _ in rows}
+        )
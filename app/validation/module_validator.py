@@ -1,102 +1,258 @@
 import zipfile
 import json
 import os
-import tempfile
 import subprocess
 import shutil
 from typing import Tuple, List, Dict, Any, Optional
-import hcl2
 import re
 import semver
 import logging
+import hashlib
+import asyncio
+import time
+import aiohttp
+from dataclasses import dataclass, field
+from .result_cache import get_validation_cache
+from .plugins import get_provider_cache, find_required_providers, required_providers_from_parsed
+from .runner import get_terraform_runner, TerraformTimeout
+from .binaries import get_binary_manager, TerraformInstallError
+from .hcl import ParsedModule, parse_archive
+from .workers import get_validation_workers
+from ..storage.extract import ArchiveLimitError, extract_archive, make_scratch_dir
 
 logger = logging.getLogger(__name__)
 
+# Failures that depend only on the archive contents and Terraform version
+CACHEABLE_ERRORS = {"zip", "terraform_files", "hcl", "terraform_validation"}
+
+_default_terraform_version: Optional[str] = None
+
+def default_terraform_version() -> str:
+    """Version of the ``terraform`` binary on PATH, looked up once per process"""
+    global _default_terraform_version
+    if _default_terraform_version is None:
+        version = os.getenv("TERRAFORM_DEFAULT_VERSION")
+        if not version:
+            try:
+                result = subprocess.run(['terraform', 'version', '-json'],
+                                        capture_output=True, text=True, check=True)
+                version = json.loads(result.stdout)["terraform_version"]
+            except (OSError, subprocess.CalledProcessError, ValueError, KeyError):
+                version = "unknown"
+        _default_terraform_version = version
+    return _default_terraform_version
+
+def terraform_version_for_archive(zip_path: str) -> str:
+    """Terraform version an archive will be validated with, read without extracting it"""
+    try:
+        with zipfile.ZipFile(zip_path) as zip_ref:
+            if '.terraform-version' in zip_ref.namelist():
+                version = zip_ref.read('.terraform-version').decode().strip()
+                if version:
+                    return version
+    except zipfile.BadZipFile:
+        pass
+    return default_terraform_version()
+
+def _sha256(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _cached_result(cache, zip_path: str, digest: Optional[str]):
+    digest = digest or _sha256(zip_path)
+    terraform_version = terraform_version_for_archive(zip_path)
+    return digest, terraform_version, cache.get(digest, terraform_version)
+
+def discover_roots(directory: str) -> List[str]:
+    """Relative paths of every directory holding Terraform files, root (``.``) first"""
+    roots = []
+    for current, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.'))
+        if any(f.endswith(('.tf', '.tf.json')) for f in files):
+            roots.append(os.path.relpath(current, directory))
+    return roots
+
+@dataclass
+class ValidationReport:
+    is_valid: bool
+    errors: Dict[str, Any]
+    # One entry per Terraform root: path, valid, duration_ms and errors
+    roots: List[Dict[str, Any]] = field(default_factory=list)
+    cached: bool = False
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"valid": self.is_valid, "cached": self.cached, "roots": self.roots}
+
 class ModuleValidator:
     @staticmethod
-    def validate_terraform_module(module_path: str) -> Tuple[bool, Dict[str, str]]:
-        """Run terraform init and validate on a module"""
+    async def validate_terraform_module(module_path: str, archive_root: Optional[str] = None,
+                                        providers: Optional[Dict[str, Optional[str]]] = None) -> Tuple[bool, Dict[str, str]]:
+        """Run terraform init and validate on one Terraform root.
+
+        ``providers`` are the root's required providers, taken from the parse
+        done by ``prevalidate``; they are only read from disk when omitted.
+        """
         errors = {}
+        # Resolve the binary before taking a slot so downloads do not hold one
         try:
-            # Check if .terraform-version file exists and use that version
-            version_file = os.path.join(module_path, '.terraform-version')
-            if os.path.exists(version_file):
-                with open(version_file, 'r') as f:
-                    version = f.read().strip()
-                logger.debug(f"Found .terraform-version file, using version: {version}")
-                # Install specified version using tfenv
-                subprocess.run(['tfenv', 'install', version], 
-                            check=True, 
-                            capture_output=True,
-                            text=True)
-                subprocess.run(['tfenv', 'use', version],
-                            check=True,
-                            capture_output=True,
-                            text=True)
-            
-            # Run terraform init first
-            result = subprocess.run(['terraform', 'init'], 
-                                 cwd=module_path, 
-                                 check=True, 
-                                 capture_output=True,
-                                 text=True)
-            logger.debug(f"Terraform init output: {result.stdout}")
-            
-            # Run terraform validate
-            result = subprocess.run(['terraform', 'validate'], 
-                                 cwd=module_path, 
-                                 check=True, 
-                                 capture_output=True,
-                                 text=True)
-            logger.debug(f"Terraform validate output: {result.stdout}")
-            return True, {}
-            
-        except subprocess.CalledProcessError as e:
-            error_msg = e.stderr or e.stdout
-            errors["terraform_validation"] = f"Terraform validation failed: {error_msg}"
+            terraform = await ModuleValidator.resolve_terraform_binary(module_path, archive_root)
+        except (TerraformInstallError, aiohttp.ClientError) as e:
+            errors["terraform_version"] = f"Could not install Terraform: {str(e)}"
             return False, errors
 
+        runner = get_terraform_runner()
+        async with runner.slot() as waited:
+            logger.debug(f"Waited {waited:.3f}s for a validation slot")
+            try:
+                # Run terraform init first, sharing downloaded providers between runs
+                provider_cache = get_provider_cache()
+                if providers is None:
+                    providers = await asyncio.to_thread(find_required_providers, module_path)
+                await asyncio.to_thread(provider_cache.record_usage, providers)
+                env = provider_cache.env()
+                async with provider_cache.init_lock_async():
+                    result = await runner.run([terraform, 'init', '-input=false', '-backend=false'],
+                                              stage="init", cwd=module_path, env=env)
+                if result.returncode != 0:
+                    # Kept apart from validate errors: init failures are often
+                    # transient (provider downloads) and must not be cached
+                    errors["terraform_init"] = f"Terraform init failed: {result.stderr or result.stdout}"
+                    return False, errors
+                await asyncio.to_thread(provider_cache.publish, module_path)
+                logger.debug(f"Terraform init output: {result.stdout}")
+
+                # Run terraform validate
+                result = await runner.run([terraform, 'validate'],
+                                          stage="validate", cwd=module_path, env=env)
+                if result.returncode != 0:
+                    errors["terraform_validation"] = f"Terraform validation failed: {result.stderr or result.stdout}"
+                    return False, errors
+                logger.debug(f"Terraform validate output: {result.stdout}")
+                return True, {}
+
+            except TerraformTimeout as e:
+                errors["terraform_timeout"] = str(e)
+                return False, errors
+
     @staticmethod
-    def validate_module_structure(zip_path: str) -> Tuple[bool, Dict[str, Any]]:
-        errors = {}
-        
+    async def resolve_terraform_binary(module_path: str, archive_root: Optional[str] = None) -> str:
+        """Binary for the version pinned in ``.terraform-version``, else the default.
+
+        A submodule without its own pin uses the one at the archive root.
+        """
+        version = os.getenv("TERRAFORM_DEFAULT_VERSION")
+        for directory in (module_path, archive_root):
+            version_file = os.path.join(directory, '.terraform-version') if directory else None
+            if version_file and os.path.exists(version_file):
+                with open(version_file, 'r') as f:
+                    version = f.read().strip() or version
+                logger.debug(f"Found {version_file}, using version: {version}")
+                break
+        if not version:
+            return 'terraform'
+        return await get_binary_manager().ensure(version)
+
+    @staticmethod
+    def prevalidate(zip_path: str, known: Optional[Dict[str, Dict[str, Any]]] = None
+                    ) -> Tuple[Optional[ParsedModule], Dict[str, Any]]:
+        """Parse every .tf file once and reject malformed modules before terraform runs.
+
+        Files whose content hash is in ``known`` reuse that parse result.
+        """
+        try:
+            return parse_archive(zip_path, known)
+        except zipfile.BadZipFile:
+            return None, {"zip": "Invalid zip file format"}
+        except ArchiveLimitError as e:
+            return None, {"archive": str(e)}
+
+    @staticmethod
+    async def validate_module_structure(zip_path: str, digest: Optional[str] = None,
+                                        parsed: Optional[ParsedModule] = None) -> Tuple[bool, Dict[str, Any]]:
+        """Validate an archive; see ``validate_archive``"""
+        report = await ModuleValidator.validate_archive(zip_path, digest, parsed)
+        return report.is_valid, report.errors
+
+    @staticmethod
+    async def validate_archive(zip_path: str, digest: Optional[str] = None,
+                               parsed: Optional[ParsedModule] = None) -> ValidationReport:
+        """Validate every Terraform root in an archive, reusing the cached outcome for identical content.
+
+        ``digest`` is the sha256 of the archive when the caller already has it,
+        and ``parsed`` the result of ``prevalidate`` if it has already run.
+        """
         if not os.path.exists(zip_path):
-            errors["path"] = f"Module path {zip_path} does not exist"
-            return False, errors
+            return ValidationReport(False, {"path": f"Module path {zip_path} does not exist"})
+
+        cache = get_validation_cache()
+        digest, terraform_version, cached = await asyncio.to_thread(_cached_result, cache, zip_path, digest)
+        if cached is not None:
+            logger.debug(f"Validation cache hit for {digest} on Terraform {terraform_version}")
+            return ValidationReport(*cached, cached=True)
+
+        report = await ModuleValidator._validate_module_structure(zip_path, parsed)
+        if report.is_valid or set(report.errors) <= CACHEABLE_ERRORS:
+            await asyncio.to_thread(cache.set, digest, terraform_version, report.is_valid, report.errors)
+        return report
+
+    @staticmethod
+    async def _validate_module_structure(zip_path: str, parsed: Optional[ParsedModule] = None) -> ValidationReport:
+        if parsed is None:
+            parsed, errors = await get_validation_workers().run("prevalidate", zip_path)
+            if errors:
+                return ValidationReport(False, errors)
+
+        tmpdir = await asyncio.to_thread(make_scratch_dir)
+        logger.debug(f"Created temporary directory for validation: {tmpdir}")
 
         try:
-            with tempfile.TemporaryDirectory(prefix="terraform_module_") as tmpdir:
-                logger.debug(f"Created temporary directory for validation: {tmpdir}")
-
-                # Extract the zip file
-                with zipfile.ZipFile(zip_path, 'r') as zip_ref:
-                    zip_ref.extractall(tmpdir)
-                    logger.debug(f"Extracted module to temporary directory: {tmpdir}")
-                    file_list = zip_ref.namelist()
-                    logger.debug(f"Files in zip: {file_list}")
-                    
-                # Check for at least one .tf file
-                tf_files = [f for f in os.listdir(tmpdir) if f.endswith('.tf')]
-                if not tf_files:
-                    errors["terraform_files"] = "Module must contain at least one .tf file"
-                    return False, errors
+            # Extract the zip file
+            file_list = await asyncio.to_thread(extract_archive, zip_path, tmpdir)
+            logger.debug(f"Extracted module to temporary directory: {tmpdir}")
+            logger.debug(f"Files in zip: {file_list}")
 
-                # Run terraform validation
-                is_valid, tf_errors = ModuleValidator.validate_terraform_module(tmpdir)
-                if not is_valid:
-                    errors.update(tf_errors)
-                    return False, errors
+            # Check for at least one .tf file at the root
+            roots = discover_roots(tmpdir)
+            if "." not in roots:
+                return ValidationReport(False, {"terraform_files": "Module must contain at least one .tf file"})
 
-                logger.debug(f"Validation complete, temporary directory will be cleaned up: {tmpdir}")
+            # Validate the root module, submodules and examples concurrently;
+            # each one takes its own slot from the shared runner
+            results = await asyncio.gather(*(
+                ModuleValidator._validate_root(tmpdir, root, parsed) for root in roots
+            ))
+            errors: Dict[str, Any] = {}
+            for result in results:
+                for kind, message in result["errors"].items():
+                    errors.setdefault(kind, {})[result["path"]] = message
+            logger.debug(f"Validation complete, temporary directory will be cleaned up: {tmpdir}")
+            return ValidationReport(not errors, errors, list(results))
 
         except zipfile.BadZipFile:
-            errors["zip"] = "Invalid zip file format"
-            return False, errors
+            return ValidationReport(False, {"zip": "Invalid zip file format"})
+        except ArchiveLimitError as e:
+            return ValidationReport(False, {"archive": str(e)})
         except Exception as e:
-            errors["validation"] = f"Error validating module: {str(e)}"
-            return False, errors
-                
-        return True, {}
+            return ValidationReport(False, {"validation": f"Error validating module: {str(e)}"})
+        finally:
+            await asyncio.to_thread(shutil.rmtree, tmpdir, True)
+
+    @staticmethod
+    async def _validate_root(archive_root: str, path: str, parsed: ParsedModule) -> Dict[str, Any]:
+        started = time.perf_counter()
+        is_valid, errors = await ModuleValidator.validate_terraform_module(
+            os.path.normpath(os.path.join(archive_root, path)), archive_root,
+            providers=required_providers_from_parsed(parsed, path)
+        )
+        return {
+            "path": path,
+            "valid": is_valid,
+            "duration_ms": round((time.perf_counter() - started) * 1000, 2),
+            "errors": errors
+        }
 
     @staticmethod
     def validate_module_metadata(namespace: str, name: str, provider: str, version: str) -> Tuple[bool, Dict[str, Any]]:
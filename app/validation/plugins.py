@@ -0,0 +1,269 @@
+"""Shared Terraform provider cache and filesystem mirror for validation.
+
+Every ``terraform init`` run by the validator points at one CLI config file
+that installs providers from the shared cache and, when
+``TERRAFORM_PROVIDER_MIRROR`` is set, a filesystem mirror. The mirror is
+pre-warmed with the providers seen most often in uploaded
+``required_providers`` blocks. With ``TERRAFORM_OFFLINE=1`` the direct
+registry is disabled entirely and init only installs from the cache and the
+mirror.
+
+Online, Terraform picks the newest version matching a constraint across
+every installation method, so init still asks the registry which versions
+exist. Only a provider pinned to an exact version that is already cached or
+mirrored installs as a local link without downloading; a range such as
+``~> 5.0`` downloads once whenever the registry has a newer match, which is
+then published to the cache for later inits.
+
+Terraform's plugin cache is not safe for concurrent writers, so init never
+writes to the shared cache. The cache is read as an unpacked filesystem
+mirror, which init links providers from. Providers init had to download land
+in the module's own ``.terraform`` directory and are published into the
+cache afterwards, each with one atomic rename. Inits therefore run
+concurrently; only a mirror refresh excludes them.
+
+    python -m app.validation.plugins --warm 20
+"""
+import os
+import json
+import asyncio
+import fcntl
+import posixpath
+import logging
+import argparse
+import shutil
+import tempfile
+import subprocess
+import threading
+from contextlib import asynccontextmanager
+from pathlib import Path
+from typing import AsyncIterator, Dict, Iterable, List, Optional, Set
+import hcl2
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_REGISTRY = "registry.terraform.io"
+
+def normalize_provider_source(source: str) -> str:
+    """Expand ``aws`` / ``hashicorp/aws`` to ``registry.terraform.io/hashicorp/aws``"""
+    parts = source.lower().split("/")
+    if len(parts) == 1:
+        parts = ["hashicorp"] + parts
+    if len(parts) == 2:
+        parts = [DEFAULT_REGISTRY] + parts
+    return "/".join(parts)
+
+def required_providers_from_config(config: Dict) -> Dict[str, Optional[str]]:
+    """Map provider source to version constraint from one parsed .tf file"""
+    providers: Dict[str, Optional[str]] = {}
+    for block in config.get("terraform", []):
+        for requirements in block.get("required_providers", []):
+            for local_name, requirement in requirements.items():
+                if isinstance(requirement, dict):
+                    source = requirement.get("source", local_name)
+                    constraint = requirement.get("version")
+                else:
+                    source, constraint = local_name, requirement
+                providers[normalize_provider_source(source)] = constraint
+    return providers
+
+def required_providers_from_parsed(parsed, root: str = ".") -> Dict[str, Optional[str]]:
+    """Required providers declared by one Terraform root of an already parsed archive"""
+    directory = "" if root in (".", "") else root.replace(os.sep, "/")
+    providers: Dict[str, Optional[str]] = {}
+    for path in sorted(parsed.files):
+        if posixpath.dirname(path) == directory:
+            providers.update(required_providers_from_config(parsed.files[path]))
+    return providers
+
+def find_required_providers(module_path: str) -> Dict[str, Optional[str]]:
+    """Required providers declared by the .tf files at the root of a module, read from disk"""
+    providers: Dict[str, Optional[str]] = {}
+    for path in sorted(Path(module_path).glob("*.tf")):
+        try:
+            with open(path) as f:
+                providers.update(required_providers_from_config(hcl2.load(f)))
+        except Exception as e:
+            logger.debug(f"Could not read required_providers from {path}: {str(e)}")
+    return providers
+
+class ProviderCache:
+    def __init__(self, cache_dir: Optional[str] = None, mirror_dir: Optional[str] = None,
+                 offline: Optional[bool] = None):
+        self.cache_dir = Path(cache_dir or os.getenv(
+            "TERRAFORM_PLUGIN_CACHE_DIR",
+            os.path.join(tempfile.gettempdir(), "terraform-plugin-cache")
+        ))
+        mirror = mirror_dir or os.getenv("TERRAFORM_PROVIDER_MIRROR")
+        self.mirror_dir = Path(mirror) if mirror else None
+        self.offline = offline if offline is not None else os.getenv("TERRAFORM_OFFLINE", "") in ("1", "true")
+        # Published providers, laid out as HOSTNAME/NAMESPACE/TYPE/VERSION/TARGET
+        self.providers_dir = self.cache_dir / "providers"
+        self.staging_dir = self.cache_dir / "staging"
+        self.providers_dir.mkdir(parents=True, exist_ok=True)
+        self.staging_dir.mkdir(parents=True, exist_ok=True)
+        if self.mirror_dir:
+            self.mirror_dir.mkdir(parents=True, exist_ok=True)
+        self.cli_config = self.cache_dir / "terraformrc"
+        self.usage_file = self.cache_dir / "provider_usage.json"
+        self.lock_file = self.cache_dir / ".lock"
+        self.usage_lock_file = self.cache_dir / ".usage.lock"
+        self._usage_lock = threading.Lock()
+        self._write_cli_config()
+
+    def _write_cli_config(self) -> None:
+        # Terraform picks the newest matching version across every method
+        lines = ["provider_installation {"]
+        for path in [self.providers_dir] + ([self.mirror_dir] if self.mirror_dir else []):
+            lines += [
+                "  filesystem_mirror {",
+                f'    path = "{path}"',
+                '    include = ["*/*/*"]',
+                "  }",
+            ]
+        if not self.offline:
+            lines += ["  direct {}"]
+        lines += ["}"]
+        content = "\n".join(lines) + "\n"
+        if not self.cli_config.exists() or self.cli_config.read_text() != content:
+            tmp = self.cli_config.with_suffix(".tmp")
+            tmp.write_text(content)
+            os.replace(tmp, self.cli_config)
+
+    def env(self) -> Dict[str, str]:
+        """Environment for terraform subprocesses that use the shared cache"""
+        env = dict(os.environ)
+        # A plugin cache would be written by concurrent inits
+        env.pop("TF_PLUGIN_CACHE_DIR", None)
+        env.update({
+            "TF_CLI_CONFIG_FILE": str(self.cli_config),
+            "TF_IN_AUTOMATION": "1",
+            "CHECKPOINT_DISABLE": "1",
+        })
+        return env
+
+    def publish(self, module_path: str) -> List[str]:
+        """Copy providers init downloaded for a module into the shared cache.
+
+        Providers init linked from the cache or a mirror are skipped. Each new
+        provider is copied to a staging directory and renamed into place, so
+        concurrent inits only ever see complete providers. Returns the
+        ``source/version/target`` paths published.
+        """
+        installed = Path(module_path) / ".terraform" / "providers"
+        published = []
+        for package in sorted(installed.glob("*/*/*/*/*")):
+            if package.is_symlink() or not package.is_dir():
+                continue
+            relative = package.relative_to(installed)
+            destination = self.providers_dir / relative
+            if destination.exists():
+                continue
+            staging = Path(tempfile.mkdtemp(dir=self.staging_dir))
+            try:
+                shutil.copytree(package, staging / "package", symlinks=True)
+                destination.parent.mkdir(parents=True, exist_ok=True)
+                os.rename(staging / "package", destination)
+                published.append(relative.as_posix())
+            except OSError as e:
+                # Most likely another job published the same provider first
+                logger.debug(f"Did not publish provider {relative.as_posix()}: {str(e)}")
+            finally:
+                shutil.rmtree(staging, ignore_errors=True)
+        if published:
+            logger.info(f"Published providers to the shared cache: {', '.join(published)}")
+        return published
+
+    @asynccontextmanager
+    async def init_lock_async(self) -> AsyncIterator[None]:
+        """Shared lock held by inits so a mirror refresh does not rewrite the mirror under them"""
+        lock = open(self.lock_file, "a")
+        try:
+            await asyncio.to_thread(fcntl.flock, lock, fcntl.LOCK_SH)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+        finally:
+            lock.close()
+
+    def record_usage(self, providers: Iterable[str]) -> None:
+        """Count providers seen in uploads so the mirror can be warmed with the popular ones"""
+        providers = list(providers)
+        if not providers:
+            return
+        with self._usage_lock, open(self.usage_lock_file, "a") as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            try:
+                usage = self._read_usage()
+                for source in providers:
+                    usage[source] = usage.get(source, 0) + 1
+                tmp = self.usage_file.with_suffix(".tmp")
+                tmp.write_text(json.dumps(usage))
+                os.replace(tmp, self.usage_file)
+            finally:
+                fcntl.flock(lock, fcntl.LOCK_UN)
+
+    def _read_usage(self) -> Dict[str, int]:
+        try:
+            return json.loads(self.usage_file.read_text())
+        except (OSError, ValueError):
+            return {}
+
+    def top_providers(self, count: int) -> List[str]:
+        usage = self._read_usage()
+        return sorted(usage, key=lambda source: (-usage[source], source))[:count]
+
+    def warm_mirror(self, count: int = 20, providers: Optional[Iterable[str]] = None) -> List[str]:
+        """Download the most used providers into the filesystem mirror"""
+        if not self.mirror_dir:
+            raise ValueError("TERRAFORM_PROVIDER_MIRROR is not configured")
+        sources: Set[str] = set(providers or self.top_providers(count))
+        if not sources:
+            return []
+        with tempfile.TemporaryDirectory(prefix="terraform_mirror_") as workdir:
+            blocks = "\n".join(
+                f'    p{index} = {{ source = "{source}" }}'
+                for index, source in enumerate(sorted(sources))
+            )
+            Path(workdir, "main.tf").write_text(
+                f"terraform {{\n  required_providers {{\n{blocks}\n  }}\n}}\n"
+            )
+            env = dict(os.environ, TF_IN_AUTOMATION="1", CHECKPOINT_DISABLE="1")
+            with open(self.lock_file, "a") as lock:
+                fcntl.flock(lock, fcntl.LOCK_EX)
+                try:
+                    subprocess.run(
+                        ["terraform", "providers", "mirror", str(self.mirror_dir)],
+                        cwd=workdir, env=env, check=True, capture_output=True, text=True
+                    )
+                finally:
+                    fcntl.flock(lock, fcntl.LOCK_UN)
+        logger.info(f"Warmed provider mirror with {len(sources)} providers")
+        return sorted(sources)
+
+_provider_cache: Optional[ProviderCache] = None
+
+def get_provider_cache() -> ProviderCache:
+    global _provider_cache
+    if _provider_cache is None:
+        _provider_cache = ProviderCache()
+    return _provider_cache
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Manage the shared Terraform provider cache")
+    parser.add_argument("--warm", type=int, metavar="N", help="mirror the N most used providers")
+    parser.add_argument("--provider", action="append", default=[], help="provider source to mirror")
+    parser.add_argument("--usage", action="store_true", help="print provider usage counts")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    cache = get_provider_cache()
+    if args.usage:
+        print(json.dumps(cache._read_usage(), indent=2, sort_keys=True))
+    if args.warm or args.provider:
+        providers = [normalize_provider_source(p) for p in args.provider] or None
+        print(json.dumps(cache.warm_mirror(args.warm or 20, providers), indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""Cache of validation outcomes keyed by archive content.
+
+A validation result only depends on the archive bytes, the Terraform
+version that validated them and the rules this service applies, so the
+same archive uploaded again (a re-push, a new tag on the same commit, a
+retried job) can reuse the earlier outcome without extracting anything or
+starting a subprocess. Results live in a small in-process LRU backed by
+Redis so they are shared between workers.
+"""
+import os
+import json
+import logging
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+from ..cache import get_redis_client
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever ModuleValidator starts accepting or rejecting modules differently
+RULESET_VERSION = "3"
+
+class ValidationResultCache:
+    def __init__(self, redis_client=None, max_entries: int = 1024, ttl: Optional[int] = None):
+        self._redis = redis_client
+        self.max_entries = max_entries
+        self.ttl = ttl or int(os.getenv("VALIDATION_CACHE_TTL", 30 * 24 * 3600))
+        self._local: "OrderedDict[str, Tuple[bool, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def redis(self):
+        if self._redis is None:
+            self._redis = get_redis_client()
+        return self._redis
+
+    @staticmethod
+    def key(digest: str, terraform_version: str) -> str:
+        return f"validation:{digest}:{terraform_version}:{RULESET_VERSION}"
+
+    def get(self, digest: str, terraform_version: str) -> Optional[Tuple[bool, Dict[str, Any]]]:
+        key = self.key(digest, terraform_version)
+        with self._lock:
+            if key in self._local:
+                self._local.move_to_end(key)
+                return self._local[key]
+        try:
+            data = self.redis.get(key)
+        except Exception as e:
+            logger.debug(f"Validation cache unavailable: {str(e)}")
+            return None
+        if not data:
+            return None
+        stored = json.loads(data)
+        result = (stored["valid"], stored["errors"])
+        self._remember(key, result)
+        return result
+
+    def set(self, digest: str, terraform_version: str, is_valid: bool, errors: Dict[str, Any]) -> None:
+        key = self.key(digest, terraform_version)
+        self._remember(key, (is_valid, errors))
+        try:
+            self.redis.setex(key, self.ttl, json.dumps({"valid": is_valid, "errors": errors}))
+        except Exception as e:
+            logger.debug(f"Validation cache unavailable: {str(e)}")
+
+    def _remember(self, key: str, result: Tuple[bool, Dict[str, Any]]) -> None:
+        with self._lock:
+            self._local[key] = result
+            self._local.move_to_end(key)
+            while len(self._local) > self.max_entries:
+                self._local.popitem(last=False)
+
+_validation_cache: Optional[ValidationResultCache] = None
+
+def get_validation_cache() -> ValidationResultCache:
+    global _validation_cache
+    if _validation_cache is None:
+        _validation_cache = ValidationResultCache()
+    return _validation_cache
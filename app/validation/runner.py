@@ -0,0 +1,134 @@
+"""Bounded asynchronous execution of Terraform subprocesses.
+
+Validations take a slot from a process-wide limit before running anything,
+and each subprocess runs in its own session with a timeout so a hung
+``terraform init`` can be killed together with the provider plugins it
+spawned. Queue depth and slot wait times are tracked for the stats
+endpoint.
+"""
+import os
+import time
+import signal
+import asyncio
+import logging
+from collections import deque
+from contextlib import asynccontextmanager
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Dict, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+STAGE_TIMEOUTS = {
+    "init": float(os.getenv("TERRAFORM_INIT_TIMEOUT", 300)),
+    "validate": float(os.getenv("TERRAFORM_VALIDATE_TIMEOUT", 120)),
+}
+
+@dataclass
+class ProcessResult:
+    args: Sequence[str]
+    returncode: int
+    stdout: str
+    stderr: str
+    duration: float
+
+class TerraformTimeout(Exception):
+    def __init__(self, stage: str, timeout: float):
+        super().__init__(f"terraform {stage} timed out after {timeout:.0f}s")
+        self.stage = stage
+        self.timeout = timeout
+
+class TerraformRunner:
+    def __init__(self, concurrency: Optional[int] = None):
+        self.concurrency = concurrency or int(os.getenv("VALIDATION_CONCURRENCY", os.cpu_count() or 2))
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self.waiting = 0
+        self.running = 0
+        self.completed = 0
+        self.timeouts = 0
+        self._wait_times: deque = deque(maxlen=1000)
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # Created lazily so it binds to the loop that first uses it
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    @asynccontextmanager
+    async def slot(self) -> AsyncIterator[float]:
+        """Hold one of the global validation slots; yields the time spent waiting"""
+        queued = time.perf_counter()
+        self.waiting += 1
+        try:
+            await self.semaphore.acquire()
+        finally:
+            self.waiting -= 1
+        waited = time.perf_counter() - queued
+        self._wait_times.append(waited)
+        self.running += 1
+        try:
+            yield waited
+        finally:
+            self.running -= 1
+            self.completed += 1
+            self.semaphore.release()
+
+    async def run(self, args: Sequence[str], stage: str, cwd: Optional[str] = None,
+                  env: Optional[Dict[str, str]] = None, timeout: Optional[float] = None) -> ProcessResult:
+        """Run a command, killing its whole process group if it exceeds the stage timeout"""
+        timeout = timeout or STAGE_TIMEOUTS.get(stage, 300)
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            *args,
+            cwd=cwd,
+            env=env,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            start_new_session=True
+        )
+        try:
+            stdout, stderr = await asyncio.wait_for(process.communicate(), timeout=timeout)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            _kill_group(process)
+            await process.wait()
+            if isinstance(e, asyncio.TimeoutError):
+                self.timeouts += 1
+                raise TerraformTimeout(stage, timeout)
+            raise
+        return ProcessResult(
+            args=args,
+            returncode=process.returncode,
+            stdout=stdout.decode(errors="replace"),
+            stderr=stderr.decode(errors="replace"),
+            duration=time.perf_counter() - started
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        waits: List[float] = sorted(self._wait_times)
+
+        def percentile(p: float) -> float:
+            return round(waits[min(len(waits) - 1, int(len(waits) * p))] * 1000, 2) if waits else 0.0
+
+        return {
+            "concurrency": self.concurrency,
+            "queue_depth": self.waiting,
+            "running": self.running,
+            "completed": self.completed,
+            "timeouts": self.timeouts,
+            "wait_ms": {"p50": percentile(0.5), "p95": percentile(0.95), "max": percentile(1.0)}
+        }
+
+def _kill_group(process: asyncio.subprocess.Process) -> None:
+    try:
+        os.killpg(process.pid, signal.SIGKILL)
+    except ProcessLookupError:
+        pass
+
+_runner: Optional[TerraformRunner] = None
+
+def get_terraform_runner() -> TerraformRunner:
+    global _runner
+    if _runner is None:
+        _runner = TerraformRunner()
+    return _runner
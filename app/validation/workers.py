@@ -0,0 +1,250 @@
+"""Long-lived worker processes for the CPU-bound parts of an upload.
+
+Parsing HCL and repacking archives hold the GIL, so running them in threads
+of the API process slows every request it serves. Instead a small pool of
+processes is started once; each imports python-hcl2 and parses a sample
+module up front so the Lark parser and its caches are warm before the first
+upload. Jobs are sent to an idle worker over a pipe. Workers are pinged when
+they have been idle for a while, replaced if they die or hang, and recycled
+after ``VALIDATION_WORKER_MAX_JOBS`` jobs to bound memory growth.
+
+When the pool is disabled (``VALIDATION_WORKERS=0``) or not started, tasks
+run in a thread of the calling process instead.
+"""
+import os
+import time
+import asyncio
+import logging
+import importlib
+import multiprocessing
+from multiprocessing.connection import Connection
+from typing import Any, Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# The package this module belongs to, whatever it is imported as
+_APP_PACKAGE = __package__.rpartition(".")[0]
+
+# Functions a worker may run, imported lazily in the worker itself
+TASKS = {
+    "prevalidate": f"{_APP_PACKAGE}.validation.module_validator:ModuleValidator.prevalidate",
+    "normalize": f"{_APP_PACKAGE}.storage.normalize:normalize_archive",
+}
+
+WARMUP_MODULE = '''
+terraform {
+  required_providers {
+    aws = { source = "hashicorp/aws", version = ">= 5.0" }
+  }
+}
+variable "name" {
+  type    = string
+  default = "warmup"
+}
+resource "aws_s3_bucket" "this" {
+  bucket = var.name
+}
+output "id" {
+  value = aws_s3_bucket.this.id
+}
+'''
+
+class WorkerError(Exception):
+    pass
+
+class WorkerTimeout(WorkerError):
+    pass
+
+def resolve_task(name: str) -> Callable[..., Any]:
+    module_name, _, attribute = TASKS[name].partition(":")
+    target: Any = importlib.import_module(module_name)
+    for part in attribute.split("."):
+        target = getattr(target, part)
+    return target
+
+def _warm_up() -> None:
+    import hcl2
+    import semver
+    hcl2.loads(WARMUP_MODULE)
+    semver.VersionInfo.parse("1.0.0")
+    for name in TASKS:
+        resolve_task(name)
+
+def _worker_main(conn: Connection) -> None:
+    _warm_up()
+    conn.send(("ready", os.getpid()))
+    while True:
+        try:
+            message = conn.recv()
+        except EOFError:
+            return
+        if message is None:
+            return
+        if message[0] == "ping":
+            conn.send(("pong", None))
+            continue
+        _, name, args = message
+        try:
+            result = ("ok", resolve_task(name)(*args))
+        except Exception as e:
+            result = ("error", e)
+        try:
+            conn.send(result)
+        except Exception as e:
+            # The task's exception or result could not be pickled
+            conn.send(("error", WorkerError(f"{type(e).__name__}: {str(e)}")))
+
+class WorkerProcess:
+    def __init__(self, context, startup_timeout: float):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(target=_worker_main, args=(child_conn,), daemon=True)
+        self.process.start()
+        child_conn.close()
+        self.jobs = 0
+        self.last_used = time.monotonic()
+        if not self.conn.poll(startup_timeout):
+            self.kill()
+            raise WorkerError("Validation worker did not start in time")
+        self.conn.recv()
+
+    @property
+    def alive(self) -> bool:
+        return self.process.is_alive()
+
+    def call(self, name: str, args: tuple, timeout: float) -> Any:
+        self.conn.send(("call", name, args))
+        if not self.conn.poll(timeout):
+            raise WorkerTimeout(f"Validation worker timed out running {name} after {timeout:.0f}s")
+        status, result = self.conn.recv()
+        self.jobs += 1
+        self.last_used = time.monotonic()
+        if status == "error":
+            raise result
+        return result
+
+    def ping(self, timeout: float) -> bool:
+        try:
+            self.conn.send(("ping",))
+            return self.conn.poll(timeout) and self.conn.recv()[0] == "pong"
+        except (OSError, EOFError):
+            return False
+
+    def stop(self, timeout: float = 5) -> None:
+        try:
+            self.conn.send(None)
+        except OSError:
+            pass
+        self.process.join(timeout)
+        self.kill()
+
+    def kill(self) -> None:
+        if self.process.is_alive():
+            self.process.kill()
+            self.process.join()
+        self.conn.close()
+
+class ValidationWorkerPool:
+    def __init__(self, size: Optional[int] = None, max_jobs: Optional[int] = None,
+                 timeout: Optional[float] = None, health_interval: Optional[float] = None):
+        self.size = size if size is not None else int(os.getenv("VALIDATION_WORKERS", min(4, os.cpu_count() or 1)))
+        self.max_jobs = max_jobs or int(os.getenv("VALIDATION_WORKER_MAX_JOBS", 200))
+        self.timeout = timeout or float(os.getenv("VALIDATION_WORKER_TIMEOUT", 120))
+        self.health_interval = health_interval or float(os.getenv("VALIDATION_WORKER_HEALTH_INTERVAL", 30))
+        self._context = multiprocessing.get_context("spawn")
+        self._idle: Optional[asyncio.Queue] = None
+        self._workers: List[WorkerProcess] = []
+        self.completed = 0
+        self.recycled = 0
+        self.replaced = 0
+
+    @property
+    def running(self) -> bool:
+        return self._idle is not None
+
+    def _spawn(self) -> WorkerProcess:
+        return WorkerProcess(self._context, startup_timeout=self.timeout)
+
+    async def start(self) -> None:
+        if self.running or self.size <= 0:
+            return
+        self._workers = list(await asyncio.gather(*(asyncio.to_thread(self._spawn) for _ in range(self.size))))
+        self._idle = asyncio.Queue()
+        for worker in self._workers:
+            self._idle.put_nowait(worker)
+        logger.info(f"Started {self.size} validation worker processes")
+
+    async def stop(self) -> None:
+        if not self.running:
+            return
+        self._idle = None
+        workers, self._workers = self._workers, []
+        await asyncio.gather(*(asyncio.to_thread(worker.stop) for worker in workers))
+
+    async def run(self, name: str, *args: Any) -> Any:
+        """Run a registered task on a warm worker, or in a thread if the pool is not running"""
+        if not self.running:
+            return await asyncio.to_thread(resolve_task(name), *args)
+        idle = self._idle
+        worker = await idle.get()
+        try:
+            worker = await self._checked(worker)
+            try:
+                result = await asyncio.to_thread(worker.call, name, args, self.timeout)
+            except asyncio.CancelledError:
+                # The call keeps running in its thread and its reply would reach the
+                # next caller. Kill the worker; _checked replaces it on its next checkout.
+                worker.kill()
+                raise
+            except WorkerTimeout:
+                worker = await self._replace(worker)
+                raise
+            except (WorkerError, OSError, EOFError):
+                if not worker.alive or not await asyncio.to_thread(worker.ping, 1):
+                    worker = await self._replace(worker)
+                raise
+            self.completed += 1
+            if worker.jobs >= self.max_jobs:
+                self.recycled += 1
+                worker = await self._replace(worker, graceful=True)
+            return result
+        finally:
+            if self._idle is idle:
+                idle.put_nowait(worker)
+            else:
+                await asyncio.to_thread(worker.stop)
+
+    async def _checked(self, worker: WorkerProcess) -> WorkerProcess:
+        # Only ping workers that have been idle long enough to have gone bad unnoticed
+        if not worker.alive or (
+            time.monotonic() - worker.last_used > self.health_interval
+            and not await asyncio.to_thread(worker.ping, 5)
+        ):
+            logger.warning(f"Validation worker {worker.process.pid} failed its health check")
+            return await self._replace(worker)
+        return worker
+
+    async def _replace(self, worker: WorkerProcess, graceful: bool = False) -> WorkerProcess:
+        await asyncio.to_thread(worker.stop if graceful else worker.kill)
+        if not graceful:
+            self.replaced += 1
+        fresh = await asyncio.to_thread(self._spawn)
+        self._workers = [fresh if w is worker else w for w in self._workers]
+        return fresh
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "size": self.size if self.running else 0,
+            "idle": self._idle.qsize() if self._idle else 0,
+            "completed": self.completed,
+            "recycled": self.recycled,
+            "replaced": self.replaced,
+            "jobs_per_worker": [w.jobs for w in self._workers]
+        }
+
+_worker_pool: Optional[ValidationWorkerPool] = None
+
+def get_validation_workers() -> ValidationWorkerPool:
+    global _worker_pool
+    if _worker_pool is None:
+        _worker_pool = ValidationWorkerPool()
+    return _worker_pool
@@ -0,0 +1,72 @@
+"""Compare unbounded ``extractall`` with the bounded extractor, extracting
+everything (as validation does) or only Terraform files.
+
+Builds a large synthetic module archive (many .tf files plus binary assets,
+the shape of real monorepo uploads) and times both extractors on the default
+temp directory and, when present, on tmpfs.
+
+    python -m benchmarks.bench_extract --tf-files 2000 --asset-mb 200
+"""
+import os
+import time
+import shutil
+import zipfile
+import argparse
+import tempfile
+import statistics
+from app.storage.extract import ExtractionLimits, extract_archive, is_validation_file, TMPFS_PATH
+
+def build_archive(path: str, tf_files: int, asset_mb: int) -> None:
+    block = 'resource "null_resource" "r%d" {\n  triggers = { id = "%d" }\n}\n'
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as zipf:
+        for i in range(tf_files):
+            zipf.writestr(f"modules/m{i % 50}/r{i}.tf", "".join(block % (j, j) for j in range(20)))
+        for i in range(max(asset_mb, 0)):
+            zipf.writestr(f"assets/blob{i}.bin", os.urandom(1024 * 1024), zipfile.ZIP_STORED)
+
+def time_runs(fn, root, runs):
+    timings = []
+    for _ in range(runs):
+        destination = tempfile.mkdtemp(dir=root)
+        started = time.perf_counter()
+        fn(destination)
+        timings.append(time.perf_counter() - started)
+        shutil.rmtree(destination)
+    return statistics.median(timings)
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--tf-files", type=int, default=2000)
+    parser.add_argument("--asset-mb", type=int, default=200)
+    parser.add_argument("--runs", type=int, default=5)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="bench_extract_")
+    archive = os.path.join(workdir, "module.zip")
+    try:
+        build_archive(archive, args.tf_files, args.asset_mb)
+        print(f"archive: {os.path.getsize(archive) / 1e6:.1f} MB, "
+              f"{args.tf_files} .tf files, {args.asset_mb} MB of assets")
+        limits = ExtractionLimits(max_total_bytes=(args.asset_mb + 100) * 1024 * 1024, max_entries=10 ** 6)
+
+        def extractall(destination):
+            with zipfile.ZipFile(archive) as zipf:
+                zipf.extractall(destination)
+
+        def bounded(destination):
+            extract_archive(archive, destination, limits)
+
+        def bounded_hcl(destination):
+            extract_archive(archive, destination, limits, include=is_validation_file)
+
+        roots = [("disk", workdir)]
+        if os.path.isdir(TMPFS_PATH) and os.access(TMPFS_PATH, os.W_OK):
+            roots.append(("tmpfs", TMPFS_PATH))
+        for label, root in roots:
+            for name, fn in (("extractall", extractall), ("bounded", bounded), ("bounded-hcl", bounded_hcl)):
+                print(f"{label:6} {name:11} {time_runs(fn, root, args.runs) * 1000:9.1f} ms (median of {args.runs})")
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,131 @@
+"""Per-request overhead of the middleware stack.
+
+The same FastAPI endpoint is called directly through ASGI, without a server
+or HTTP client, behind:
+
+* ``none``: no middleware;
+* ``base-http``: request id, timing and rate limiting as ``@app.middleware("http")``
+  functions, the way the app used to register them;
+* ``asgi``: ``RequestIdMiddleware``, ``TimingMiddleware`` and ``RateLimitMiddleware``;
+* ``asgi-bypass``: the same stack on a bypassed path such as the discovery document.
+
+The limiter is a ``LocalRateLimiter`` over fakeredis that never syncs during
+the run, so the numbers are the cost of the middleware, not of Redis.
+
+    python -m benchmarks.bench_middleware
+    python -m benchmarks.bench_middleware --token    # also verify a bearer token
+"""
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+import fakeredis
+import jwt
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from app.auth.auth import SECRET_KEY, ALGORITHM
+from app.middleware import RatePolicies, RateLimitMiddleware, RequestIdMiddleware, TimingMiddleware
+from app.rate_limiter import LocalRateLimiter, RateLimiter
+
+BUDGETS = {role: {"read": 10 ** 9, "heavy": 10 ** 9, "admin": 10 ** 9}
+           for role in ("anonymous", "reader", "publisher", "service", "admin")}
+
+def make_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/v1/modules/{namespace}/{name}/{provider}/versions")
+    async def versions():
+        return {"modules": []}
+
+    @app.get("/.well-known/terraform.json")
+    async def discovery():
+        return {"modules.v1": "/v1/modules/"}
+    return app
+
+def base_http_stack(limiter, policies) -> FastAPI:
+    app = make_app()
+
+    @app.middleware("http")
+    async def rate_limit(request: Request, call_next):
+        client = request.client.host if request.client else None
+        decision = policies.decide(request.method, request.url.path, request.headers.get("authorization"), client)
+        result = await limiter.hit(decision.key, cost=decision.cost, limit=decision.limit)
+        if not result.allowed:
+            return JSONResponse(status_code=429, content={"detail": "Rate limit exceeded"}, headers=result.headers())
+        response = await call_next(request)
+        response.headers.update(result.headers())
+        return response
+
+    @app.middleware("http")
+    async def timing(request: Request, call_next):
+        started = time.perf_counter()
+        response = await call_next(request)
+        response.headers["Server-Timing"] = f"app;dur={(time.perf_counter() - started) * 1000:.1f}"
+        return response
+
+    @app.middleware("http")
+    async def request_id(request: Request, call_next):
+        request.state.request_id = request.headers.get("x-request-id") or uuid.uuid4().hex
+        response = await call_next(request)
+        response.headers["X-Request-ID"] = request.state.request_id
+        return response
+    return app
+
+def asgi_stack(limiter, policies) -> FastAPI:
+    app = make_app()
+    app.add_middleware(RateLimitMiddleware, get_limiter=lambda: limiter, policies=policies)
+    app.add_middleware(TimingMiddleware)
+    app.add_middleware(RequestIdMiddleware)
+    return app
+
+async def measure(app, path: str, requests: int, headers) -> list:
+    scope = {
+        "type": "http", "asgi": {"version": "3.0"}, "http_version": "1.1", "method": "GET", "scheme": "http",
+        "path": path, "raw_path": path.encode(), "query_string": b"", "root_path": "",
+        "headers": headers, "client": ("10.0.0.1", 40000), "server": ("testserver", 80)
+    }
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        pass
+
+    timings = []
+    for i in range(requests + 200):
+        started = time.perf_counter()
+        await app(dict(scope), receive, send)
+        if i >= 200:
+            timings.append(time.perf_counter() - started)
+    return timings
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--token", action="store_true", help="send a bearer token with each request")
+    args = parser.parse_args()
+
+    limiter = LocalRateLimiter(RateLimiter(redis_client=fakeredis.FakeRedis(decode_responses=True)),
+                               sync_interval=3600, sync_fraction=1)
+    policies = RatePolicies(budgets=BUDGETS)
+    headers = [(b"host", b"testserver")]
+    if args.token:
+        token = jwt.encode({"sub": "ci", "role": "service"}, SECRET_KEY, algorithm=ALGORITHM)
+        headers.append((b"authorization", f"Bearer {token}".encode()))
+
+    versions = "/v1/modules/acme/bucket/aws/versions"
+    cases = (
+        ("none", make_app(), versions),
+        ("base-http", base_http_stack(limiter, policies), versions),
+        ("asgi", asgi_stack(limiter, policies), versions),
+        ("asgi-bypass", asgi_stack(limiter, policies), "/.well-known/terraform.json")
+    )
+    baseline = None
+    for name, app, path in cases:
+        median = statistics.median(asyncio.run(measure(app, path, args.requests, headers))) * 1e6
+        baseline = median if baseline is None else baseline
+        print(f"{name:>12}: median {median:7.1f} us per request, overhead {median - baseline:6.1f} us")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,150 @@
+"""Compare the old rate limiters with the single-script GCRA limiter.
+
+Three implementations decide the same stream of requests:
+
+* ``incr-expire``: the old app limiter, ``INCR`` then ``EXPIRE`` on the first hit;
+* ``get-pipeline``: the old middleware, ``GET`` then ``INCR``/``EXPIRE`` in a pipeline;
+* ``gcra-lua``: ``app.rate_limiter.RateLimiter``, one ``EVALSHA``;
+* ``local-bucket``: ``app.rate_limiter.LocalRateLimiter``, decided in process
+  and synced in batches. In the race every thread gets its own limiter, as
+  if each were a separate API worker.
+
+For each one the benchmark reports Redis round trips per decision and the
+median decision latency. ``--latency-ms`` adds a delay to every round trip
+to simulate Redis on another host. It also reports how many requests were
+admitted when ``--threads`` clients race for one key whose limit is
+``--limit``. A correct limiter admits exactly ``--limit``.
+
+    python -m benchmarks.bench_rate_limit                    # needs Redis on REDIS_HOST
+    python -m benchmarks.bench_rate_limit --fake             # fakeredis[lua], no server
+    python -m benchmarks.bench_rate_limit --latency-ms 0.5
+"""
+import os
+import time
+import argparse
+import statistics
+import threading
+from redis import Redis
+from app.rate_limiter import LocalRateLimiter, RateLimiter
+
+class RoundTripCounter:
+    """Wraps a client so every command or pipeline flush counts as one round trip"""
+
+    def __init__(self, client: Redis, latency: float):
+        self.client = client
+        self.latency = latency
+        self.round_trips = 0
+        self._lock = threading.Lock()
+        execute_command = client.execute_command
+        make_pipeline = client.pipeline
+
+        def counted_command(*args, **kwargs):
+            self._round_trip()
+            return execute_command(*args, **kwargs)
+
+        def counted_pipeline(*args, **kwargs):
+            pipeline = make_pipeline(*args, **kwargs)
+            flush = pipeline.execute
+
+            def execute(*a, **kw):
+                self._round_trip()
+                return flush(*a, **kw)
+            pipeline.execute = execute
+            return pipeline
+
+        client.execute_command = counted_command
+        client.pipeline = counted_pipeline
+
+    def _round_trip(self) -> None:
+        with self._lock:
+            self.round_trips += 1
+        if self.latency:
+            time.sleep(self.latency)
+
+def incr_expire(client: Redis, key: str, limit: int, window: int) -> bool:
+    current = client.incr(f"bench:{key}")
+    if current == 1:
+        client.expire(f"bench:{key}", window)
+    return current <= limit
+
+def get_pipeline(client: Redis, key: str, limit: int, window: int) -> bool:
+    current = int(client.get(f"bench:{key}") or 0)
+    if current >= limit:
+        return False
+    pipeline = client.pipeline()
+    pipeline.incr(f"bench:{key}")
+    pipeline.expire(f"bench:{key}", window)
+    pipeline.execute()
+    return True
+
+def gcra(limiter: RateLimiter):
+    def decide(client: Redis, key: str, limit: int, window: int) -> bool:
+        return limiter.consume(key, limit=limit, window=window).allowed
+    return decide
+
+def local_bucket(limiter: RateLimiter, sync_interval: float):
+    workers = threading.local()
+
+    def decide(client: Redis, key: str, limit: int, window: int) -> bool:
+        if not hasattr(workers, "limiter"):
+            workers.limiter = LocalRateLimiter(limiter, sync_interval=sync_interval)
+        allowed = workers.limiter.consume(key, limit=limit, window=window).allowed
+        # The API runs this in a background thread; inline keeps the count exact
+        if workers.limiter.sync_due():
+            workers.limiter.sync()
+        return allowed
+    return decide
+
+def make_client(fake: bool) -> Redis:
+    if fake:
+        import fakeredis
+        return fakeredis.FakeRedis(decode_responses=True)
+    return Redis(host=os.getenv("REDIS_HOST", "localhost"), port=int(os.getenv("REDIS_PORT", 6379)),
+                 decode_responses=True)
+
+def measure(name, decide, client, counter, args):
+    client.flushdb()
+    counter.round_trips = 0
+    timings = []
+    for i in range(args.requests):
+        started = time.perf_counter()
+        decide(client, f"{name}:{i % 100}", 10 ** 6, 60)
+        timings.append(time.perf_counter() - started)
+    round_trips = counter.round_trips / args.requests
+
+    client.flushdb()
+    admitted = []
+    barrier = threading.Barrier(args.threads)
+
+    def race():
+        barrier.wait()
+        admitted.append(sum(decide(client, f"{name}:race", args.limit, 60) for _ in range(args.limit)))
+
+    threads = [threading.Thread(target=race) for _ in range(args.threads)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    print(f"{name:>13}: {round_trips:.2f} round trips, median {statistics.median(timings) * 1e6:8.1f} us, "
+          f"admitted {sum(admitted)}/{args.limit}")
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=5000)
+    parser.add_argument("--threads", type=int, default=8)
+    parser.add_argument("--limit", type=int, default=50)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--sync-interval", type=float, default=1.0, help="local-bucket sync interval in seconds")
+    parser.add_argument("--fake", action="store_true", help="use fakeredis instead of a Redis server")
+    args = parser.parse_args()
+
+    client = make_client(args.fake)
+    limiter = RateLimiter(redis_client=client)
+    counter = RoundTripCounter(client, args.latency_ms / 1000)
+    implementations = (("incr-expire", incr_expire), ("get-pipeline", get_pipeline), ("gcra-lua", gcra(limiter)),
+                       ("local-bucket", local_bucket(limiter, args.sync_interval)))
+    for name, decide in implementations:
+        measure(name, decide, client, counter, args)
+
+if __name__ == "__main__":
+    main()